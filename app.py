@@ -1,14 +1,71 @@
-from flask import Flask, request, jsonify
-import os, base64, random, string
+from flask import Flask, Response, request, jsonify, stream_with_context
+import base64, binascii, json, os, sqlite3, uuid, threading
 from transcibe import create_openai_client, transcribe_audio
-from zgs_backend import PaymentProcessingAgent
+from asr_backends import get_asr_backend
+from tts import speak_stream, stream_speech, warm_up
+from tts.prompts import PROMPT_CATALOGUE
+from pydantic import ValidationError
+from zgs_backend import PaymentProcessingAgent, result_cache, image_store, decode_upload, ImageStoreFull, ModelCallError, ModelTimeoutError, render_metrics, run_batch, checkpoint_path, intent_router, transfer_semantic_cache, Contact, recipient_directory, interpret, get_payment_scheduler
 
 app = Flask(__name__)
 client = create_openai_client()
-agent = PaymentProcessingAgent()
+agent = PaymentProcessingAgent(use_pipeline=True, fused_ocr=os.getenv("ZGS_FUSED_OCR") == "1")
+
+# Only the fixed prompts are kept in the TTS cache; free text may contain account numbers
+CACHEABLE_PROMPTS = set(PROMPT_CATALOGUE)
+MAX_BATCH_WORKERS = int(os.getenv("ZGS_BATCH_MAX_WORKERS", "16"))
+
+shutting_down = threading.Event()
+
+
+def start_background_tasks():
+    """Model warm-ups and the payment scheduler, which dispatches scheduled payments and standing orders."""
+    # The local Whisper model starts CTranslate2/OpenMP thread pools, which do not survive fork()
+    if os.getenv("ASR_BACKEND") == "local":
+        threading.Thread(target=get_asr_backend, daemon=True).start()
+    if os.getenv("TTS_WARMUP", "0") == "1":
+        threading.Thread(target=warm_up, daemon=True).start()
+    if os.getenv("ZGS_INTENT_WARMUP", "1") == "1":
+        threading.Thread(target=intent_router.warm_up, daemon=True).start()
+    if os.getenv("ZGS_SCHEDULER", "1") == "1":
+        # Every worker starts one; only the holder of the lock file dispatches
+        scheduler = get_payment_scheduler()
+        scheduler.start(leader_lock=f"{scheduler.store.path}.leader")
+
+
+def shutdown():
+    """Report not ready and let the scheduler finish its current batch."""
+    shutting_down.set()
+    get_payment_scheduler().stop(timeout=10)
+
+
+# Under gunicorn.conf.py this module is imported once in the parent and the workers are forked
+# from it; threads do not survive fork(), so each worker starts them in the post_fork hook
+if os.getenv("ZGS_PRELOAD") == "1":
+    agent.preload()
+else:
+    start_background_tasks()
+
+@app.errorhandler(ModelCallError)
+def model_call_failed(error):
+    # Provider overloaded or too slow after retries: tell the client to back off instead of a generic 400
+    if isinstance(error, ModelTimeoutError):
+        return jsonify({"error": str(error)}), 504
+    return jsonify({"error": str(error)}), 503, {"Retry-After": "5"}
+
+
+@app.errorhandler(ImageStoreFull)
+def image_store_full(error):
+    return jsonify({"error": str(error)}), 503, {"Retry-After": "2"}
+
+
+def fused_option(data):
+    # JSON true, 1, "1" or "true" turns the fused scan on; "false" and other strings turn it off,
+    # and without the key the ZGS_FUSED_OCR default applies
+    if "fused" not in data:
+        return None
+    return data["fused"] in (True, 1, "1", "true")
 
-UPLOAD_FOLDER = "uploads/"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 @app.route('/upload-image', methods=['POST'])
 def upload_base64():
@@ -17,37 +74,236 @@ def upload_base64():
         return jsonify({"error": "data content missing or image not in data"}), 400
 
     base_img = data["image_base64"]
-    random_filename = ''.join(random.choices(string.ascii_letters + string.digits, k=16)) + ".png"
 
     try:
-        image_bytes = base64.b64decode(base_img)
-        with open(UPLOAD_FOLDER + random_filename, "wb") as f:
-            f.write(image_bytes)
+        image_bytes, base_img = decode_upload(base_img)
+    except (binascii.Error, ValueError, TypeError):
+        return jsonify({"error": "Base64 decoding failed"}), 400
+
+    # Hand the upload to the OCR tool in memory; set ZGS_UPLOAD_AUDIT_DIR to also keep it on disk
+    handle = image_store.put(image_bytes, base_img)
+    try:
+        # "fused": true reads the bill with one vision call instead of OCR + parse
         result = agent.process_request(
-            fr"Extract payment information from the bill image at 'C:\Users\Mateusz\Desktop\ZGS-collabothon\uploads\{random_filename}' and give me the formatted payment details"
+            f"Extract payment information from the bill image at '{handle}' and give me the formatted payment details",
+            fused_ocr=fused_option(data)
         )
         return jsonify({"status" : "OK", "result" : result}), 200
+    except ModelCallError:
+        raise
     except Exception:
-        return jsonify({"error": "Base64 decoding failed"}), 400
+        return jsonify({"error": "Image processing failed"}), 400
+    finally:
+        image_store.release(handle)
+
+
+def read_audio_upload():
+    """
+    Return uploaded audio bytes from a multipart 'file' field, a raw audio body
+    or base64 'audio' in JSON (in order of preference), or None if there is none.
+    """
+    files = request.files
+    if "file" in files:
+        return files["file"].read()
+    if request.mimetype.startswith("audio/") or request.mimetype == "application/octet-stream":
+        return request.get_data()
+    data = request.get_json(silent=True)
+    if data and "audio" in data:
+        return base64.b64decode(data["audio"])
+    return None
 
-    # Here you may process image
 
 @app.route("/upload-audio", methods=["POST"])
 def upload_audio_base64():
-    data = request.get_json()
-
-    if not data or "audio" not in data:
-        return jsonify({"error": "Missing 'audio' in JSON"}), 400
+    try:
+        audio_bytes = read_audio_upload()
+    except (binascii.Error, ValueError):
+        return jsonify({"error": "Audio decoding failed"}), 400
 
-    audio_bytes = data["audio"]
+    if not audio_bytes:
+        return jsonify({"error": "Missing audio: send a 'file' field, a raw audio body or 'audio' in JSON"}), 400
 
     try:
         text = transcribe_audio(client, audio_bytes)
         result = agent.process_request(user_input=text)
         return jsonify({"status": "OK", "result" : result}), 200
 
+    except ModelCallError:
+        raise
     except Exception:
         return jsonify({"error": "Transcription failed."}), 400
 
+
+@app.route("/api/voice/asr", methods=["POST"])
+def voice_asr():
+    try:
+        audio_bytes = read_audio_upload()
+    except (binascii.Error, ValueError):
+        audio_bytes = None
+
+    if not audio_bytes:
+        return jsonify({"status": "error", "transcript": ""}), 400
+
+    text = transcribe_audio(client, audio_bytes)
+    return jsonify({"status": "ok" if text else "error", "transcript": text}), 200
+
+
+@app.route("/api/voice/interpret", methods=["POST"])
+def voice_interpret():
+    # Navigation commands ("pokaż saldo", "tak") are classified locally; only transfers reach the agent
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get("text"), str):
+        return jsonify({"status": "error", "command": {"intent": "unknown"}}), 400
+
+    return jsonify({"status": "ok", "command": interpret(data["text"])}), 200
+
+
+@app.route("/api/voice/speak", methods=["POST"])
+def voice_speak():
+    data = request.get_json(silent=True)
+    if not data or not data.get("text"):
+        return jsonify({"error": "Missing 'text' in JSON"}), 400
+
+    text = data["text"]
+    lang = data.get("lang", "pl")
+    cache = (text, lang) in CACHEABLE_PROMPTS
+
+    # "device" plays on the ATM's own speakers; otherwise the MP3 is streamed to the client
+    if data.get("target") == "device":
+        threading.Thread(target=speak_stream, args=(text, lang), kwargs={"cache": cache}, daemon=True).start()
+        return jsonify({"status": "ok"}), 202
+
+    return Response(stream_with_context(stream_speech(text, lang, cache=cache)), mimetype="audio/mpeg")
+
+
+@app.route("/api/contacts", methods=["GET"])
+def list_contacts():
+    return jsonify([contact.model_dump() for contact in recipient_directory.contacts()]), 200
+
+
+@app.route("/api/contacts", methods=["POST"])
+def add_contact():
+    # {"name", "bank_account", "address"?, "aliases"?: ["córka"], "id"?}; an existing id is replaced
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Missing contact JSON"}), 400
+    try:
+        contact = Contact(**{"id": uuid.uuid4().hex, **data})
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    recipient_directory.add(contact)
+    return jsonify(contact.model_dump()), 201
+
+
+@app.route("/api/contacts/<contact_id>", methods=["DELETE"])
+def delete_contact(contact_id):
+    recipient_directory.remove(contact_id)
+    return "", 204
+
+
+@app.route("/api/payments/schedule", methods=["POST"])
+def schedule_payment():
+    # {"payment_request": {...from format_payment_message}, "schedule"?: "YYYY-MM-DD" | "immediate",
+    #  "frequency"?: "weekly" | "bi-weekly" | "monthly" | "quarterly"}; "payment" is accepted as an alias
+    data = request.get_json(silent=True)
+    payment = data.get("payment_request", data.get("payment")) if isinstance(data, dict) else None
+    if not isinstance(payment, dict):
+        return jsonify({"error": "Missing 'payment_request' object in JSON"}), 400
+    try:
+        payment_id = get_payment_scheduler().schedule(payment, data.get("schedule"), data.get("frequency"))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(get_payment_scheduler().store.get(payment_id)), 201
+
+
+@app.route("/api/payments", methods=["GET"])
+def list_payments():
+    # ?status=pending|sent|failed|cancelled&recurring=1|0&limit=100
+    recurring = request.args.get("recurring")
+    try:
+        limit = max(1, min(int(request.args.get("limit", 100)), 1000))
+    except ValueError:
+        return jsonify({"error": "'limit' must be an integer"}), 400
+    payments = get_payment_scheduler().store.list(
+        status=request.args.get("status"),
+        recurring=None if recurring is None else recurring == "1",
+        limit=limit,
+    )
+    return jsonify(payments), 200
+
+
+@app.route("/api/payments/<int:payment_id>", methods=["DELETE"])
+def cancel_payment(payment_id):
+    if not get_payment_scheduler().store.cancel(payment_id):
+        return jsonify({"error": "No pending payment with this id"}), 404
+    return "", 204
+
+
+@app.route("/batch", methods=["POST"])
+def batch():
+    # {"items": [{"id", "image_base64" | "text"}], "workers", "fused", "batch_id"} -> one NDJSON line per item
+    # as it completes; with a batch_id a retried request skips the items that already succeeded
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get("items"), list) or not all(isinstance(i, dict) for i in data["items"]):
+        return jsonify({"error": "Missing 'items' list in JSON"}), 400
+
+    # Only uploaded content is accepted; server-side paths are not
+    items = [
+        {"id": str(item.get("id", index)), **{key: item[key] for key in ("image_base64", "text") if key in item}}
+        for index, item in enumerate(data["items"])
+    ]
+    options = {"fused_ocr": fused_option(data)}
+    if "workers" in data:
+        try:
+            options["workers"] = max(1, min(int(data["workers"]), MAX_BATCH_WORKERS))
+        except (TypeError, ValueError):
+            return jsonify({"error": "'workers' must be an integer"}), 400
+    try:
+        checkpoint = checkpoint_path(data["batch_id"]) if data.get("batch_id") else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    records = run_batch(agent, items, checkpoint=checkpoint, **options)
+    return Response(
+        stream_with_context(json.dumps(record, ensure_ascii=False) + "\n" for record in records),
+        mimetype="application/x-ndjson",
+    )
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    exposition = render_metrics()
+    if exposition is None:
+        return jsonify({"error": "prometheus_client is not installed"}), 501
+    body, content_type = exposition
+    return Response(body, content_type=content_type)
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Liveness: the worker answers requests
+    return jsonify({"status": "ok", "pid": os.getpid()}), 200
+
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    # Readiness: 503 takes the instance out of the load balancer while it starts or drains
+    checks = {"accepting": not shutting_down.is_set()}
+    try:
+        get_payment_scheduler().store.next_due()
+        checks["payment_store"] = True
+    except sqlite3.Error:
+        checks["payment_store"] = False
+    checks["scheduler"] = get_payment_scheduler().running or os.getenv("ZGS_SCHEDULER", "1") != "1"
+    ready = all(checks.values())
+    return jsonify({"status": "ready" if ready else "unavailable", "checks": checks}), 200 if ready else 503
+
+
+@app.route("/cache-stats", methods=["GET"])
+def cache_stats():
+    return jsonify(dict(result_cache.stats(), transfer_semantic=transfer_semantic_cache.stats())), 200
+
 if __name__ == '__main__':
+    # Development server; for production use: gunicorn -c gunicorn.conf.py app:app
     app.run(debug=True, port=2137)
\ No newline at end of file
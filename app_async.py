@@ -0,0 +1,310 @@
+from quart import Quart, Response, request, jsonify
+import asyncio, base64, binascii, json, os, sqlite3, uuid
+from transcibe import create_async_openai_client, atranscribe_audio
+from asr_backends import get_asr_backend
+from tts import speak_stream, stream_speech, warm_up
+from tts.prompts import PROMPT_CATALOGUE
+from pydantic import ValidationError
+from zgs_backend import PaymentProcessingAgent, result_cache, image_store, decode_upload, ImageStoreFull, ModelCallError, ModelTimeoutError, render_metrics, arun_batch, checkpoint_path, intent_router, transfer_semantic_cache, Contact, recipient_directory, ainterpret, get_payment_scheduler
+
+# ASGI variant of app.py: every model call is awaited, so a single process
+# keeps many requests in flight without a thread per request.
+# Run with: uvicorn app_async:app --port 2137
+
+app = Quart(__name__)
+client = create_async_openai_client()
+agent = PaymentProcessingAgent(use_pipeline=True, fused_ocr=os.getenv("ZGS_FUSED_OCR") == "1")
+
+CACHEABLE_PROMPTS = set(PROMPT_CATALOGUE)
+MAX_BATCH_WORKERS = int(os.getenv("ZGS_BATCH_MAX_WORKERS", "16"))
+shutting_down = asyncio.Event()
+
+
+@app.before_serving
+async def warm_up_models():
+    # Loaded per serving process, never in a parent that forks workers
+    if os.getenv("ASR_BACKEND") == "local":
+        asyncio.get_running_loop().run_in_executor(None, get_asr_backend)
+    if os.getenv("TTS_WARMUP", "0") == "1":
+        asyncio.get_running_loop().run_in_executor(None, warm_up)
+    if os.getenv("ZGS_INTENT_WARMUP", "1") == "1":
+        asyncio.get_running_loop().run_in_executor(None, intent_router.warm_up)
+    if os.getenv("ZGS_SCHEDULER", "1") == "1":
+        # Every worker starts one; only the holder of the lock file dispatches
+        scheduler = get_payment_scheduler()
+        scheduler.start(leader_lock=f"{scheduler.store.path}.leader")
+
+
+@app.after_serving
+async def stop_scheduler():
+    shutting_down.set()
+    await asyncio.to_thread(get_payment_scheduler().stop, 10)
+
+
+@app.errorhandler(ModelCallError)
+async def model_call_failed(error):
+    # Provider overloaded or too slow after retries: tell the client to back off instead of a generic 400
+    if isinstance(error, ModelTimeoutError):
+        return jsonify({"error": str(error)}), 504
+    return jsonify({"error": str(error)}), 503, {"Retry-After": "5"}
+
+
+@app.errorhandler(ImageStoreFull)
+async def image_store_full(error):
+    return jsonify({"error": str(error)}), 503, {"Retry-After": "2"}
+
+
+def fused_option(data):
+    # JSON true, 1, "1" or "true" turns the fused scan on; "false" and other strings turn it off,
+    # and without the key the ZGS_FUSED_OCR default applies
+    if "fused" not in data:
+        return None
+    return data["fused"] in (True, 1, "1", "true")
+
+
+@app.route('/upload-image', methods=['POST'])
+async def upload_base64():
+    data = await request.get_json()
+    if not data or "image_base64" not in data:
+        return jsonify({"error": "data content missing or image not in data"}), 400
+
+    base_img = data["image_base64"]
+
+    try:
+        image_bytes, base_img = decode_upload(base_img)
+    except (binascii.Error, ValueError, TypeError):
+        return jsonify({"error": "Base64 decoding failed"}), 400
+
+    handle = image_store.put(image_bytes, base_img)
+    try:
+        # "fused": true reads the bill with one vision call instead of OCR + parse
+        result = await agent.aprocess_request(
+            f"Extract payment information from the bill image at '{handle}' and give me the formatted payment details",
+            fused_ocr=fused_option(data)
+        )
+        return jsonify({"status" : "OK", "result" : result}), 200
+    except ModelCallError:
+        raise
+    except Exception:
+        return jsonify({"error": "Image processing failed"}), 400
+    finally:
+        image_store.release(handle)
+
+
+async def read_audio_upload():
+    """
+    Return uploaded audio bytes from a multipart 'file' field, a raw audio body
+    or base64 'audio' in JSON (in order of preference), or None if there is none.
+    """
+    files = (await request.files)
+    if "file" in files:
+        return files["file"].read()
+    if request.mimetype.startswith("audio/") or request.mimetype == "application/octet-stream":
+        return await request.get_data()
+    data = await request.get_json(silent=True)
+    if data and "audio" in data:
+        return base64.b64decode(data["audio"])
+    return None
+
+
+@app.route("/upload-audio", methods=["POST"])
+async def upload_audio_base64():
+    try:
+        audio_bytes = await read_audio_upload()
+    except (binascii.Error, ValueError):
+        return jsonify({"error": "Audio decoding failed"}), 400
+
+    if not audio_bytes:
+        return jsonify({"error": "Missing audio: send a 'file' field, a raw audio body or 'audio' in JSON"}), 400
+
+    try:
+        text = await atranscribe_audio(client, audio_bytes)
+        result = await agent.aprocess_request(user_input=text)
+        return jsonify({"status": "OK", "result" : result}), 200
+
+    except ModelCallError:
+        raise
+    except Exception:
+        return jsonify({"error": "Transcription failed."}), 400
+
+
+@app.route("/api/voice/asr", methods=["POST"])
+async def voice_asr():
+    try:
+        audio_bytes = await read_audio_upload()
+    except (binascii.Error, ValueError):
+        audio_bytes = None
+
+    if not audio_bytes:
+        return jsonify({"status": "error", "transcript": ""}), 400
+
+    text = await atranscribe_audio(client, audio_bytes)
+    return jsonify({"status": "ok" if text else "error", "transcript": text}), 200
+
+
+@app.route("/api/voice/interpret", methods=["POST"])
+async def voice_interpret():
+    # Navigation commands ("pokaż saldo", "tak") are classified locally; only transfers reach the agent
+    data = await request.get_json(silent=True)
+    if not data or not isinstance(data.get("text"), str):
+        return jsonify({"status": "error", "command": {"intent": "unknown"}}), 400
+
+    return jsonify({"status": "ok", "command": await ainterpret(data["text"])}), 200
+
+
+@app.route("/api/voice/speak", methods=["POST"])
+async def voice_speak():
+    data = await request.get_json(silent=True)
+    if not data or not data.get("text"):
+        return jsonify({"error": "Missing 'text' in JSON"}), 400
+
+    text = data["text"]
+    lang = data.get("lang", "pl")
+    cache = (text, lang) in CACHEABLE_PROMPTS
+
+    if data.get("target") == "device":
+        asyncio.get_running_loop().run_in_executor(None, lambda: speak_stream(text, lang, cache=cache))
+        return jsonify({"status": "ok"}), 202
+
+    async def generate():
+        # gTTS is blocking; fetch each chunk off the event loop
+        chunks = stream_speech(text, lang, cache=cache)
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            yield chunk
+
+    return Response(generate(), mimetype="audio/mpeg")
+
+
+@app.route("/api/contacts", methods=["GET"])
+async def list_contacts():
+    contacts = await asyncio.to_thread(recipient_directory.contacts)
+    return jsonify([contact.model_dump() for contact in contacts]), 200
+
+
+@app.route("/api/contacts", methods=["POST"])
+async def add_contact():
+    # {"name", "bank_account", "address"?, "aliases"?: ["córka"], "id"?}; an existing id is replaced
+    data = await request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Missing contact JSON"}), 400
+    try:
+        contact = Contact(**{"id": uuid.uuid4().hex, **data})
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    await asyncio.to_thread(recipient_directory.add, contact)
+    return jsonify(contact.model_dump()), 201
+
+
+@app.route("/api/contacts/<contact_id>", methods=["DELETE"])
+async def delete_contact(contact_id):
+    await asyncio.to_thread(recipient_directory.remove, contact_id)
+    return "", 204
+
+
+@app.route("/api/payments/schedule", methods=["POST"])
+async def schedule_payment():
+    # {"payment_request": {...from format_payment_message}, "schedule"?: "YYYY-MM-DD" | "immediate",
+    #  "frequency"?: "weekly" | "bi-weekly" | "monthly" | "quarterly"}; "payment" is accepted as an alias
+    data = await request.get_json(silent=True)
+    payment = data.get("payment_request", data.get("payment")) if isinstance(data, dict) else None
+    if not isinstance(payment, dict):
+        return jsonify({"error": "Missing 'payment_request' object in JSON"}), 400
+    try:
+        payment_id = await asyncio.to_thread(
+            get_payment_scheduler().schedule, payment, data.get("schedule"), data.get("frequency")
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(await asyncio.to_thread(get_payment_scheduler().store.get, payment_id)), 201
+
+
+@app.route("/api/payments", methods=["GET"])
+async def list_payments():
+    # ?status=pending|sent|failed|cancelled&recurring=1|0&limit=100
+    recurring = request.args.get("recurring")
+    try:
+        limit = max(1, min(int(request.args.get("limit", 100)), 1000))
+    except ValueError:
+        return jsonify({"error": "'limit' must be an integer"}), 400
+    payments = await asyncio.to_thread(
+        get_payment_scheduler().store.list,
+        status=request.args.get("status"),
+        recurring=None if recurring is None else recurring == "1",
+        limit=limit,
+    )
+    return jsonify(payments), 200
+
+
+@app.route("/api/payments/<int:payment_id>", methods=["DELETE"])
+async def cancel_payment(payment_id):
+    if not await asyncio.to_thread(get_payment_scheduler().store.cancel, payment_id):
+        return jsonify({"error": "No pending payment with this id"}), 404
+    return "", 204
+
+
+@app.route("/batch", methods=["POST"])
+async def batch():
+    # {"items": [{"id", "image_base64" | "text"}], "workers", "fused", "batch_id"} -> one NDJSON line per item
+    # as it completes; with a batch_id a retried request skips the items that already succeeded
+    data = await request.get_json(silent=True)
+    if not data or not isinstance(data.get("items"), list) or not all(isinstance(i, dict) for i in data["items"]):
+        return jsonify({"error": "Missing 'items' list in JSON"}), 400
+
+    # Only uploaded content is accepted; server-side paths are not
+    items = [
+        {"id": str(item.get("id", index)), **{key: item[key] for key in ("image_base64", "text") if key in item}}
+        for index, item in enumerate(data["items"])
+    ]
+    options = {"fused_ocr": fused_option(data)}
+    if "workers" in data:
+        try:
+            options["workers"] = max(1, min(int(data["workers"]), MAX_BATCH_WORKERS))
+        except (TypeError, ValueError):
+            return jsonify({"error": "'workers' must be an integer"}), 400
+    try:
+        checkpoint = checkpoint_path(data["batch_id"]) if data.get("batch_id") else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    async def generate():
+        async for record in arun_batch(agent, items, checkpoint=checkpoint, **options):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+
+@app.route("/metrics", methods=["GET"])
+async def metrics():
+    exposition = render_metrics()
+    if exposition is None:
+        return jsonify({"error": "prometheus_client is not installed"}), 501
+    body, content_type = exposition
+    return Response(body, content_type=content_type)
+
+
+@app.route("/healthz", methods=["GET"])
+async def healthz():
+    return jsonify({"status": "ok", "pid": os.getpid()}), 200
+
+
+@app.route("/readyz", methods=["GET"])
+async def readyz():
+    checks = {"accepting": not shutting_down.is_set()}
+    try:
+        await asyncio.to_thread(get_payment_scheduler().store.next_due)
+        checks["payment_store"] = True
+    except sqlite3.Error:
+        checks["payment_store"] = False
+    checks["scheduler"] = get_payment_scheduler().running or os.getenv("ZGS_SCHEDULER", "1") != "1"
+    ready = all(checks.values())
+    return jsonify({"status": "ready" if ready else "unavailable", "checks": checks}), 200 if ready else 503
+
+
+@app.route("/cache-stats", methods=["GET"])
+async def cache_stats():
+    return jsonify(dict(result_cache.stats(), transfer_semantic=transfer_semantic_cache.stats())), 200
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, port=2137)
@@ -0,0 +1,126 @@
+import io
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from openai import OpenAI
+
+from audio_codecs import prepare_for_asr
+from zgs_backend import call_model
+
+
+class ASRBackend(ABC):
+    """Speech-to-text backend used by `transcibe.transcribe_audio`."""
+
+    name = "base"
+
+    @abstractmethod
+    def transcribe(self, audio_bytes: bytes) -> str:
+        """Transcribe encoded audio (WAV, FLAC, OGG, WebM...) and return the text."""
+
+
+class OpenAIASRBackend(ASRBackend):
+    """Cloud transcription through the OpenAI audio API."""
+
+    name = "openai"
+
+    def __init__(self, client: OpenAI, model: str = "gpt-4o-transcribe"):
+        self.client = client
+        self.model = model
+
+    def transcribe(self, audio_bytes: bytes) -> str:
+        # Send compressed uploads untouched, with the right extension
+        transcription = call_model(
+            self.model,
+            self.client.audio.transcriptions.create,
+            model=self.model,
+            file=prepare_for_asr(audio_bytes),
+        )
+        return transcription.text.strip()
+
+
+class LocalWhisperASRBackend(ASRBackend):
+    """
+    Offline transcription with faster-whisper (CTranslate2, int8 on CPU).
+
+    The model is loaded and warmed up once when the backend is created and then
+    shared by all requests. Concurrent requests are queued onto `num_workers`
+    CTranslate2 workers, which run them in parallel on one copy of the weights.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model_size: str = "large",
+        device: str = "cpu",
+        compute_type: str = "int8",
+        language: str = "pl",
+        num_workers: int = 2,
+        cpu_threads: int = 0,
+    ):
+        from faster_whisper import WhisperModel
+
+        self.language = language
+        self.model = WhisperModel(
+            model_size,
+            device=device,
+            compute_type=compute_type,
+            num_workers=num_workers,
+            cpu_threads=cpu_threads,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="whisper")
+        self._warm_up()
+
+    def _warm_up(self) -> None:
+        import numpy as np
+        # One second of silence allocates the decoder buffers before the first real request
+        self._run(np.zeros(16_000, dtype=np.float32))
+
+    def _run(self, audio) -> str:
+        segments, _ = self.model.transcribe(audio, language=self.language, beam_size=1, vad_filter=True)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+    def transcribe(self, audio_bytes: bytes) -> str:
+        # PyAV decodes every container itself, so nothing is transcoded here
+        return self._executor.submit(self._run, io.BytesIO(audio_bytes)).result()
+
+
+_backend: Optional[ASRBackend] = None
+_lock = threading.Lock()
+
+
+def get_asr_backend(client: Optional[OpenAI] = None, backend: Optional[str] = None) -> ASRBackend:
+    """
+    Return the process-wide ASR backend, creating it on first use.
+
+    The backend is chosen with the ASR_BACKEND environment variable ("openai" or
+    "local"); the local model size with WHISPER_MODEL_SIZE (default "large", the
+    model listen.py has always used; "small" is several times faster but less accurate).
+
+    Args:
+        client: OpenAI client, required for the "openai" backend
+        backend: Override ASR_BACKEND
+
+    Returns:
+        Shared ASRBackend instance
+    """
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                name = backend or os.getenv("ASR_BACKEND", "openai")
+                if name == "local":
+                    _backend = LocalWhisperASRBackend(
+                        model_size=os.getenv("WHISPER_MODEL_SIZE", "large"),
+                        num_workers=int(os.getenv("WHISPER_NUM_WORKERS", "2")),
+                    )
+                elif name == "openai":
+                    if client is None:
+                        raise ValueError("The openai ASR backend needs an OpenAI client")
+                    _backend = OpenAIASRBackend(client)
+                else:
+                    raise ValueError(f"Unknown ASR backend: {name}")
+    return _backend
@@ -0,0 +1,96 @@
+import io
+from typing import Iterable, Tuple
+
+import numpy as np
+import soundfile as sf
+
+# Containers the ASR backends decode natively, so they are sent as-is
+ASR_NATIVE_FORMATS = {"wav", "flac", "ogg", "webm", "mp3", "m4a"}
+
+# soundfile (format, subtype) per upload encoding
+ENCODINGS = {
+    "wav16": ("WAV", "PCM_16"),
+    "flac": ("FLAC", "PCM_16"),
+    "opus": ("OGG", "OPUS"),
+}
+EXTENSIONS = {"wav16": "wav", "flac": "flac", "opus": "ogg"}
+
+
+def detect_audio_format(data: bytes) -> str:
+    """
+    Detect the container of encoded audio from its magic bytes.
+
+    Args:
+        data: Encoded audio (the first 12 bytes are enough)
+
+    Returns:
+        One of "wav", "flac", "ogg", "webm", "mp3", "m4a" or "unknown"
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"fLaC":
+        return "flac"
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if data[:3] == b"ID3" or data[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "mp3"
+    if data[4:8] == b"ftyp":
+        return "m4a"
+    return "unknown"
+
+
+def encode_audio(samples: np.ndarray, sample_rate: int, encoding: str = "flac") -> bytes:
+    """
+    Encode PCM samples in memory.
+
+    Args:
+        samples: Float or int16 samples, shape (frames,) or (frames, channels)
+        sample_rate: Sample rate in Hz
+        encoding: "wav16" (16-bit PCM), "flac" (lossless, ~half of wav16) or "opus" (OGG/Opus, smallest)
+
+    Returns:
+        Encoded audio bytes
+    """
+    file_format, subtype = ENCODINGS[encoding]
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, sample_rate, format=file_format, subtype=subtype)
+    return buffer.getvalue()
+
+
+def _is_compact_wav(data: bytes) -> bool:
+    try:
+        info = sf.info(io.BytesIO(data))
+    except RuntimeError:
+        return True  # unreadable header, nothing to gain from transcoding
+    return info.subtype in ("PCM_16", "PCM_U8", "ULAW", "ALAW")
+
+
+def prepare_for_asr(audio_bytes: bytes, accepted: Iterable[str] = ASR_NATIVE_FORMATS) -> Tuple[str, bytes]:
+    """
+    Return (filename, bytes) ready to upload, transcoding only when needed.
+
+    Compressed formats the backend accepts pass through untouched. WAV with
+    float or 24/32-bit samples, and formats the backend cannot read, are
+    re-encoded as 16-bit FLAC.
+
+    Args:
+        audio_bytes: Encoded audio as received from the client
+        accepted: Container formats the target backend reads
+
+    Returns:
+        Tuple of (filename with the correct extension, audio bytes)
+    """
+    audio_format = detect_audio_format(audio_bytes)
+    accepted = set(accepted)
+
+    if audio_format in accepted and (audio_format != "wav" or _is_compact_wav(audio_bytes)):
+        return f"audio.{audio_format}", audio_bytes
+
+    try:
+        samples, sample_rate = sf.read(io.BytesIO(audio_bytes), dtype="float32")
+    except RuntimeError:
+        # Not decodable here; let the backend try the original
+        return f"audio.{audio_format if audio_format != 'unknown' else 'wav'}", audio_bytes
+    return "audio.flac", encode_audio(samples, sample_rate, "flac")
@@ -0,0 +1,47 @@
+"""
+Process folders of scanned bills (and .txt transfer descriptions) in bulk.
+
+Results are appended to an NDJSON file as each item completes; running the
+same command again after an interruption skips the items already in it:
+
+    python batch_process.py scans/2025-01/ --output results.ndjson --workers 8 --rate 5
+"""
+import argparse
+import json
+import sys
+
+from dotenv import load_dotenv
+
+from zgs_backend import PaymentProcessingAgent, run_batch
+from zgs_backend.src.zgs_backend.batch import DEFAULT_RATE, DEFAULT_WORKERS, items_from_paths
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Batch-process bill images and transfer descriptions")
+    parser.add_argument("paths", nargs="+", help="Image/.txt files or folders")
+    parser.add_argument("--output", default="batch_results.ndjson", help="NDJSON results file, also the resume checkpoint")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Items processed at once")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Max items started per second (0 = unlimited)")
+    parser.add_argument("--fused", action="store_true", help="Read bills with a single vision call")
+    parser.add_argument("--quiet", action="store_true", help="Do not echo records to stdout")
+    args = parser.parse_args()
+
+    agent = PaymentProcessingAgent(use_pipeline=True, fused_ocr=args.fused)
+    ok = failed = 0
+    for record in run_batch(agent, items_from_paths(args.paths), workers=args.workers, rate=args.rate,
+                            checkpoint=args.output):
+        if record["status"] == "ok":
+            ok += 1
+        else:
+            failed += 1
+        if not args.quiet:
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+
+    print(f"Done: {ok} ok, {failed} failed -> {args.output}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Accuracy and latency regression runner over the labelled corpus in benchmarks/corpus.
+
+Each corpus file is one case:
+
+    {"kind": "bill_text",     "input": "<bill text>",       "expected": {...}}   -> parse_bill_text
+    {"kind": "transfer_text", "input": "<transfer text>",   "expected": {...}}   -> extract_transfer_info
+    {"kind": "bill_image",    "image": "<path from root>",  "expected": {...}}   -> full image pipeline
+
+Every case is run under each configuration with a cold result cache, and the
+report gives field accuracy, latency, tokens and estimated cost per
+configuration and input kind. With --min-accuracy the cheapest configuration
+that still meets the bar is named:
+
+    python benchmarks/corpus_benchmark.py --min-accuracy 0.95
+    python benchmarks/corpus_benchmark.py --configs default fused --config small=ZGS_OCR_MAX_SIDE=768,fused=1
+    python benchmarks/corpus_benchmark.py --stub            # latency only, canned answers
+
+Results are written to benchmarks/results/corpus_<timestamp>_<commit>.json.
+"""
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from run_benchmarks import RESULTS_DIR, ROOT, git_commit
+from scoring import score_fields
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+IMAGE_PROMPT = "Extract payment information from the bill image at '{path}' and give me the formatted payment details"
+
+# Environment overrides per configuration; "fused" switches the image path to the single-call scan
+CONFIGS = {
+    "default": {},
+    "model-only": {"ZGS_LOCAL_EXTRACT": "0"},
+    "fused": {"fused": "1"},
+    "image-1024": {"ZGS_OCR_MAX_SIDE": "1024"},
+    "no-preprocess": {"ZGS_OCR_PREPROCESS": "0"},
+    "gpt-4.1-mini": {"ZGS_MODEL": "gpt-4.1-mini"},
+}
+
+
+def load_corpus(corpus_dir: Path) -> list:
+    """Read every case file; image paths are relative to the repository root."""
+    cases = []
+    for case_file in sorted(corpus_dir.glob("*.json")):
+        case = json.loads(case_file.read_text(encoding="utf-8"))
+        case["name"] = case_file.stem
+        if "image" in case:
+            case["image"] = str(ROOT / case["image"])
+        cases.append(case)
+    return cases
+
+
+def parse_config(spec: str) -> tuple:
+    """Parse 'name=KEY=VALUE,KEY=VALUE' into (name, overrides)."""
+    name, _, settings = spec.partition("=")
+    overrides = dict(part.split("=", 1) for part in settings.split(",") if part)
+    return name, overrides
+
+
+def run_case(agent, case: dict, fused: bool) -> dict:
+    """Run one case from a cold cache; return its extracted fields (None on failure) and trace."""
+    from zgs_backend import result_cache, transfer_semantic_cache
+    from zgs_backend.src.zgs_backend.converter_tool import extract_transfer_info
+    from zgs_backend.src.zgs_backend.scheduled_payment_tool import parse_bill_text
+    from zgs_backend.src.zgs_backend.telemetry import request_trace
+
+    result_cache.clear()
+    transfer_semantic_cache.clear()
+    start = time.perf_counter()
+    fields = None
+    with request_trace() as trace:
+        try:
+            if case["kind"] == "bill_text":
+                fields = json.loads(parse_bill_text.invoke({"raw_text": case["input"]}))
+            elif case["kind"] == "transfer_text":
+                fields = json.loads(extract_transfer_info.invoke({"text": case["input"]}))
+            else:
+                result = agent.run_pipeline(IMAGE_PROMPT.format(path=case["image"]), fused_ocr=fused)
+                if result is not None:
+                    fields = json.loads(result["final_answer"])["payment_request"]
+        except Exception as e:
+            print(f"  {case['name']}: {type(e).__name__}: {e}", file=sys.stderr)
+    return {"seconds": time.perf_counter() - start, "fields": fields, "trace": trace.summary()}
+
+
+def evaluate(agent, cases: list, overrides: dict, runs: int) -> dict:
+    """Run all cases under one configuration and aggregate the results per input kind."""
+    overrides = dict(overrides)
+    fused = overrides.pop("fused", "0") == "1"
+    saved = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    try:
+        outcomes = [(case, run_case(agent, case, fused)) for case in cases for _ in range(runs)]
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    report = {"kinds": {}, "fields": {}}
+    for kind in sorted({case["kind"] for case in cases}) + ["all"]:
+        selected = [(case, outcome) for case, outcome in outcomes if kind in ("all", case["kind"])]
+        matched = scored = failures = 0
+        for case, outcome in selected:
+            fields = score_fields(case["expected"], outcome["fields"] or {})
+            failures += outcome["fields"] is None
+            matched += sum(fields.values())
+            scored += len(fields)
+            if kind == "all":
+                for field, ok in fields.items():
+                    report["fields"].setdefault(field, []).append(ok)
+        latencies = sorted(outcome["seconds"] * 1000 for _, outcome in selected)
+        tokens = [sum(outcome["trace"]["tokens"].values()) for _, outcome in selected]
+        report["kinds"][kind] = {
+            "cases": len(selected),
+            "failures": failures,
+            "field_accuracy": round(matched / scored, 3) if scored else None,
+            "p50_ms": round(statistics.median(latencies), 1),
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 1),
+            "mean_tokens": round(statistics.mean(tokens), 1),
+            "cost_usd": round(sum(outcome["trace"]["cost_usd"] for _, outcome in selected), 6),
+        }
+    report["fields"] = {field: round(sum(oks) / len(oks), 3) for field, oks in report["fields"].items()}
+    return report
+
+
+def cheapest(reports: dict, min_accuracy: float):
+    """Name of the lowest-cost (then fastest) configuration meeting the accuracy bar, or None."""
+    eligible = [(stats["kinds"]["all"]["cost_usd"], stats["kinds"]["all"]["p50_ms"], name)
+                for name, stats in reports.items()
+                if (stats["kinds"]["all"]["field_accuracy"] or 0) >= min_accuracy]
+    return min(eligible)[2] if eligible else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Field accuracy, latency and cost per configuration over the labelled corpus")
+    parser.add_argument("--corpus", type=Path, default=CORPUS_DIR)
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS), help=f"Built-in configurations: {', '.join(CONFIGS)}")
+    parser.add_argument("--config", action="append", default=[], metavar="NAME=KEY=VALUE,...",
+                        help="Extra configuration, e.g. small=ZGS_OCR_MAX_SIDE=768,fused=1")
+    parser.add_argument("--runs", type=int, default=1, help="Runs per case and configuration")
+    parser.add_argument("--min-accuracy", type=float, help="Accuracy bar for picking the cheapest configuration")
+    parser.add_argument("--stub", action="store_true", help="Use the local stub model server")
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--output", type=Path, help="Results file (default: benchmarks/results/corpus_<timestamp>_<commit>.json)")
+    args = parser.parse_args()
+
+    configs = {name: CONFIGS[name] for name in args.configs}
+    configs.update(parse_config(spec) for spec in args.config)
+
+    stub = None
+    if args.stub:
+        from stub_openai_server import serve
+
+        stub = serve(args.stub_port, args.latency_ms)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+        os.environ.update(OPENAI_BASE_URL=f"http://127.0.0.1:{args.stub_port}/v1", OPENAI_API_KEY="stub")
+
+    from zgs_backend import PaymentProcessingAgent
+
+    agent = PaymentProcessingAgent(use_pipeline=True)
+    cases = load_corpus(args.corpus)
+    reports = {}
+    for name, overrides in configs.items():
+        reports[name] = evaluate(agent, cases, overrides, args.runs)
+        print(f"{name}:")
+        for kind, stats in reports[name]["kinds"].items():
+            print(f"  {kind:>13}: " + ", ".join(f"{key}={value}" for key, value in stats.items()))
+
+    if stub is not None:
+        stub.shutdown()
+
+    summary = {"commit": git_commit(), "timestamp": datetime.now().isoformat(timespec="seconds"),
+               "corpus": [case["name"] for case in cases], "runs": args.runs, "configs": configs, "results": reports}
+    if args.min_accuracy is not None:
+        summary["min_accuracy"] = args.min_accuracy
+        summary["cheapest"] = cheapest(reports, args.min_accuracy)
+        print(f"\nCheapest configuration with field accuracy >= {args.min_accuracy}: {summary['cheapest'] or 'none'}")
+
+    output = args.output or RESULTS_DIR / f"corpus_{datetime.now():%Y-%m-%dT%H-%M-%S}_{summary['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compare the two-step bill path (extract_text_from_image -> parse_bill_text)
+with the fused single-call scan (extract_payment_info_from_image).
+
+Every labelled bill in benchmarks/labels is run through both paths of the
+payment pipeline with the result cache cleared before each run, and the
+script prints mean latency and field accuracy per path:
+
+    python benchmarks/fused_ocr_benchmark.py --runs 3          # real model
+    python benchmarks/fused_ocr_benchmark.py --stub            # latency only, canned answers
+"""
+from pathlib import Path
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from scoring import score_fields
+
+ROOT = Path(__file__).resolve().parent.parent
+LABELS_DIR = Path(__file__).resolve().parent / "labels"
+
+PROMPT = "Extract payment information from the bill image at '{path}' and give me the formatted payment details"
+
+
+def load_labels(labels_dir: Path) -> list:
+    """Read every label file; image paths are relative to the repository root."""
+    labels = []
+    for label_file in sorted(labels_dir.glob("*.json")):
+        label = json.loads(label_file.read_text(encoding="utf-8"))
+        label["image"] = str(ROOT / label["image"])
+        label["name"] = label_file.stem
+        labels.append(label)
+    return labels
+
+
+def run_once(agent, image_path: str, fused: bool) -> tuple:
+    """Run the pipeline once from a cold cache; return (seconds, payment_request or None)."""
+    from zgs_backend import result_cache
+
+    result_cache.clear()
+    start = time.perf_counter()
+    result = agent.run_pipeline(PROMPT.format(path=image_path), verbose=False, fused_ocr=fused)
+    elapsed = time.perf_counter() - start
+    if result is None:
+        return elapsed, None
+    return elapsed, json.loads(result["final_answer"])["payment_request"]
+
+
+def benchmark(agent, labels: list, runs: int) -> dict:
+    """Return latency and accuracy per path over all labels and runs."""
+    report = {}
+    for path_name, fused in (("two_step", False), ("fused", True)):
+        latencies, matched, scored, failures = [], 0, 0, 0
+        for label in labels:
+            for _ in range(runs):
+                elapsed, payment = run_once(agent, label["image"], fused)
+                latencies.append(elapsed)
+                if payment is None:
+                    failures += 1
+                    scored += len(label["expected"])
+                    continue
+                fields = score_fields(label["expected"], payment)
+                matched += sum(fields.values())
+                scored += len(fields)
+
+        report[path_name] = {
+            "runs": len(latencies),
+            "failures": failures,
+            "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+            "median_ms": round(statistics.median(latencies) * 1000, 1),
+            "field_accuracy": round(matched / scored, 3) if scored else None,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fused vs two-step bill OCR")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per labelled bill and path")
+    parser.add_argument("--labels", type=Path, default=LABELS_DIR)
+    parser.add_argument("--stub", action="store_true", help="Use the local stub model server")
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    args = parser.parse_args()
+
+    stub = None
+    if args.stub:
+        from stub_openai_server import serve
+
+        stub = serve(args.stub_port, args.latency_ms)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+        os.environ.update(OPENAI_BASE_URL=f"http://127.0.0.1:{args.stub_port}/v1", OPENAI_API_KEY="stub")
+
+    sys.path.insert(0, str(ROOT))
+    from zgs_backend import PaymentProcessingAgent
+
+    labels = load_labels(args.labels)
+    report = benchmark(PaymentProcessingAgent(use_pipeline=True), labels, args.runs)
+    for path_name, stats in report.items():
+        print(f"{path_name:>8}: " + ", ".join(f"{key}={value}" for key, value in stats.items()))
+
+    if stub is not None:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Concurrency load test for the Flask (app.py) and ASGI (app_async.py) backends.
+
+Starts the stub model server plus both apps pointed at it, fires the same
+number of concurrent /upload-audio requests at each and prints throughput
+and latency, e.g.:
+
+    python benchmarks/load_test.py --requests 400 --concurrency 200 --latency-ms 500
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from stub_openai_server import serve
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TARGETS = {
+    "flask": ([sys.executable, "-c", "from app import app; app.run(port={port}, threaded=True)"], 2137),
+    "asgi": ([sys.executable, "-m", "uvicorn", "app_async:app", "--port", "{port}", "--log-level", "warning"], 2138),
+}
+
+
+def start_target(name: str, stub_port: int, **env_overrides: str) -> subprocess.Popen:
+    """Start one of the backends in a subprocess, pointed at the stub model server."""
+    command, port = TARGETS[name]
+    env = dict(
+        os.environ,
+        OPENAI_BASE_URL=f"http://127.0.0.1:{stub_port}/v1",
+        OPENAI_API_KEY="stub",
+        WHISPER_API="stub",
+        **env_overrides,
+    )
+    return subprocess.Popen(
+        [part.format(port=port) for part in command],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_until_up(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def latency_stats(latencies: list, elapsed: float, errors: int) -> dict:
+    """Throughput and p50/p95/p99/max latency for a finished run."""
+    latencies = sorted(latencies)
+
+    def percentile(q: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(latencies[-1] * 1000, 1),
+    }
+
+
+async def run_load(url: str, total: int, concurrency: int, payload: dict = None) -> dict:
+    """Send `total` requests with at most `concurrency` in flight; return latency stats."""
+    payload = payload or {"audio": "UklGRiQAAABXQVZF"}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=300.0) as client:
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(url, json=payload)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return latency_stats(latencies, elapsed, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Flask and ASGI backends under concurrent load")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), choices=list(TARGETS))
+    args = parser.parse_args()
+
+    stub = serve(args.stub_port, args.latency_ms)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    for name in args.targets:
+        process = start_target(name, args.stub_port)
+        url = f"http://127.0.0.1:{TARGETS[name][1]}/upload-audio"
+        try:
+            asyncio.run(wait_until_up(url))
+            stats = asyncio.run(run_load(url, args.requests, args.concurrency))
+        finally:
+            process.terminate()
+            process.wait()
+
+        print(f"{name:>6}: " + ", ".join(f"{key}={value}" for key, value in stats.items()))
+
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+End-to-end benchmark suite run against the local stub model server.
+
+Measures throughput and p50/p95/p99 latency for:
+
+    upload-image    POST /upload-image on the Flask app (bill image, pipeline)
+    upload-audio    POST /upload-audio on the Flask app (FLAC speech -> transfer)
+    agent-text      PaymentProcessingAgent.process_request, transfer text, pipeline
+    agent-image     PaymentProcessingAgent.process_request, bill image, pipeline
+    agent-planner   PaymentProcessingAgent.process_request, transfer text, LLM planner loop
+
+Results are written to benchmarks/results/<timestamp>_<commit>.json; pass
+--baseline with an earlier file to print the change per scenario:
+
+    python benchmarks/run_benchmarks.py --requests 100 --concurrency 20 --latency-ms 200
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results/2025-01-10T12-00-00_ab12cd3.json
+
+The result cache is off unless --cache is given, so every request reaches the stub.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(Path(__file__).resolve().parent), str(ROOT)]
+from load_test import TARGETS, latency_stats, run_load, start_target, wait_until_up
+from stub_openai_server import serve
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+BILL_IMAGE = ROOT / "zgs_backend" / "src" / "zgs_backend" / "rachuneczek.png"
+
+TRANSFER_TEXT = "Przelej 1000 zł Damianowi Hujcikowi na konto 45 1090 1014 0000 0712 1981 2874, tytuł mister griddy winna"
+IMAGE_PROMPT = f"Extract payment information from the bill image at '{BILL_IMAGE}' and give me the formatted payment details"
+
+HTTP_SCENARIOS = ("upload-image", "upload-audio")
+AGENT_SCENARIOS = ("agent-text", "agent-image", "agent-planner")
+
+
+def speech_sample() -> str:
+    """Two seconds of a FLAC-encoded tone, base64 encoded like the frontend upload."""
+    import numpy as np
+    from audio_codecs import encode_audio
+
+    t = np.arange(32_000) / 16_000
+    samples = (0.2 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    return base64.b64encode(encode_audio(samples, 16_000, "flac")).decode("ascii")
+
+
+def http_payload(scenario: str) -> dict:
+    if scenario == "upload-image":
+        return {"image_base64": base64.b64encode(BILL_IMAGE.read_bytes()).decode("ascii")}
+    return {"audio": speech_sample()}
+
+
+def run_http(scenarios, stub_port: int, total: int, concurrency: int, cache: bool) -> dict:
+    """Benchmark the Flask endpoints in a subprocess, as deployed."""
+    results = {}
+    env = {} if cache else {"ZGS_CACHE_BACKEND": "off"}
+    process = start_target("flask", stub_port, **env)
+    base_url = f"http://127.0.0.1:{TARGETS['flask'][1]}"
+    try:
+        asyncio.run(wait_until_up(f"{base_url}/cache-stats"))
+        for scenario in scenarios:
+            results[scenario] = asyncio.run(run_load(f"{base_url}/{scenario}", total, concurrency, http_payload(scenario)))
+    finally:
+        process.terminate()
+        process.wait()
+    return results
+
+
+def run_agent(scenarios, total: int, concurrency: int) -> dict:
+    """Benchmark process_request in this process with `concurrency` threads."""
+    from zgs_backend import PaymentProcessingAgent
+
+    agents = {
+        "agent-text": (PaymentProcessingAgent(use_pipeline=True), TRANSFER_TEXT),
+        "agent-image": (PaymentProcessingAgent(use_pipeline=True), IMAGE_PROMPT),
+        "agent-planner": (PaymentProcessingAgent(use_pipeline=False), TRANSFER_TEXT),
+    }
+    results = {}
+    for scenario in scenarios:
+        agent, prompt = agents[scenario]
+        errors = 0
+
+        def one(_):
+            nonlocal errors
+            start = time.perf_counter()
+            try:
+                if not agent.process_request(prompt)["success"]:
+                    errors += 1
+            except Exception:
+                errors += 1
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(one, range(total)))
+        results[scenario] = latency_stats(latencies, time.perf_counter() - start, errors)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline_path: Path) -> None:
+    """Print p50/p95/throughput change per scenario against an earlier results file."""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["scenarios"]
+    print(f"\nChange vs {baseline_path.name}:")
+    for scenario, stats in current.items():
+        before = baseline.get(scenario)
+        if not before:
+            continue
+        deltas = []
+        for key in ("p50_ms", "p95_ms", "throughput_rps"):
+            if before.get(key):
+                deltas.append(f"{key} {(stats[key] - before[key]) / before[key] * 100:+.1f}%")
+        print(f"  {scenario:>14}: " + ", ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the payment backend against a stub model server")
+    parser.add_argument("--scenarios", nargs="+", default=list(HTTP_SCENARIOS + AGENT_SCENARIOS),
+                        choices=list(HTTP_SCENARIOS + AGENT_SCENARIOS))
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache on")
+    parser.add_argument("--output", type=Path, help="Results file (default: benchmarks/results/<timestamp>_<commit>.json)")
+    parser.add_argument("--baseline", type=Path, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    stub = serve(args.stub_port, args.latency_ms, args.jitter_ms, args.completion_tokens)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    os.environ.update(OPENAI_BASE_URL=f"http://127.0.0.1:{args.stub_port}/v1", OPENAI_API_KEY="stub", WHISPER_API="stub")
+    if not args.cache:
+        os.environ["ZGS_CACHE_BACKEND"] = "off"
+
+    scenarios = {}
+    http = [s for s in args.scenarios if s in HTTP_SCENARIOS]
+    if http:
+        scenarios.update(run_http(http, args.stub_port, args.requests, args.concurrency, args.cache))
+    agent = [s for s in args.scenarios if s in AGENT_SCENARIOS]
+    if agent:
+        scenarios.update(run_agent(agent, args.requests, args.concurrency))
+    stub.shutdown()
+
+    for scenario, stats in scenarios.items():
+        print(f"{scenario:>14}: " + ", ".join(f"{key}={value}" for key, value in stats.items()))
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "scenarios": scenarios,
+    }
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y-%m-%dT%H-%M-%S}_{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        compare(scenarios, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
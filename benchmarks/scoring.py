@@ -0,0 +1,40 @@
+"""
+Field-level scoring of extracted payment data against hand-labelled answers.
+
+Labels are JSON files with an "expected" object holding any of the payment
+fields; fields missing from a label are not scored.
+"""
+from typing import Any, Dict
+import re
+import unicodedata
+
+
+def _normalize_text(value: Any) -> str:
+    text = unicodedata.normalize("NFKC", str(value or "")).casefold()
+    return re.sub(r"[\s.,:;\"'()]+", " ", text).strip()
+
+
+def _digits(value: Any) -> str:
+    return re.sub(r"\D", "", str(value or ""))
+
+
+def field_matches(field: str, expected: Any, actual: Any) -> bool:
+    """
+    Compare one extracted field with its label.
+
+    Amounts must agree to the grosz, account numbers on their digits only,
+    and text fields after case, whitespace and punctuation normalisation.
+    """
+    if field == "amount":
+        try:
+            return abs(float(expected) - float(actual)) < 0.01
+        except (TypeError, ValueError):
+            return False
+    if field == "bank_account":
+        return _digits(expected) == _digits(actual)
+    return _normalize_text(expected) == _normalize_text(actual)
+
+
+def score_fields(expected: Dict[str, Any], actual: Dict[str, Any]) -> Dict[str, bool]:
+    """Return {field: matched} for every labelled field."""
+    return {field: field_matches(field, value, actual.get(field)) for field, value in expected.items()}
@@ -0,0 +1,196 @@
+"""
+Local OpenAI-compatible stub used by the load tests and benchmarks.
+
+Serves /v1/chat/completions and /v1/audio/transcriptions with canned answers
+after a configurable delay, so the backend can be exercised without network
+access or token cost. Point the apps at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub WHISPER_API=stub
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import random
+import re
+import time
+import uuid
+
+
+CANNED_OUTPUTS = {
+    "TransferInfo": {
+        "receiver": "Damian Hujcik",
+        "address": "Wałbrzych 15",
+        "title": "mister griddy winna",
+        "amount": 1000.0,
+        "bank_account": "45 1090 1014 0000 0712 1981 2874",
+    },
+    "PaymentInfo": {
+        "receiver": "NetCom Sp. z o.o.",
+        "address": "Aleje Jerozolimskie 100, 02-001 Warszawa",
+        "title": "FV 2025/01/5678 NK-445566",
+        "amount": 89.99,
+        "bank_account": "45 1090 1014 0000 0712 1981 2874",
+        "schedule": "immediate",
+    },
+    "RawTextOutput": {
+        "raw_text": "NETCOM INTERNET\nNetCom Sp. z o.o.\nAleje Jerozolimskie 100\n02-001 Warszawa\n"
+                    "FAKTURA VAT Nr: 2025/01/5678\nTermin płatności: NATYCHMIAST\n"
+                    "Do zapłaty: 89.99 PLN\nNumer konta: 45 1090 1014 0000 0712 1981 2874\n"
+                    "Tytuł przelewu: FV 2025/01/5678 NK-445566\nOdbiorca: NetCom Sp. z o.o.",
+    },
+}
+
+CANNED_OUTPUTS["BillScanResult"] = dict(CANNED_OUTPUTS["PaymentInfo"], raw_text=CANNED_OUTPUTS["RawTextOutput"]["raw_text"])
+
+CANNED_TRANSCRIPT = "Przelej 1000 zł Damianowi Hujcikowi na konto 45 1090 1014 0000 0712 1981 2874, tytuł mister griddy winna"
+
+IMAGE_PATH = re.compile(r"'([^']+\.(?:png|jpe?g|webp|gif|bmp|tiff?))'", re.IGNORECASE)
+
+
+class StubConfig:
+    latency_ms: float = 300.0
+    jitter_ms: float = 50.0
+    completion_tokens: int = 60
+    error_rate: float = 0.0  # share of requests answered with 429/503, to exercise retries
+
+
+def _planner_step(body: dict) -> dict:
+    """Walk the agent through Workflow A or B, one tool per call, like the real planner."""
+    messages = body.get("messages", [])
+    user_text = next((str(m.get("content")) for m in messages if m.get("role") == "user"), "")
+    done = [m for m in messages if m.get("role") == "tool"]
+    image_path = IMAGE_PATH.search(user_text)
+    if image_path:
+        workflow = ["extract_text_from_image", "parse_bill_text", "format_payment_message"]
+    else:
+        workflow = ["extract_transfer_info", "format_payment_message"]
+
+    if len(done) >= len(workflow):
+        return {"role": "assistant", "content": done[-1].get("content", "done")}
+
+    name = workflow[len(done)]
+    previous = done[-1].get("content", "") if done else ""
+    if name == "extract_text_from_image":
+        args = {"image_path": image_path.group(1)}
+    elif name == "parse_bill_text":
+        args = {"raw_text": json.loads(previous)["raw_text"]}
+    elif name == "extract_transfer_info":
+        args = {"text": user_text}
+    else:
+        args = {"payment_data": previous}
+    return _tool_call_message(name, args)
+
+
+def _tool_call_message(name: str, args: dict) -> dict:
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [{
+            "id": f"call_{uuid.uuid4().hex[:24]}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(args, ensure_ascii=False)},
+        }],
+    }
+
+
+def chat_completion(body: dict) -> dict:
+    """Build a chat completion response for a request body."""
+    tool_choice = body.get("tool_choice")
+    response_format = body.get("response_format") or {}
+
+    if isinstance(tool_choice, dict):
+        name = tool_choice["function"]["name"]
+        message = _tool_call_message(name, CANNED_OUTPUTS.get(name, {}))
+    elif response_format.get("type") == "json_schema":
+        name = response_format["json_schema"]["name"]
+        message = {"role": "assistant", "content": json.dumps(CANNED_OUTPUTS.get(name, {}), ensure_ascii=False)}
+    elif body.get("tools"):
+        message = _planner_step(body)
+    else:
+        message = {"role": "assistant", "content": "OK"}
+
+    prompt_tokens = len(json.dumps(body)) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": StubConfig.completion_tokens,
+            "total_tokens": prompt_tokens + StubConfig.completion_tokens,
+        },
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+
+        delay = StubConfig.latency_ms + random.uniform(-StubConfig.jitter_ms, StubConfig.jitter_ms)
+        time.sleep(max(delay, 0) / 1000)
+
+        if random.random() < StubConfig.error_rate:
+            status = random.choice((429, 503))
+            data = json.dumps({"error": {"message": "stub overload", "type": "server_error"}}).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        if self.path.endswith("/chat/completions"):
+            payload = chat_completion(json.loads(raw))
+        elif self.path.endswith("/audio/transcriptions"):
+            payload = {"text": CANNED_TRANSCRIPT}
+        else:
+            self.send_error(404)
+            return
+
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def serve(port: int = 8765, latency_ms: float = 300.0, jitter_ms: float = 50.0,
+          completion_tokens: int = 60, error_rate: float = 0.0) -> StubServer:
+    """Create the stub server (call serve_forever() on the result)."""
+    StubConfig.error_rate = error_rate
+    StubConfig.latency_ms = latency_ms
+    StubConfig.jitter_ms = jitter_ms
+    StubConfig.completion_tokens = completion_tokens
+    return StubServer(("127.0.0.1", port), StubHandler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub model server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 429/503")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency_ms, args.jitter_ms, args.completion_tokens, args.error_rate)
+    print(f"Stub OpenAI server on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
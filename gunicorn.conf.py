@@ -0,0 +1,93 @@
+"""
+Production server for app.py:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app (agent, tool chains, HTTP pools) is imported once in the parent and
+shared copy-on-write by ZGS_WORKERS pre-forked worker processes, each serving
+ZGS_THREADS requests at a time. Background threads (model warm-ups, payment
+scheduler) are started in every worker after the fork; the payment scheduler
+only dispatches in the worker holding its leader lock file, and the others
+take over if that worker exits. Contacts live in the shared ZGS_CONTACTS_DB,
+so an edit made through one worker is seen by all of them.
+
+On SIGTERM a worker first drains: /readyz answers 503 while it keeps serving
+for ZGS_DRAIN_SECONDS, so the load balancer stops routing to it. It then
+stops accepting connections and in-flight requests finish; the whole
+shutdown gets ZGS_GRACEFUL_TIMEOUT seconds. SIGHUP reloads the workers.
+"""
+import glob
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import threading
+
+# Tells app.py to leave its background threads to post_fork
+os.environ["ZGS_PRELOAD"] = "1"
+
+# Workers keep their Prometheus samples in this directory and /metrics aggregates them.
+# It has to be set before prometheus_client is imported, i.e. before the app is loaded.
+owns_metrics_dir = "PROMETHEUS_MULTIPROC_DIR" not in os.environ
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="zgs-metrics-"))
+os.makedirs(metrics_dir, exist_ok=True)
+for stale in glob.glob(os.path.join(metrics_dir, "*.db")):
+    os.remove(stale)
+
+bind = os.getenv("ZGS_BIND", "0.0.0.0:2137")
+workers = int(os.getenv("ZGS_WORKERS", str(multiprocessing.cpu_count())))
+# Requests mostly wait on the model provider, so each worker also runs a thread pool
+worker_class = "gthread"
+threads = int(os.getenv("ZGS_THREADS", "8"))
+preload_app = True
+
+# Model calls are bounded by ZGS_CALL_DEADLINE; give workers some slack beyond it
+timeout = int(os.getenv("ZGS_WORKER_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("ZGS_GRACEFUL_TIMEOUT", "30"))
+# Part of graceful_timeout spent reporting not ready before the worker stops accepting connections
+drain_seconds = float(os.getenv("ZGS_DRAIN_SECONDS", "5"))
+keepalive = 5
+# Recycle workers after this many requests (0 = never), jittered so they do not restart together
+max_requests = int(os.getenv("ZGS_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv("ZGS_ACCESS_LOG", "-")
+
+
+def post_fork(server, worker):
+    import app
+
+    app.start_background_tasks()
+
+
+def post_worker_init(worker):
+    import app
+
+    # Runs after the worker installed its own signal handlers; stop_accepting is its SIGTERM handler
+    stop_accepting = signal.getsignal(signal.SIGTERM)
+
+    def drain(signum, frame):
+        app.shutting_down.set()
+        threading.Timer(drain_seconds, stop_accepting, (signum, frame)).start()
+
+    signal.signal(signal.SIGTERM, drain)
+
+
+def worker_exit(server, worker):
+    import app
+
+    app.shutdown()
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    if owns_metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
@@ -1,6 +1,7 @@
 import time
 import speech_recognition as sr
 import logging
+from asr_backends import get_asr_backend
 
 log =logging.getLogger(__name__)
 log_format = '[%(asctime)s] [%(levelname)s] - %(message)s'
@@ -9,6 +10,8 @@ logging.basicConfig(level=logging.INFO, format=log_format)
 if __name__ == "__main__":
     r = sr.Recognizer()
     m = sr.Microphone(sample_rate=8000)
+    # Load the local Whisper model once; it stays warm for every phrase
+    asr = get_asr_backend(backend="local")
 
     log.log(logging.INFO, msg="Starting listening with microphone...")
     try:
@@ -16,7 +19,7 @@ if __name__ == "__main__":
             r.adjust_for_ambient_noise(source)
             log.log(logging.INFO, msg="Started recording")
             phrase = r.listen(source=source, timeout=5, phrase_time_limit=20)
-            transcription = r.recognize_whisper(phrase, model="large", language="polish")
+            transcription = asr.transcribe(phrase.get_wav_data())
 
     except sr.WaitTimeoutError:
         log.log(level=logging.ERROR, msg=f"Recording timed out.")
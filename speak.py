@@ -1,14 +1,10 @@
-from gtts import gTTS
-import os
-from playsound import playsound
+from tts import speak_stream
 
 def speak_polish(text, remove=True):
     print("working...")
-    tts = gTTS(text=text, lang='pl', timeout=10)
-    tts.save("audio_tmp.mp3")
-    playsound("audio_tmp.mp3")
-    if remove:
-        os.remove("audio_tmp.mp3")
+    # remove=True: one-off text (e.g. with an IBAN) is played and not kept in the phrase cache
+    # Streamed: long readouts start playing with the first synthesised chunk
+    speak_stream(text, 'pl', cache=not remove)
 
 # Example usage
-speak_polish("Wystawiam zlecenie cylkiczne dla: Maciej Ziaja, IBAN PL 1 0 1 1 2 1 3 7 6 9, o wysokości 300 dolarów ugandyjskich")
\ No newline at end of file
+speak_polish("Wystawiam zlecenie cylkiczne dla: Maciej Ziaja, IBAN PL 1 0 1 1 2 1 3 7 6 9, o wysokości 300 dolarów ugandyjskich")
@@ -1,10 +1,11 @@
+import asyncio
 import os
 import sys
-import tempfile
-from contextlib import contextmanager
-import sounddevice as sd
-import soundfile as sf
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from asr_backends import ASRBackend, get_asr_backend
+from audio_codecs import encode_audio, prepare_for_asr
+from zgs_backend.src.zgs_backend.call_policy import CALL_TIMEOUT, ModelCallError, acall_model
 
 import dotenv
 dotenv.load_dotenv()
@@ -12,98 +13,106 @@ dotenv.load_dotenv()
 SAMPLE_RATE = 16_000  # 16 kHz is sufficient for speech and works well with OpenAI models
 CHANNELS = 1
 DEFAULT_RECORD_SECONDS = 8
-
-
-@contextmanager
-def temporary_wav_file():
-    """Context manager that yields a temporary WAV file path and cleans it up afterwards."""
-    fd, path = tempfile.mkstemp(suffix=".wav")
-    os.close(fd)  # We will reopen it via soundfile
-    try:
-        yield path
-    finally:
-        try:
-            os.remove(path)
-        except OSError:
-            pass
+UPLOAD_ENCODING = os.getenv("VOICE_UPLOAD_ENCODING", "flac")  # wav16 | flac | opus
 
 
 def record_audio(duration: int) -> bytes:
     """
     Record audio from the default microphone for the given duration (in seconds).
 
-    Returns the path to a temporary WAV file containing the recording.
+    Returns the recording encoded in memory as UPLOAD_ENCODING (16-bit FLAC by default).
     """
+    # Imported here so servers that only receive uploads don't need PortAudio
+    import sounddevice as sd
+
     print(f"\nRecording for {duration} seconds... Speak now.")
     try:
         recording = sd.rec(
             int(duration * SAMPLE_RATE),
             samplerate=SAMPLE_RATE,
             channels=CHANNELS,
-            dtype="float32",
+            dtype="int16",
         )
         sd.wait()  # Wait until recording is finished
     except Exception as e:
         print(f"Error while recording audio: {e}")
         return None
 
-    with temporary_wav_file() as wav_path:
-        try:
-            sf.write(wav_path, recording, SAMPLE_RATE)
-        except Exception as e:
-            print(f"Error while saving WAV file: {e}")
-            return None
-
-        # Read back the file contents as bytes to send to OpenAI
-        try:
-            with open(wav_path, "rb") as f:
-                audio_bytes = f.read()
-        except Exception as e:
-            print(f"Error while reading WAV file: {e}")
-            return None
-
-    return audio_bytes
+    try:
+        return encode_audio(recording, SAMPLE_RATE, UPLOAD_ENCODING)
+    except Exception as e:
+        print(f"Error while encoding audio: {e}")
+        return None
 
 
-def create_openai_client() -> OpenAI:
-    """
-    Create an OpenAI client using the OPENAI_API_KEY environment variable.
-    """
+def _require_api_key() -> str:
     api_key = os.getenv("WHISPER_API")
     if not api_key:
         print("Error: OPENAI_API_KEY environment variable is not set.")
         print("Please set it, e.g.:")
         print("  export OPENAI_API_KEY='your_api_key_here'")
         sys.exit(1)
+    return api_key
 
-    return OpenAI(api_key=api_key)
 
+def create_openai_client() -> OpenAI:
+    """
+    Create an OpenAI client using the OPENAI_API_KEY environment variable.
+    """
+    # Retries and backoff are done by call_policy, not the SDK
+    return OpenAI(api_key=_require_api_key(), timeout=CALL_TIMEOUT, max_retries=0)
 
-def transcribe_audio(client: OpenAI, audio_bytes: bytes) -> str:
+
+def create_async_openai_client() -> AsyncOpenAI:
+    """
+    Create an AsyncOpenAI client for the async (ASGI) request path.
+    """
+    return AsyncOpenAI(api_key=_require_api_key(), timeout=CALL_TIMEOUT, max_retries=0)
+
+
+def transcribe_audio(client: OpenAI, audio_bytes: bytes, backend: ASRBackend = None) -> str:
     """
-    Send the recorded audio bytes to OpenAI for transcription and return the text.
+    Transcribe the recorded audio bytes and return the text.
+
+    Uses the configured ASR backend (ASR_BACKEND=openai|local, see asr_backends),
+    unless one is passed explicitly.
+
+    Raises:
+        ModelUnavailableError / ModelTimeoutError: The ASR provider failed after
+            retries or missed its deadline (an empty string means no speech)
     """
     if audio_bytes is None:
         return ""
 
-    try:
-        # Use the latest speech-to-text model; adjust if needed in the future.
-        transcription = client.audio.transcriptions.create(
-            model="gpt-4o-transcribe",
-            file=("audio.wav", audio_bytes),
-        )
-        # The response object from the OpenAI Python SDK exposes the text field.
-        return transcription.text.strip()
-    except Exception as e:
-        print(f"Error during transcription: {e}")
+    backend = backend or get_asr_backend(client)
+    return backend.transcribe(audio_bytes)
+
+
+async def atranscribe_audio(client: AsyncOpenAI, audio_bytes: bytes) -> str:
+    """
+    Async variant of transcribe_audio that does not block the event loop.
+    """
+    if audio_bytes is None:
         return ""
 
+    if os.getenv("ASR_BACKEND", "openai") == "local":
+        # The local model is CPU bound; keep it off the event loop
+        return await asyncio.to_thread(get_asr_backend().transcribe, audio_bytes)
+
+    transcription = await acall_model(
+        "gpt-4o-transcribe",
+        client.audio.transcriptions.create,
+        model="gpt-4o-transcribe",
+        file=prepare_for_asr(audio_bytes),
+    )
+    return transcription.text.strip()
+
 
 def main():
     print("=== Voice to Text (OpenAI) ===")
     print("This app records from your default microphone and transcribes speech to text.")
     print("Controls:")
-    print("  - Press Enter to record a short clip.")
+    print("  - Press Enter to record a command; recording stops when you stop talking.")
     print("  - Type 'q' and press Enter to quit.")
 
     # Allow overriding the default recording duration via an environment variable.
@@ -120,6 +129,9 @@ def main():
     else:
         duration = DEFAULT_RECORD_SECONDS
 
+    # "stream" ends the recording when the user stops talking, "fixed" records `duration` seconds
+    capture_mode = os.getenv("VOICE_CAPTURE_MODE", "stream")
+
     client = create_openai_client()
 
     while True:
@@ -128,12 +140,20 @@ def main():
             print("Exiting. Goodbye.")
             break
 
-        audio_bytes = record_audio(duration)
-        if audio_bytes is None:
-            continue
-
-        print("Transcribing...")
-        text = transcribe_audio(client, audio_bytes)
+        try:
+            if capture_mode == "stream":
+                from voice_stream import stream_transcribe
+                text = stream_transcribe(client, on_partial=lambda partial: print(f"... {partial}"))
+            else:
+                audio_bytes = record_audio(duration)
+                if audio_bytes is None:
+                    continue
+
+                print("Transcribing...")
+                text = transcribe_audio(client, audio_bytes)
+        except ModelCallError as e:
+            print(f"Error during transcription: {e}")
+            text = ""
 
         if text:
             print("\n--- Transcription ---")
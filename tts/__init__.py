@@ -1 +1,3 @@
-from tts.tts import speak, speak_from_file, save_speech
\ No newline at end of file
+from tts.tts import speak, speak_from_file, save_speech, speak_stream, stream_speech
+from tts.cache import phrase_cache
+from tts.prompts import warm_up
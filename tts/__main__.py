@@ -0,0 +1,12 @@
+import argparse
+
+from tts.cache import phrase_cache
+from tts.prompts import warm_up
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m tts", description="TTS phrase cache tools")
+    parser.add_argument("command", choices=["warmup"], help="warmup: pre-render the static prompt catalogue")
+    args = parser.parse_args()
+
+    count = warm_up()
+    print(f"Rendered {count} prompts into {phrase_cache.directory}")
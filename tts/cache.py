@@ -0,0 +1,74 @@
+import hashlib
+import io
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from gtts import gTTS
+
+DEFAULT_CACHE_DIR = Path(os.getenv("TTS_CACHE_DIR", Path.home() / ".cache" / "zgs_tts"))
+DEFAULT_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 100 * 1024 * 1024))
+# Seconds per gTTS request, so a stalled Google endpoint cannot hang a worker
+GTTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT", "10"))
+
+
+class PhraseCache:
+    """
+    On-disk cache of synthesised phrases keyed by (text, lang, voice).
+
+    Files are named by the hash of the key; their mtime is bumped on every hit and
+    the least recently used files are evicted once the directory exceeds max_bytes.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, text: str, lang: str, voice: str = "com") -> Path:
+        key = hashlib.sha256(f"{lang}\x00{voice}\x00{text}".encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.mp3"
+
+    def get(self, text: str, lang: str, voice: str = "com") -> Optional[Path]:
+        """Return the cached MP3 for a phrase, or None."""
+        path = self.path_for(text, lang, voice)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, text: str, lang: str, voice: str, audio: bytes) -> Path:
+        """Store synthesised MP3 bytes for a phrase and return the file path."""
+        path = self.path_for(text, lang, voice)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(audio)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def render(self, text: str, lang: str, voice: str = "com") -> Path:
+        """Return the MP3 for a phrase, synthesising it with gTTS only on a cache miss."""
+        path = self.get(text, lang, voice)
+        if path is not None:
+            return path
+
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang, tld=voice, timeout=GTTS_TIMEOUT).write_to_fp(buffer)
+        return self.put(text, lang, voice, buffer.getvalue())
+
+    def evict(self) -> None:
+        """Delete least recently used phrases until the cache fits in max_bytes."""
+        with self._lock:
+            files = [(f.stat(), f) for f in self.directory.glob("*.mp3")]
+            total = sum(stat.st_size for stat, _ in files)
+            for stat, f in sorted(files, key=lambda item: item[0].st_mtime):
+                if total <= self.max_bytes:
+                    break
+                f.unlink(missing_ok=True)
+                total -= stat.st_size
+
+
+phrase_cache = PhraseCache()
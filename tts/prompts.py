@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Tuple
+
+from tts.cache import phrase_cache
+
+# Fixed ATM prompts, rendered ahead of time so they play without a network call
+PROMPT_CATALOGUE: Tuple[Tuple[str, str], ...] = (
+    ("Dzień dobry! W czym mogę pomóc?", "pl"),
+    ("Proszę wprowadzić kod PIN.", "pl"),
+    ("Nieprawidłowy kod PIN. Spróbuj ponownie.", "pl"),
+    ("Powiedz, co chcesz zrobić.", "pl"),
+    ("Nie zrozumiałem polecenia. Spróbuj ponownie.", "pl"),
+    ("Czy potwierdzasz tę operację?", "pl"),
+    ("Operacja została zatwierdzona.", "pl"),
+    ("Operacja została anulowana.", "pl"),
+    ("Przelew został zlecony.", "pl"),
+    ("Zlecenie stałe zostało utworzone.", "pl"),
+    ("Proszę zeskanować dokument.", "pl"),
+    ("Analizuję dokument, proszę czekać.", "pl"),
+    ("Dziękujemy, do widzenia!", "pl"),
+    ("Hello! How can I help you?", "en"),
+    ("Please enter your PIN.", "en"),
+    ("Please say your command.", "en"),
+    ("Sorry, I did not understand. Please try again.", "en"),
+    ("Do you confirm this operation?", "en"),
+    ("Your transfer has been ordered.", "en"),
+    ("Thank you, goodbye!", "en"),
+)
+
+
+def warm_up(catalogue: Iterable[Tuple[str, str]] = PROMPT_CATALOGUE, workers: int = 4) -> int:
+    """
+    Pre-render every prompt in the catalogue into the phrase cache.
+
+    Args:
+        catalogue: (text, lang) pairs to render
+        workers: Number of phrases synthesised in parallel
+
+    Returns:
+        Number of prompts now available in the cache
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        paths = list(executor.map(lambda prompt: phrase_cache.render(*prompt), catalogue))
+    return len(paths)
@@ -1,14 +1,30 @@
+import io
 import os
+import queue
+import threading
 from gtts import gTTS
 from pathlib import Path
 from playsound import playsound
+from typing import Iterator
 import random
 import string
 
-def speak(text: str, lang: str) -> None:
+from tts.cache import GTTS_TIMEOUT, phrase_cache
+
+def speak(text: str, lang: str, voice: str = "com", cache: bool = False) -> None:
+    # Cached phrases play straight from disk with no network call; only fixed
+    # prompts should use cache=True (store the result), free text may contain account numbers
+    cached = phrase_cache.get(text, lang, voice)
+    if cached is not None:
+        playsound(str(cached))
+        return
+    if cache:
+        playsound(str(phrase_cache.render(text, lang, voice)))
+        return
+
     random_filename = ''.join(random.choices(string.ascii_letters + string.digits, k=16)) +".mp3"
 
-    tts = gTTS(text=text, lang=lang)
+    tts = gTTS(text=text, lang=lang, tld=voice, timeout=GTTS_TIMEOUT)
     tts.save(random_filename)
     playsound(random_filename)
     try:
@@ -16,9 +32,67 @@ def speak(text: str, lang: str) -> None:
     except:
         pass
 
+def stream_speech(text: str, lang: str, voice: str = "com", cache: bool = False) -> Iterator[bytes]:
+    """
+    Yield MP3 audio for `text` chunk by chunk as gTTS synthesises it.
+
+    gTTS splits long text into short parts and fetches each separately; every part
+    is yielded as soon as it arrives instead of after the whole text is done.
+    A cached phrase is yielded from disk in one piece. With cache=True (meant
+    for the fixed PROMPT_CATALOGUE phrases) the complete audio is stored in the
+    phrase cache afterwards.
+    """
+    cached = phrase_cache.get(text, lang, voice)
+    if cached is not None:
+        yield cached.read_bytes()
+        return
+
+    chunks = []
+    for chunk in gTTS(text=text, lang=lang, tld=voice, timeout=GTTS_TIMEOUT).stream():
+        chunks.append(chunk)
+        yield chunk
+
+    if cache:
+        phrase_cache.put(text, lang, voice, b"".join(chunks))
+
+def speak_stream(text: str, lang: str, voice: str = "com", cache: bool = False) -> None:
+    """
+    Speak `text` on the local output device, starting with the first synthesised chunk.
+
+    Chunks are decoded in memory and written to a sounddevice output stream while the
+    next ones are still being fetched, so no temporary MP3 file is written.
+    """
+    import sounddevice as sd
+    import soundfile as sf
+
+    chunks: "queue.Queue" = queue.Queue()
+
+    def produce():
+        try:
+            for chunk in stream_speech(text, lang, voice, cache):
+                chunks.put(chunk)
+        finally:
+            chunks.put(None)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    stream = None
+    try:
+        while (chunk := chunks.get()) is not None:
+            samples, sample_rate = sf.read(io.BytesIO(chunk), dtype="int16")
+            if stream is None:
+                channels = 1 if samples.ndim == 1 else samples.shape[1]
+                stream = sd.OutputStream(samplerate=sample_rate, channels=channels, dtype="int16")
+                stream.start()
+            stream.write(samples)
+    finally:
+        if stream is not None:
+            stream.stop()
+            stream.close()
+
 def save_speech(text: str, lang: str, path: str):
-    tts = gTTS(text=text, lang=lang)
+    tts = gTTS(text=text, lang=lang, timeout=GTTS_TIMEOUT)
     tts.save(path)
 
 def speak_from_file(fp: Path):
-    playsound(fp)
\ No newline at end of file
+    playsound(fp)
@@ -0,0 +1,162 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+import sounddevice as sd
+from openai import OpenAI
+
+from audio_codecs import encode_audio
+from transcibe import CHANNELS, SAMPLE_RATE, UPLOAD_ENCODING, transcribe_audio
+
+FRAME_MS = 30                 # VAD decision granularity
+CALIBRATION_MS = 300          # initial ambient noise measurement
+PRE_ROLL_MS = 200             # audio kept from before speech onset
+END_SILENCE_MS = 700          # trailing silence that ends the utterance
+CHUNK_PAUSE_MS = 250          # short pause at which a chunk is sent for transcription
+MIN_CHUNK_SECONDS = 2.0
+START_TIMEOUT_SECONDS = 5.0
+MAX_UTTERANCE_SECONDS = 20.0
+
+
+class RingBuffer:
+    """Fixed-size single-producer/single-consumer sample buffer fed from the audio callback."""
+
+    def __init__(self, capacity: int):
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._capacity = capacity
+        self._write_pos = 0
+        self._read_pos = 0
+        self._cond = threading.Condition()
+
+    def write(self, samples: np.ndarray) -> None:
+        with self._cond:
+            n = len(samples)
+            if n >= self._capacity:
+                samples = samples[-self._capacity:]
+                n = self._capacity
+            start = self._write_pos % self._capacity
+            first = min(n, self._capacity - start)
+            self._data[start:start + first] = samples[:first]
+            self._data[:n - first] = samples[first:]
+            self._write_pos += n
+            # Drop the oldest samples if the consumer fell behind
+            self._read_pos = max(self._read_pos, self._write_pos - self._capacity)
+            self._cond.notify()
+
+    def read(self, n: int, timeout: float = 1.0) -> Optional[np.ndarray]:
+        """Block until `n` samples are available and return them, or None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._write_pos - self._read_pos >= n, timeout):
+                return None
+            start = self._read_pos % self._capacity
+            idx = (np.arange(n) + start) % self._capacity
+            self._read_pos += n
+            return self._data[idx].copy()
+
+
+class EnergyVAD:
+    """Energy-based voice activity detection with an adaptive noise floor."""
+
+    def __init__(self, min_threshold: float = 0.01, ratio: float = 3.0):
+        self.min_threshold = min_threshold
+        self.ratio = ratio
+        self.noise_floor = 0.0
+
+    def calibrate(self, frames: List[np.ndarray]) -> None:
+        self.noise_floor = float(np.median([_rms(frame) for frame in frames])) if frames else 0.0
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        return _rms(frame) > max(self.noise_floor * self.ratio, self.min_threshold)
+
+
+def _rms(frame: np.ndarray) -> float:
+    return float(np.sqrt(np.mean(np.square(frame))))
+
+
+def stream_transcribe(
+    client: OpenAI,
+    on_partial: Optional[Callable[[str], None]] = None,
+    vad: Optional[EnergyVAD] = None,
+) -> str:
+    """
+    Record one utterance from the microphone and transcribe it while the user is still speaking.
+
+    Audio is pushed from a sounddevice callback into a ring buffer. Whenever the
+    speaker pauses briefly, the audio so far is sent for transcription in the
+    background; the utterance ends after END_SILENCE_MS of silence, so the text is
+    ready shortly after the user stops talking instead of after a fixed window.
+
+    Args:
+        client: OpenAI client used for transcription
+        on_partial: Called with the text transcribed so far whenever a chunk completes
+        vad: Voice activity detector (default: EnergyVAD())
+
+    Returns:
+        The transcription of the whole utterance, or "" if no speech was detected
+    """
+    vad = vad or EnergyVAD()
+    frame_size = SAMPLE_RATE * FRAME_MS // 1000
+    ring = RingBuffer(SAMPLE_RATE * 10)
+
+    def callback(indata, frames, time_info, status):
+        ring.write(indata[:, 0])
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    futures = []
+
+    def submit(chunk: List[np.ndarray]) -> None:
+        audio_bytes = encode_audio(np.concatenate(chunk), SAMPLE_RATE, UPLOAD_ENCODING)
+        future = executor.submit(transcribe_audio, client, audio_bytes)
+        futures.append(future)
+        if on_partial:
+            future.add_done_callback(lambda _: on_partial(" ".join(
+                f.result() for f in futures if f.done() and not f.exception() and f.result()
+            )))
+
+    print("\nListening... Speak now.")
+    with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, dtype="float32",
+                        blocksize=frame_size, callback=callback):
+        calibration = [ring.read(frame_size) for _ in range(CALIBRATION_MS // FRAME_MS)]
+        vad.calibrate([frame for frame in calibration if frame is not None])
+
+        pre_roll: List[np.ndarray] = []
+        chunk: List[np.ndarray] = []
+        chunk_has_speech = False
+        speech_started = False
+        silent_ms = 0
+        started_at = time.monotonic()
+
+        while True:
+            frame = ring.read(frame_size)
+            if frame is None:
+                break
+            speech = vad.is_speech(frame)
+
+            if not speech_started:
+                pre_roll = (pre_roll + [frame])[-(PRE_ROLL_MS // FRAME_MS):]
+                if speech:
+                    speech_started = chunk_has_speech = True
+                    chunk = pre_roll
+                elif time.monotonic() - started_at > START_TIMEOUT_SECONDS:
+                    break
+                continue
+
+            chunk.append(frame)
+            chunk_has_speech = chunk_has_speech or speech
+            silent_ms = 0 if speech else silent_ms + FRAME_MS
+
+            if silent_ms >= END_SILENCE_MS or time.monotonic() - started_at > MAX_UTTERANCE_SECONDS:
+                break
+            if silent_ms >= CHUNK_PAUSE_MS and len(chunk) * FRAME_MS / 1000 >= MIN_CHUNK_SECONDS:
+                submit(chunk)
+                chunk = []
+                chunk_has_speech = False
+
+    if chunk_has_speech:
+        submit(chunk)
+
+    texts = [future.result() for future in futures]
+    executor.shutdown()
+    return " ".join(text for text in texts if text)
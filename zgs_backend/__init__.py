@@ -1 +1,10 @@
-from .src.zgs_backend.payment_agent import PaymentProcessingAgent
\ No newline at end of file
+from .src.zgs_backend.payment_agent import PaymentProcessingAgent
+from .src.zgs_backend.result_cache import result_cache
+from .src.zgs_backend.image_store import image_store, decode_upload, ImageStoreFull
+from .src.zgs_backend.batch import run_batch, arun_batch, checkpoint_path
+from .src.zgs_backend.call_policy import call_model, acall_model, ModelCallError, ModelUnavailableError, ModelTimeoutError
+from .src.zgs_backend.telemetry import render_metrics
+from .src.zgs_backend.intent_router import intent_router, interpret, ainterpret
+from .src.zgs_backend.semantic_cache import transfer_semantic_cache
+from .src.zgs_backend.recipient_directory import Contact, ContactStore, RecipientDirectory, recipient_directory
+from .src.zgs_backend.payment_scheduler import PaymentStore, PaymentScheduler, get_payment_scheduler
@@ -0,0 +1,119 @@
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from typing import Any, Dict, List
+import json
+import os
+
+# Tool outputs longer than this are replaced by a short reference once consumed (0 disables)
+COMPACT_THRESHOLD = int(os.getenv("ZGS_CONTEXT_COMPACT_CHARS", "400"))
+_MIN_SHARED_CHARS = 64
+
+
+def _string_leaves(value: Any) -> List[str]:
+    """All string values inside nested dicts/lists."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [leaf for item in value.values() for leaf in _string_leaves(item)]
+    if isinstance(value, list):
+        return [leaf for item in value for leaf in _string_leaves(item)]
+    return []
+
+
+def _content_leaves(content: str) -> List[str]:
+    try:
+        return _string_leaves(json.loads(content)) or [content]
+    except (TypeError, ValueError):
+        return [content]
+
+
+def _shares_text(arg: str, leaves: List[str]) -> bool:
+    return len(arg) >= _MIN_SHARED_CHARS and any(arg in leaf or leaf in arg for leaf in leaves if leaf)
+
+
+class AgentContext:
+    """
+    Message list for the planner loop that stays small as the loop goes on.
+
+    The system prompt and the user request are never modified, so the static
+    prefix sent with every iteration is byte-identical and can be served from the
+    provider's prompt cache. Bulky tool outputs (raw OCR text) are needed by the
+    planner only until it has passed them on to the next tool; after that both the
+    ToolMessage and the copy inside the consuming tool call are replaced by short
+    references, so prompt tokens no longer grow quadratically with iterations.
+    """
+
+    def __init__(self, system_prompt: str, user_input: str, compact_threshold: int = COMPACT_THRESHOLD):
+        self.messages: List[BaseMessage] = [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=user_input)
+        ]
+        self.compact_threshold = compact_threshold
+        self.compacted_chars = 0
+        self._tool_names: Dict[str, str] = {}
+        self._compacted = set()
+
+    def add_response(self, response: AIMessage) -> None:
+        """Append a planner response."""
+        for tool_call in response.tool_calls:
+            self._tool_names[tool_call["id"]] = tool_call["name"]
+        self.messages.append(response)
+
+    def add_tool_result(self, tool_call_id: str, result: Any, failed: bool = False) -> None:
+        """Append the output of one tool call; `failed` marks an error message instead of a result."""
+        self.messages.append(ToolMessage(content=str(result), tool_call_id=tool_call_id,
+                                         status="error" if failed else "success"))
+
+    def compact(self) -> List[BaseMessage]:
+        """
+        Replace consumed bulky tool outputs with references and return the messages to send.
+
+        A tool output counts as consumed once a later tool call has taken (part of)
+        it as an argument and that call has succeeded. If the consuming call failed,
+        the output stays so the planner can retry without re-running the first tool.
+        """
+        if not self.compact_threshold:
+            return self.messages
+
+        answered = {m.tool_call_id for m in self.messages if isinstance(m, ToolMessage) and m.status != "error"}
+        for index, message in enumerate(self.messages):
+            if not isinstance(message, ToolMessage) or index in self._compacted:
+                continue
+            if len(message.content) <= self.compact_threshold:
+                continue
+            leaves = _content_leaves(message.content)
+            source = self._tool_names.get(message.tool_call_id, "tool")
+            reference = f"[{source} output ({len(message.content)} chars) already passed on; omitted]"
+
+            for later_index in range(index + 1, len(self.messages)):
+                later = self.messages[later_index]
+                if not isinstance(later, AIMessage) or not later.tool_calls:
+                    continue
+                consumers = [
+                    call for call in later.tool_calls
+                    if call["id"] in answered and any(_shares_text(arg, leaves) for arg in _string_leaves(call["args"]))
+                ]
+                if not consumers:
+                    continue
+                self.messages[later_index] = self._without_copies(later, leaves, reference)
+                self.messages[index] = ToolMessage(content=reference, tool_call_id=message.tool_call_id)
+                self.compacted_chars += len(message.content) - len(reference)
+                self._compacted.add(index)
+                break
+
+        return self.messages
+
+    @staticmethod
+    def _without_copies(message: AIMessage, leaves: List[str], reference: str) -> AIMessage:
+        """Copy of a planner message with argument values copied from a tool output replaced by a reference."""
+        def replace(value):
+            if isinstance(value, str):
+                return reference if _shares_text(value, leaves) else value
+            if isinstance(value, dict):
+                return {key: replace(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [replace(item) for item in value]
+            return value
+
+        tool_calls = [dict(call, args=replace(call["args"])) for call in message.tool_calls]
+        additional_kwargs = {key: value for key, value in message.additional_kwargs.items() if key != "tool_calls"}
+        return message.model_copy(update={"tool_calls": tool_calls, "additional_kwargs": additional_kwargs})
@@ -0,0 +1,233 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional, Set
+import asyncio
+import binascii
+import json
+import os
+import re
+import time
+
+from .image_store import decode_upload, image_store
+from .payment_agent import IMAGE_EXTENSIONS, PaymentProcessingAgent
+from .rate_limit import TokenBucket
+
+IMAGE_PROMPT = "Extract payment information from the bill image at '{image_path}' and give me the formatted payment details"
+
+DEFAULT_WORKERS = int(os.getenv("ZGS_BATCH_WORKERS", "4"))
+DEFAULT_RATE = float(os.getenv("ZGS_BATCH_RATE", "0"))  # items per second, 0 = unlimited
+BATCH_DIR = os.getenv("ZGS_BATCH_DIR", "batch_runs")
+
+
+def items_from_paths(paths: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """
+    Turn files and folders into batch items.
+
+    Images become {"id", "image_path"} items and .txt files {"id", "text"} items
+    holding a transfer description; folders are walked recursively in name order.
+
+    Args:
+        paths: Files or directories
+
+    Returns:
+        Iterator of batch items, keyed by file path
+    """
+    for path in map(Path, paths):
+        files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        for file in files:
+            suffix = file.suffix.lower().lstrip(".")
+            if suffix in IMAGE_EXTENSIONS:
+                yield {"id": str(file), "image_path": str(file)}
+            elif suffix == "txt":
+                yield {"id": str(file), "text": file.read_text(encoding="utf-8").strip()}
+
+
+def item_prompt(item: Dict[str, str]) -> str:
+    """Build the agent request for a batch item."""
+    if item.get("image_path"):
+        return IMAGE_PROMPT.format(image_path=item["image_path"])
+    if item.get("text"):
+        return item["text"]
+    raise ValueError("batch item needs 'image_path' or 'text'")
+
+
+def checkpoint_path(batch_id: str) -> str:
+    """Results file for a named batch submitted over the API, under ZGS_BATCH_DIR."""
+    if not re.fullmatch(r"[\w\-]{1,64}", batch_id):
+        raise ValueError("batch_id may only contain letters, digits, '_' and '-'")
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    return os.path.join(BATCH_DIR, f"{batch_id}.ndjson")
+
+
+def load_checkpoint(path: Optional[str]) -> Set[str]:
+    """
+    Return the ids already processed successfully according to an NDJSON results file.
+
+    Failed items are not counted, so they are retried on resume, and a line cut
+    off by an interruption is ignored.
+    """
+    done = set()
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def _stored(item: Dict[str, str]) -> Dict[str, str]:
+    """Put an uploaded {"image_base64"} item into the image store, right before it is processed."""
+    try:
+        image_bytes, image_base64 = decode_upload(item["image_base64"])
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Base64 decoding failed")
+    return dict(item, image_path=image_store.put(image_bytes, image_base64))
+
+
+def _record(item: Dict[str, str], result: Optional[Dict[str, Any]], error: Optional[str], started: float) -> Dict[str, Any]:
+    record = {"id": item["id"], "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+    if result is not None and result.get("success"):
+        try:
+            record["payment_request"] = json.loads(result["final_answer"])["payment_request"]
+        except (TypeError, ValueError, KeyError):
+            record["final_answer"] = result["final_answer"]
+        record.update(status="ok", mode=result.get("mode"))
+    else:
+        record.update(status="error", error=error or (result or {}).get("error", "processing failed"))
+    return record
+
+
+def process_item(agent: PaymentProcessingAgent, item: Dict[str, str], bucket: Optional[TokenBucket] = None,
+                 fused_ocr: Optional[bool] = None) -> Dict[str, Any]:
+    """Process one batch item and return its NDJSON record; never raises."""
+    started = time.perf_counter()
+    try:
+        if item.get("image_base64"):
+            item = _stored(item)
+        if bucket is not None:
+            bucket.acquire()
+        result = agent.process_request(item_prompt(item), verbose=False, fused_ocr=fused_ocr)
+        return _record(item, result, None, started)
+    except Exception as e:
+        return _record(item, None, str(e), started)
+    finally:
+        if item.get("image_base64") and item.get("image_path"):
+            image_store.release(item["image_path"])
+
+
+async def aprocess_item(agent: PaymentProcessingAgent, item: Dict[str, str], bucket: Optional[TokenBucket] = None,
+                        fused_ocr: Optional[bool] = None) -> Dict[str, Any]:
+    """Async variant of process_item."""
+    started = time.perf_counter()
+    try:
+        if item.get("image_base64"):
+            item = _stored(item)
+        if bucket is not None:
+            await bucket.aacquire()
+        result = await agent.aprocess_request(item_prompt(item), fused_ocr=fused_ocr)
+        return _record(item, result, None, started)
+    except Exception as e:
+        return _record(item, None, str(e), started)
+    finally:
+        if item.get("image_base64") and item.get("image_path"):
+            image_store.release(item["image_path"])
+
+
+def run_batch(
+    agent: PaymentProcessingAgent,
+    items: Iterable[Dict[str, str]],
+    workers: int = DEFAULT_WORKERS,
+    rate: float = DEFAULT_RATE,
+    checkpoint: Optional[str] = None,
+    fused_ocr: Optional[bool] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Process many bills/transfers concurrently, yielding records as they complete.
+
+    At most `workers` items are in flight and items are pulled from `items`
+    lazily, so folders of any size run in bounded memory. With a checkpoint,
+    every record is appended to that NDJSON file as it completes and items
+    already recorded as "ok" there are skipped.
+
+    Args:
+        agent: Agent used for every item
+        items: Batch items ({"id"} plus "image_path", "image_base64" or "text")
+        workers: Maximum number of items processed at once
+        rate: Maximum items started per second across all workers (0 = unlimited)
+        checkpoint: NDJSON results file to resume from and append to
+        fused_ocr: Override the agent's fused_ocr setting
+
+    Returns:
+        Iterator of result records in completion order
+    """
+    done = load_checkpoint(checkpoint)
+    bucket = TokenBucket(rate) if rate > 0 else None
+    pending_items = (item for item in items if item["id"] not in done)
+    output = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+            in_flight = set()
+            for item in pending_items:
+                in_flight.add(executor.submit(process_item, agent, item, bucket, fused_ocr))
+                if len(in_flight) < workers:
+                    continue
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield _checkpointed(future.result(), output)
+
+            while in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield _checkpointed(future.result(), output)
+    finally:
+        if output is not None:
+            output.close()
+
+
+async def arun_batch(
+    agent: PaymentProcessingAgent,
+    items: Iterable[Dict[str, str]],
+    workers: int = DEFAULT_WORKERS,
+    rate: float = DEFAULT_RATE,
+    checkpoint: Optional[str] = None,
+    fused_ocr: Optional[bool] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Async variant of run_batch; at most `workers` items are awaited at once."""
+    done = load_checkpoint(checkpoint)
+    bucket = TokenBucket(rate) if rate > 0 else None
+    pending_items = (item for item in items if item["id"] not in done)
+    output = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+
+    in_flight = set()
+    try:
+        for item in pending_items:
+            in_flight.add(asyncio.ensure_future(aprocess_item(agent, item, bucket, fused_ocr)))
+            if len(in_flight) < workers:
+                continue
+            finished, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                yield _checkpointed(task.result(), output)
+
+        while in_flight:
+            finished, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                yield _checkpointed(task.result(), output)
+    finally:
+        # The client went away mid-batch: stop the remaining items
+        for task in in_flight:
+            task.cancel()
+        if output is not None:
+            output.close()
+
+
+def _checkpointed(record: Dict[str, Any], output) -> Dict[str, Any]:
+    if output is not None:
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+    return record
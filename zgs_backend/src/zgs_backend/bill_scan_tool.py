@@ -0,0 +1,105 @@
+from langchain_core.tools import tool
+from pydantic import Field
+from typing import Optional
+import asyncio
+import json
+
+from .image_store import load_image
+from .image_to_text import build_ocr_message, image_cache_key, prepare_image
+from .llm_clients import get_structured_llm
+from .local_extractor import extract_fields, overlay
+from .result_cache import prompt_version, result_cache
+from .scheduled_payment_tool import PaymentInfo
+
+
+# Define the Pydantic schema for a single-call bill scan
+class BillScanResult(PaymentInfo):
+    """Schema for payment information read directly from a bill image"""
+    raw_text: Optional[str] = Field(default=None, description="All text visible on the document, for audit")
+
+
+SCAN_INSTRUCTIONS = """Read this payment-related document (bill, invoice, receipt, or any paper that needs to be paid) and extract the payment information.
+
+Extract the following information:
+1. Receiver: The company or person who should receive the payment
+2. Address: The address of the receiver (if available)
+3. Title: The payment reference/title that should be used (often includes bill number or customer ID)
+4. Amount: The total amount to pay (numeric value only, no currency symbols)
+5. Bank Account: The bank account number where payment should be sent
+6. Schedule: When the payment should be sent
+   - If there's a due date, use that date in YYYY-MM-DD format
+   - If the bill says "pay immediately" or similar, use "immediate"
+   - If no due date is specified, use "immediate"
+7. Raw text: All text visible on the document, exactly as it appears
+
+Be precise and extract exact values from the document."""
+
+SCAN_VERSION = prompt_version(SCAN_INSTRUCTIONS, BillScanResult.model_json_schema())
+
+
+@tool
+def extract_payment_info_from_image(image_path: str) -> str:
+    """
+    Extract structured payment information directly from a bill/invoice image in one step.
+    Use this tool instead of extract_text_from_image + parse_bill_text when a single model
+    call should read the document and return the payment details.
+
+    Args:
+        image_path: Path to the image file (jpg, png, etc.) or an uploaded image handle (mem://...)
+
+    Returns:
+        JSON string with payment information (receiver, address, title, amount, bank_account,
+        schedule) and the document's raw_text
+    """
+    image_bytes, image_base64 = load_image(image_path)
+
+    cache_key = image_cache_key(image_bytes, SCAN_VERSION)
+    cached = result_cache.get("scan", cache_key)
+    if cached is not None:
+        return cached
+
+    # One vision call returns the payment schema; raw text is never re-sent as prompt tokens
+    structured_llm = get_structured_llm(BillScanResult)
+    message = build_ocr_message(*prepare_image(image_bytes, image_base64), instructions=SCAN_INSTRUCTIONS)
+    scan = structured_llm.invoke([message])
+
+    result = _validated(scan).model_dump_json()
+    result_cache.set("scan", cache_key, result)
+    return result
+
+
+async def _aextract_payment_info_from_image(image_path: str) -> str:
+    """Async implementation of extract_payment_info_from_image, used by `ainvoke`."""
+    image_bytes, image_base64 = await asyncio.to_thread(load_image, image_path)
+    cache_key = image_cache_key(image_bytes, SCAN_VERSION)
+    cached = await result_cache.aget("scan", cache_key)
+    if cached is not None:
+        return cached
+
+    structured_llm = get_structured_llm(BillScanResult)
+    prepared = await asyncio.to_thread(prepare_image, image_bytes, image_base64)
+    scan = await structured_llm.ainvoke([build_ocr_message(*prepared, instructions=SCAN_INSTRUCTIONS)])
+
+    result = _validated(scan).model_dump_json()
+    await result_cache.aset("scan", cache_key, result)
+    return result
+
+
+def _validated(scan: BillScanResult) -> BillScanResult:
+    """Prefer checksummed accounts and parsed amounts from the returned raw text."""
+    if not scan.raw_text:
+        return scan
+    return overlay(scan, extract_fields(scan.raw_text))
+
+
+extract_payment_info_from_image.coroutine = _aextract_payment_info_from_image
+
+
+# Example usage
+if __name__ == "__main__":
+    from pathlib import Path
+
+    image_path = str(Path(__file__).with_name("rachuneczek.png"))
+
+    result = json.loads(extract_payment_info_from_image.invoke({"image_path": image_path}))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -0,0 +1,230 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import contextvars
+import os
+import threading
+import time
+
+import httpx
+import openai
+from tenacity import (
+    AsyncRetrying,
+    RetryError,
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    stop_before_delay,
+    wait_exponential_jitter,
+)
+
+from .rate_limit import TokenBucket
+from .telemetry import record_retry, span
+
+CALL_TIMEOUT = float(os.getenv("ZGS_CALL_TIMEOUT", "30"))        # seconds per attempt
+CALL_DEADLINE = float(os.getenv("ZGS_CALL_DEADLINE", "60"))      # seconds per call, all attempts included
+MAX_ATTEMPTS = int(os.getenv("ZGS_CALL_MAX_ATTEMPTS", "4"))
+HEDGE_AFTER = float(os.getenv("ZGS_HEDGE_AFTER", "0"))           # seconds before a duplicate is sent, 0 = off
+
+
+class ModelCallError(Exception):
+    """A model provider call could not be completed."""
+
+
+class ModelUnavailableError(ModelCallError):
+    """The provider kept failing with rate limits, 5xx or connection errors."""
+
+
+class ModelTimeoutError(ModelCallError):
+    """The call did not finish before its deadline."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for rate limits (429), server errors (5xx), timeouts and dropped connections."""
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (httpx.TransportError, TimeoutError, asyncio.TimeoutError))
+
+
+def _parse_rates(spec: str) -> Dict[str, float]:
+    """Parse ZGS_MODEL_RPS: '10' for every model, or 'gpt-4o-mini=10,gpt-4o-transcribe=3'."""
+    rates = {}
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, rate = part.rpartition("=")
+        rates[model or "*"] = float(rate)
+    return rates
+
+
+_rates = _parse_rates(os.getenv("ZGS_MODEL_RPS", ""))
+_buckets: Dict[str, Optional[TokenBucket]] = {}
+_buckets_lock = threading.Lock()
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+
+
+def limiter_for(model: str) -> Optional[TokenBucket]:
+    """Return the shared request bucket for a model, or None if it is not rate limited."""
+    if model not in _buckets:
+        with _buckets_lock:
+            if model not in _buckets:
+                rate = _rates.get(model, _rates.get("*", 0))
+                _buckets[model] = TokenBucket(rate) if rate > 0 else None
+    return _buckets[model]
+
+
+def _retrying(model: str, deadline: float, attempts: int) -> dict:
+    return dict(
+        retry=retry_if_exception(is_retryable),
+        before_sleep=lambda _: record_retry(model),
+        # Give up as soon as the next backoff would overrun the deadline
+        stop=stop_after_attempt(attempts) | stop_before_delay(deadline),
+        wait=wait_exponential_jitter(initial=0.5, max=8.0),
+        reraise=False,
+    )
+
+
+def _failure(error: BaseException, model: str) -> ModelCallError:
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, openai.APITimeoutError, httpx.TimeoutException)):
+        return ModelTimeoutError(f"{model} call timed out")
+    return ModelUnavailableError(f"{model} unavailable: {error}")
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _buckets_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+    return _hedge_executor
+
+
+def _hedged(model: str, fn: Callable[..., Any], args, kwargs, hedge_after: float, timeout: float) -> Any:
+    """Run fn; if it has not answered after hedge_after seconds, race a duplicate against it."""
+    executor = _get_hedge_executor()
+    # Copy the context so token usage is still attributed to the caller's request trace
+    futures = {executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)}
+    done, _ = wait(futures, timeout=hedge_after)
+    bucket = limiter_for(model)
+    if not done and (bucket is None or bucket.try_acquire()):
+        futures.add(executor.submit(contextvars.copy_context().run, fn, *args, **kwargs))
+    done, _ = wait(futures, timeout=max(0.0, timeout - hedge_after), return_when=FIRST_COMPLETED)
+    if not done:
+        raise TimeoutError(f"{model} call exceeded {timeout:.1f}s")
+    # Prefer a successful copy if both finished
+    winner = next((f for f in done if f.exception() is None), next(iter(done)))
+    return winner.result()
+
+
+def call_model(model: str, fn: Callable[..., Any], /, *args, deadline: Optional[float] = None,
+               hedge_after: Optional[float] = None, attempts: Optional[int] = None, **kwargs) -> Any:
+    """
+    Call a model provider function with rate limiting, retries and a deadline.
+
+    Every attempt first takes a token from the model's bucket (ZGS_MODEL_RPS), so
+    bursts queue instead of tripping provider rate limits. 429/5xx/connection
+    errors are retried with exponential backoff and jitter until `attempts` or
+    `deadline` runs out. With hedging, a duplicate request is sent when the first
+    has not answered after `hedge_after` seconds and the faster one wins.
+
+    Args:
+        model: Model name, used to pick the rate limit bucket
+        fn: Provider call, e.g. `chain.invoke` or `client.audio.transcriptions.create`
+        *args, **kwargs: Arguments for fn
+        deadline: Seconds for the whole call including retries (default ZGS_CALL_DEADLINE)
+        hedge_after: Seconds before hedging, 0 disables (default ZGS_HEDGE_AFTER)
+        attempts: Maximum attempts (default ZGS_CALL_MAX_ATTEMPTS)
+
+    Returns:
+        Whatever fn returns
+
+    Raises:
+        ModelUnavailableError: The provider still failed after all retries
+        ModelTimeoutError: The deadline passed
+    """
+    deadline = CALL_DEADLINE if deadline is None else deadline
+    hedge_after = HEDGE_AFTER if hedge_after is None else hedge_after
+    bucket = limiter_for(model)
+    expires_at = time.monotonic() + deadline
+
+    try:
+        with span(f"model.{model}"):
+            for attempt in Retrying(**_retrying(model, deadline, attempts or MAX_ATTEMPTS)):
+                with attempt:
+                    if bucket is not None:
+                        bucket.acquire()
+                    remaining = expires_at - time.monotonic()
+                    if remaining <= 0:
+                        raise ModelTimeoutError(f"{model} call exceeded its {deadline:.1f}s deadline")
+                    if hedge_after > 0:
+                        return _hedged(model, fn, args, kwargs, hedge_after, min(remaining, CALL_TIMEOUT))
+                    return fn(*args, **kwargs)
+    except RetryError as e:
+        raise _failure(e.last_attempt.exception(), model) from e.last_attempt.exception()
+
+
+async def acall_model(model: str, fn: Callable[..., Awaitable[Any]], /, *args, deadline: Optional[float] = None,
+                      hedge_after: Optional[float] = None, attempts: Optional[int] = None, **kwargs) -> Any:
+    """
+    Async variant of call_model for coroutine functions such as `chain.ainvoke`.
+
+    Each attempt is cancelled when the remaining deadline runs out, and a losing
+    hedged request is cancelled as soon as the other one answers.
+    """
+    deadline = CALL_DEADLINE if deadline is None else deadline
+    hedge_after = HEDGE_AFTER if hedge_after is None else hedge_after
+    bucket = limiter_for(model)
+    expires_at = time.monotonic() + deadline
+
+    try:
+        with span(f"model.{model}"):
+            async for attempt in AsyncRetrying(**_retrying(model, deadline, attempts or MAX_ATTEMPTS)):
+                with attempt:
+                    if bucket is not None:
+                        await bucket.aacquire()
+                    remaining = expires_at - time.monotonic()
+                    if remaining <= 0:
+                        raise ModelTimeoutError(f"{model} call exceeded its {deadline:.1f}s deadline")
+                    timeout = min(remaining, CALL_TIMEOUT)
+                    if hedge_after > 0:
+                        return await _ahedged(model, fn, args, kwargs, hedge_after, timeout)
+                    return await asyncio.wait_for(fn(*args, **kwargs), timeout)
+    except RetryError as e:
+        raise _failure(e.last_attempt.exception(), model) from e.last_attempt.exception()
+
+
+async def _ahedged(model: str, fn, args, kwargs, hedge_after: float, timeout: float) -> Any:
+    tasks = {asyncio.ensure_future(fn(*args, **kwargs))}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        bucket = limiter_for(model)
+        if not done and (bucket is None or bucket.try_acquire()):
+            tasks.add(asyncio.ensure_future(fn(*args, **kwargs)))
+        done, _ = await asyncio.wait(tasks, timeout=max(0.0, timeout - hedge_after),
+                                     return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            raise TimeoutError(f"{model} call exceeded {timeout:.1f}s")
+        winner = next((t for t in done if t.exception() is None), next(iter(done)))
+        return winner.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class GuardedRunnable:
+    """
+    Wrap a LangChain runnable so that `invoke`/`ainvoke` go through call_model/acall_model.
+
+    Only the call methods are wrapped; build tool bindings and structured output
+    on the raw runnable before guarding it.
+    """
+
+    def __init__(self, runnable: Any, model: str):
+        self.runnable = runnable
+        self.model = model
+
+    def invoke(self, *args, **kwargs) -> Any:
+        return call_model(self.model, self.runnable.invoke, *args, **kwargs)
+
+    async def ainvoke(self, *args, **kwargs) -> Any:
+        return await acall_model(self.model, self.runnable.ainvoke, *args, **kwargs)
@@ -1,9 +1,16 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, Optional
+import asyncio
 import json
+import re
+
+from .llm_clients import default_model, get_structured_chain
+from .local_extractor import build_if_complete, extract_fields, overlay
+from .recipient_directory import recipient_directory
+from .result_cache import content_key, prompt_version, result_cache
+from .semantic_cache import transfer_semantic_cache
 
 
 # Define the Pydantic schema for structured output
@@ -16,6 +23,63 @@ class TransferInfo(BaseModel):
     bank_account: str = Field(description="Bank account number")
 
 
+# Fields the local extractor must resolve for the model call to be skipped
+LOCAL_REQUIRED_FIELDS = ("receiver", "address", "title", "amount", "bank_account")
+# A saved recipient supplies name, account and (optionally) address
+DIRECTORY_REQUIRED_FIELDS = ("receiver", "title", "amount", "bank_account")
+DEFAULT_TITLE = "Przelew środków"
+
+_ACCOUNT_DIGITS = re.compile(r"\d(?:[\s-]?\d){9,}")
+_TITLE_WORD = re.compile(r"\btytu|\btitle", re.IGNORECASE)
+
+TRANSFER_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are an expert at extracting bank transfer information from Polish text. "
+               "Extract the receiver name, address, transfer title, amount, and bank account number."),
+    ("human", "{text}")
+])
+# "unfilled": cached results no longer carry accounts filled in from the directory
+TRANSFER_VERSION = prompt_version(TRANSFER_PROMPT.pretty_repr(), TransferInfo.model_json_schema(), "unfilled")
+
+
+def _directory_result(text: str, local_fields: Dict[str, Any]) -> Optional[TransferInfo]:
+    """
+    Transfer to a saved recipient named in the recipient slot ("przelej 200 zł córce").
+
+    Only used when the text neither spells out an account number nor labels a
+    receiver itself; the directory fields are never mixed into a model result.
+    """
+    if "receiver" in local_fields or "bank_account" in local_fields or _ACCOUNT_DIGITS.search(text):
+        return None
+    contact = recipient_directory.find_in_text(text)
+    if contact is None:
+        return None
+    fields = dict(local_fields, receiver=contact.name, bank_account=contact.bank_account)
+    fields.setdefault("address", contact.address or "")
+    if not _TITLE_WORD.search(text):
+        fields.setdefault("title", DEFAULT_TITLE)
+    return build_if_complete(fields, TransferInfo, DIRECTORY_REQUIRED_FIELDS)
+
+
+def _with_saved_account(result: str) -> str:
+    """
+    Fill a missing account when the receiver is exactly a saved recipient's name or alias.
+
+    Applied after the caches, so an edited or deleted contact takes effect on the
+    next request. A merely similar name ("Jan Kowalski" for "Jan Kowalczyk")
+    never supplies an account.
+    """
+    transfer = TransferInfo.model_validate_json(result)
+    if re.search(r"\d", transfer.bank_account or ""):
+        return result
+    contact = recipient_directory.lookup(transfer.receiver)
+    if contact is None:
+        return result
+    update = {"bank_account": contact.bank_account}
+    if not transfer.address and contact.address:
+        update["address"] = contact.address
+    return transfer.model_copy(update=update).model_dump_json()
+
+
 @tool
 def extract_transfer_info(text: str) -> str:
     """
@@ -29,30 +93,76 @@ def extract_transfer_info(text: str) -> str:
     Returns:
         JSON string with transfer information (receiver, address, title, amount, bank_account)
     """
-    # Initialize the LLM with structured output
-    llm = ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0,
-    )
-
-    # Create structured output LLM
-    structured_llm = llm.with_structured_output(TransferInfo)
-
-    # Create prompt template
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are an expert at extracting bank transfer information from Polish text. "
-                   "Extract the receiver name, address, transfer title, amount, and bank account number."),
-        ("human", "{text}")
-    ])
-
-    # Create the chain
-    chain = prompt | structured_llm
-
-    # Execute and return result
-    result = chain.invoke({"text": text})
-
-    # Return as JSON string for agent compatibility
-    return result.model_dump_json()
+    # Identical texts are served from the cache
+    cache_key = content_key(text, default_model(), TRANSFER_VERSION)
+    cached = result_cache.get("transfer", cache_key)
+    if cached is not None:
+        return _with_saved_account(cached)
+
+    # Fully labelled transfer texts are extracted locally
+    local_fields = extract_fields(text)
+    local_result = build_if_complete(local_fields, TransferInfo, LOCAL_REQUIRED_FIELDS)
+    if local_result is not None:
+        result = local_result.model_dump_json()
+        result_cache.set("transfer", cache_key, result)
+        return result
+
+    # So are transfers to saved recipients; not cached, so edited contacts apply immediately
+    saved_result = _directory_result(text, local_fields)
+    if saved_result is not None:
+        return saved_result.model_dump_json()
+
+    # Reworded repeats of an earlier transcript reuse its result, with this text's numbers
+    reused = transfer_semantic_cache.get(text, local_fields)
+    if reused is not None:
+        result = TransferInfo(**reused).model_dump_json()
+        result_cache.set("transfer", cache_key, result)
+        return _with_saved_account(result)
+
+    # Shared chain, built once per process
+    chain = get_structured_chain(TRANSFER_PROMPT, TransferInfo)
+
+    # The model fills the gaps; locally validated fields take precedence. Cached before
+    # the directory fill, so edited contacts apply immediately
+    result = overlay(chain.invoke({"text": text}), local_fields).model_dump_json()
+    result_cache.set("transfer", cache_key, result)
+    transfer_semantic_cache.set(text, result)
+    return _with_saved_account(result)
+
+
+async def _aextract_transfer_info(text: str) -> str:
+    """Async implementation of extract_transfer_info, used by `ainvoke`."""
+    cache_key = content_key(text, default_model(), TRANSFER_VERSION)
+    cached = await result_cache.aget("transfer", cache_key)
+    if cached is not None:
+        return _with_saved_account(cached)
+
+    local_fields = extract_fields(text)
+    local_result = build_if_complete(local_fields, TransferInfo, LOCAL_REQUIRED_FIELDS)
+    if local_result is not None:
+        result = local_result.model_dump_json()
+        await result_cache.aset("transfer", cache_key, result)
+        return result
+
+    saved_result = _directory_result(text, local_fields)
+    if saved_result is not None:
+        return saved_result.model_dump_json()
+
+    # Embedding is CPU-bound; keep it off the event loop
+    reused = await asyncio.to_thread(transfer_semantic_cache.get, text, local_fields)
+    if reused is not None:
+        result = TransferInfo(**reused).model_dump_json()
+        await result_cache.aset("transfer", cache_key, result)
+        return _with_saved_account(result)
+
+    chain = get_structured_chain(TRANSFER_PROMPT, TransferInfo)
+    result = overlay(await chain.ainvoke({"text": text}), local_fields).model_dump_json()
+    await result_cache.aset("transfer", cache_key, result)
+    await asyncio.to_thread(transfer_semantic_cache.set, text, result)
+    return _with_saved_account(result)
+
+
+extract_transfer_info.coroutine = _aextract_transfer_info
 
 
 # Example usage
@@ -0,0 +1,125 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import os
+import threading
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # embedding-based features then fall back to exact matching
+    SentenceTransformer = None
+
+try:
+    import faiss
+except ImportError:  # VectorIndex then searches with numpy
+    faiss = None
+
+
+# Small multilingual model: Polish support, ~10 ms per short utterance on CPU
+EMBEDDING_MODEL = os.getenv("ZGS_EMBEDDING_MODEL", "paraphrase-multilingual-MiniLM-L12-v2")
+
+_model = None
+_lock = threading.Lock()
+
+
+def embeddings_available() -> bool:
+    """True if sentence-transformers is installed and ZGS_EMBEDDINGS is not set to 0."""
+    return SentenceTransformer is not None and os.getenv("ZGS_EMBEDDINGS", "1") != "0"
+
+
+def get_embedder():
+    """Return the shared SentenceTransformer, loading it on first use."""
+    global _model
+    if not embeddings_available():
+        raise RuntimeError("sentence-transformers is not installed")
+    if _model is None:
+        with _lock:
+            if _model is None:
+                _model = SentenceTransformer(EMBEDDING_MODEL, device=os.getenv("ZGS_EMBEDDING_DEVICE", "cpu"))
+    return _model
+
+
+def embed(texts: Sequence[str]) -> np.ndarray:
+    """
+    Embed texts with the shared model.
+
+    Args:
+        texts: Texts to embed
+
+    Returns:
+        float32 array of shape (len(texts), dim) with unit-length rows, so the
+        inner product of two rows is their cosine similarity
+    """
+    vectors = get_embedder().encode(list(texts), normalize_embeddings=True, convert_to_numpy=True)
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+class VectorIndex:
+    """
+    Inner-product index over unit vectors with integer ids.
+
+    Uses a faiss flat index when faiss-cpu is installed and a numpy matrix
+    otherwise; both are exact, which is what the small indexes here need.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._lock = threading.Lock()
+        if faiss is not None:
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        else:
+            self._vectors: Dict[int, np.ndarray] = {}
+            self._matrix: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return self._index.ntotal if faiss is not None else len(self._vectors)
+
+    def add(self, ids: Iterable[int], vectors: np.ndarray) -> None:
+        """Add rows of `vectors` under the given ids."""
+        ids = np.asarray(list(ids), dtype=np.int64)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        with self._lock:
+            if faiss is not None:
+                self._index.add_with_ids(vectors, ids)
+            else:
+                self._vectors.update(zip(ids.tolist(), vectors))
+                self._matrix = None
+
+    def remove(self, ids: Iterable[int]) -> None:
+        """Remove vectors by id; unknown ids are ignored."""
+        ids = np.asarray(list(ids), dtype=np.int64)
+        with self._lock:
+            if faiss is not None:
+                self._index.remove_ids(ids)
+            else:
+                for vector_id in ids.tolist():
+                    self._vectors.pop(vector_id, None)
+                self._matrix = None
+
+    def search(self, vector: np.ndarray, k: int = 1) -> List[Tuple[int, float]]:
+        """
+        Find the nearest stored vectors.
+
+        Args:
+            vector: Query vector of shape (dim,) or (1, dim)
+            k: Number of neighbours
+
+        Returns:
+            Up to k (id, cosine similarity) pairs, most similar first
+        """
+        query = np.ascontiguousarray(vector, dtype=np.float32).reshape(1, self.dim)
+        with self._lock:
+            if faiss is not None:
+                if self._index.ntotal == 0:
+                    return []
+                scores, ids = self._index.search(query, min(k, self._index.ntotal))
+                return [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if i != -1]
+
+            if not self._vectors:
+                return []
+            if self._matrix is None:
+                self._matrix = (np.fromiter(self._vectors, dtype=np.int64), np.stack(list(self._vectors.values())))
+            ids, matrix = self._matrix
+        scores = matrix @ query[0]
+        top = np.argsort(-scores)[:k]
+        return [(int(ids[i]), float(scores[i])) for i in top]
@@ -0,0 +1,132 @@
+from typing import Optional, Tuple
+import io
+import os
+
+try:
+    from PIL import Image, ImageFilter, ImageOps
+except ImportError:  # Pillow is optional, images are then sent to the model unchanged
+    Image = None
+
+
+DEFAULT_MAX_SIDE = 1536  # the vision model downsizes anything larger than ~2048x768 anyway
+JPEG_QUALITY = 85
+
+# Formats the vision API accepts as-is
+SUPPORTED_MIME_TYPES = {"image/png", "image/jpeg", "image/webp", "image/gif"}
+
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+)
+
+
+def detect_image_format(data: bytes) -> str:
+    """
+    Detect the MIME type of an image from its magic bytes.
+
+    Args:
+        data: Raw image bytes (the first 16 bytes are enough)
+
+    Returns:
+        MIME type, "image/jpeg" if the format is not recognised
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    return "image/jpeg"
+
+
+def _document_bbox(image) -> Optional[Tuple[int, int, int, int]]:
+    """Find the bright paper area of a grayscale photo, or None if it is unclear."""
+    probe = image.copy()
+    probe.thumbnail((256, 256))
+    scale_x = image.width / probe.width
+    scale_y = image.height / probe.height
+
+    probe = ImageOps.autocontrast(probe)
+    mask = probe.point(lambda p: 255 if p > 200 else 0).filter(ImageFilter.MinFilter(5))
+    bbox = mask.getbbox()
+    if bbox is None:
+        return None
+
+    left, top, right, bottom = bbox
+    area_ratio = ((right - left) * (bottom - top)) / (probe.width * probe.height)
+    if not 0.15 < area_ratio < 0.95:
+        return None
+
+    margin_x, margin_y = probe.width * 0.02, probe.height * 0.02
+    return (
+        max(int((left - margin_x) * scale_x), 0),
+        max(int((top - margin_y) * scale_y), 0),
+        min(int((right + margin_x) * scale_x), image.width),
+        min(int((bottom + margin_y) * scale_y), image.height),
+    )
+
+
+def preprocess_settings() -> str:
+    """Settings that change what preprocess_image sends to the model, for result cache keys."""
+    if Image is None or os.getenv("ZGS_OCR_PREPROCESS", "1") == "0":
+        return "raw"
+    return f"max_side={os.getenv('ZGS_OCR_MAX_SIDE', DEFAULT_MAX_SIDE)},quality={JPEG_QUALITY},gray,crop"
+
+
+def preprocess_image(
+    image_bytes: bytes,
+    max_side: Optional[int] = None,
+    grayscale: bool = True,
+    crop: bool = True,
+) -> Tuple[bytes, str]:
+    """
+    Shrink a document photo to what the vision model needs before it is sent.
+
+    Applies EXIF auto-rotation, crops to the document, converts to grayscale
+    and downsamples so the longer side is at most `max_side` pixels.
+
+    Args:
+        image_bytes: Raw image bytes in any format Pillow can read
+        max_side: Target size of the longer side (default: ZGS_OCR_MAX_SIDE env var or 1536)
+        grayscale: Convert to grayscale (default: True)
+        crop: Crop to the detected document area (default: True)
+
+    Returns:
+        Tuple of (image bytes, MIME type) to send to the model
+    """
+    mime_type = detect_image_format(image_bytes)
+    if Image is None or os.getenv("ZGS_OCR_PREPROCESS", "1") == "0":
+        return image_bytes, mime_type
+
+    max_side = max_side or int(os.getenv("ZGS_OCR_MAX_SIDE", DEFAULT_MAX_SIDE))
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("L" if grayscale else "RGB")
+
+        if crop:
+            bbox = _document_bbox(image if grayscale else image.convert("L"))
+            if bbox is not None:
+                image = image.crop(bbox)
+
+        resized = max(image.size) > max_side
+        if resized:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    except (OSError, Image.DecompressionBombError):
+        # Formats Pillow cannot read (e.g. HEIC) or truncated files: let the model try the original
+        return image_bytes, mime_type
+
+    processed = output.getvalue()
+
+    # Keep the original when it is already small and in a format the API accepts
+    if not resized and len(processed) >= len(image_bytes) and mime_type in SUPPORTED_MIME_TYPES:
+        return image_bytes, mime_type
+    return processed, "image/jpeg"
@@ -0,0 +1,149 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+import base64
+import os
+import threading
+import time
+import uuid
+
+from .image_preprocessing import detect_image_format
+
+
+HANDLE_PREFIX = "mem://"
+
+_EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/webp": "webp",
+    "image/gif": "gif",
+    "image/bmp": "bmp",
+    "image/tiff": "tiff",
+}
+
+
+class ImageStoreFull(RuntimeError):
+    """Every slot holds an image of a request that is still in flight."""
+
+
+class ImageStore:
+    """
+    In-memory handoff of uploaded images to the OCR tool.
+
+    Uploads are registered under a `mem://<id>.<ext>` handle that can be put in
+    the agent prompt instead of a file path. The original base64 string is kept
+    next to the decoded bytes so it can be sent to the model without re-encoding.
+    """
+
+    def __init__(self, ttl: float = 600.0, max_items: int = 256, audit_dir: Optional[str] = None):
+        """
+        Args:
+            ttl: Seconds after which an unreleased image is dropped
+            max_items: Maximum number of images held at once; put() raises ImageStoreFull beyond it
+            audit_dir: Also write every upload to this directory (optional)
+        """
+        self.ttl = ttl
+        self.max_items = max_items
+        self.audit_dir = audit_dir
+        self._images: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if audit_dir:
+            os.makedirs(audit_dir, exist_ok=True)
+
+    def put(self, image_bytes: bytes, image_base64: Optional[str] = None) -> str:
+        """
+        Register an image and return its handle.
+
+        Args:
+            image_bytes: Decoded image bytes
+            image_base64: The base64 string the bytes were decoded from, if any
+
+        Returns:
+            Handle such as "mem://3f2a....png"
+
+        Raises:
+            ImageStoreFull: If max_items unexpired images are held
+        """
+        extension = _EXTENSIONS.get(detect_image_format(image_bytes), "img")
+        handle = f"{HANDLE_PREFIX}{uuid.uuid4().hex}.{extension}"
+
+        with self._lock:
+            self._evict(time.time())
+            if len(self._images) >= self.max_items:
+                raise ImageStoreFull(f"Too many images in flight ({self.max_items}), retry later")
+            self._images[handle] = (image_bytes, image_base64, time.time() + self.ttl)
+
+        if self.audit_dir:
+            with open(os.path.join(self.audit_dir, handle[len(HANDLE_PREFIX):]), "wb") as f:
+                f.write(image_bytes)
+
+        return handle
+
+    def get(self, handle: str) -> Tuple[bytes, Optional[str]]:
+        """
+        Return (image bytes, original base64 string or None) for a handle.
+
+        Raises:
+            FileNotFoundError: If the handle is unknown or expired
+        """
+        with self._lock:
+            entry = self._images.get(handle)
+        if entry is None or entry[2] < time.time():
+            raise FileNotFoundError(f"Image handle not found or expired: {handle}")
+        return entry[0], entry[1]
+
+    def release(self, handle: str) -> None:
+        """Drop an image once the request that uploaded it is finished."""
+        with self._lock:
+            self._images.pop(handle, None)
+
+    def _evict(self, now: float) -> None:
+        # Only expired images: a live one belongs to a request that may still read it
+        while self._images:
+            handle, entry = next(iter(self._images.items()))
+            if entry[2] >= now:
+                break
+            del self._images[handle]
+
+
+def decode_upload(image_base64: str) -> Tuple[bytes, str]:
+    """
+    Decode an uploaded base64 image, ignoring line breaks and other whitespace.
+
+    Returns:
+        Tuple of (image bytes, base64 string without whitespace)
+
+    Raises:
+        TypeError: If the data is not a string
+        binascii.Error, ValueError: If the data is not valid base64
+    """
+    if not isinstance(image_base64, str):
+        raise TypeError(f"Image data must be a base64 string, not {type(image_base64).__name__}")
+    image_base64 = "".join(image_base64.split())
+    return base64.b64decode(image_base64, validate=True), image_base64
+
+
+def is_handle(image_ref: str) -> bool:
+    return image_ref.startswith(HANDLE_PREFIX)
+
+
+def load_image(image_ref: str) -> Tuple[bytes, Optional[str]]:
+    """
+    Load an image given either an in-memory handle or a file path.
+
+    Args:
+        image_ref: "mem://..." handle or path to an image file
+
+    Returns:
+        Tuple of (image bytes, original base64 string or None)
+    """
+    if is_handle(image_ref):
+        return image_store.get(image_ref)
+    with open(image_ref, "rb") as f:
+        return f.read(), None
+
+
+image_store = ImageStore(
+    max_items=int(os.getenv("ZGS_IMAGE_STORE_MAX", "256")),
+    audit_dir=os.getenv("ZGS_UPLOAD_AUDIT_DIR"),
+)
@@ -1,10 +1,16 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
+from typing import Optional, Tuple
+import asyncio
 import base64
 import json
 
+from .image_preprocessing import preprocess_image, preprocess_settings
+from .image_store import load_image
+from .llm_clients import default_model, get_structured_llm
+from .result_cache import content_key, prompt_version, result_cache
+
 
 # Define the Pydantic schema for raw text output
 class RawTextOutput(BaseModel):
@@ -26,36 +32,7 @@ def encode_image(image_path: str) -> str:
         return base64.b64encode(image_file.read()).decode('utf-8')
 
 
-@tool
-def extract_text_from_image(image_path: str) -> str:
-    """
-    Extract all text from payment-related images (checks, bills, invoices, receipts).
-    Use this tool when you need to read text from an image file containing payment documents.
-
-    Args:
-        image_path: Path to the image file (jpg, png, etc.)
-
-    Returns:
-        JSON string with raw_text field containing all extracted text from the image
-    """
-    # Initialize the LLM with vision capabilities
-    llm = ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0,
-    )
-
-    # Create structured output LLM
-    structured_llm = llm.with_structured_output(RawTextOutput)
-
-    # Encode the image
-    base64_image = encode_image(image_path)
-
-    # Create message with image
-    message = HumanMessage(
-        content=[
-            {
-                "type": "text",
-                "text": """Extract ALL text from this payment-related document (check, bill, invoice, receipt, or any paper that needs to be paid).
+OCR_INSTRUCTIONS = """Extract ALL text from this payment-related document (check, bill, invoice, receipt, or any paper that needs to be paid).
 
 Focus on extracting every piece of text visible including:
 - Payee/company names
@@ -70,27 +47,110 @@ Focus on extracting every piece of text visible including:
 - Any other text visible
 
 Return ALL text exactly as it appears in the document. Don't summarize, don't skip anything - extract everything."""
+
+OCR_VERSION = prompt_version(OCR_INSTRUCTIONS, RawTextOutput.model_json_schema())
+
+
+def image_cache_key(image_bytes: bytes, version: str) -> str:
+    """Cache key of an image result: the bytes plus model, prompt version and preprocessing settings."""
+    return content_key(image_bytes, default_model(), version, preprocess_settings())
+
+
+def build_ocr_message(base64_image: str, mime_type: str = "image/jpeg",
+                      instructions: str = OCR_INSTRUCTIONS) -> HumanMessage:
+    """
+    Build the vision prompt for a base64 encoded document image.
+
+    Args:
+        base64_image: Base64 encoded image
+        mime_type: Real format of the image
+        instructions: Text prompt sent with the image
+
+    Returns:
+        HumanMessage with the OCR instructions and the image
+    """
+    return HumanMessage(
+        content=[
+            {
+                "type": "text",
+                "text": instructions
             },
             {
                 "type": "image_url",
                 "image_url": {
-                    "url": f"data:image/jpeg;base64,{base64_image}"
+                    "url": f"data:{mime_type};base64,{base64_image}"
                 }
             }
         ]
     )
 
-    # Execute and return result
-    result = structured_llm.invoke([message])
 
-    # Return as JSON string for agent compatibility
-    return result.model_dump_json()
+@tool
+def extract_text_from_image(image_path: str) -> str:
+    """
+    Extract all text from payment-related images (checks, bills, invoices, receipts).
+    Use this tool when you need to read text from an image file containing payment documents.
+
+    Args:
+        image_path: Path to the image file (jpg, png, etc.) or an uploaded image handle (mem://...)
+
+    Returns:
+        JSON string with raw_text field containing all extracted text from the image
+    """
+    image_bytes, image_base64 = load_image(image_path)
+
+    # Re-scans of the same bill are served from the cache
+    cache_key = image_cache_key(image_bytes, OCR_VERSION)
+    cached = result_cache.get("ocr", cache_key)
+    if cached is not None:
+        return cached
+
+    # Shared vision-capable structured LLM, built once per process
+    structured_llm = get_structured_llm(RawTextOutput)
+
+    # Shrink the photo to what the model needs, then encode it into the message
+    message = build_ocr_message(*prepare_image(image_bytes, image_base64))
+
+    # Execute and return result as JSON string for agent compatibility
+    result = structured_llm.invoke([message]).model_dump_json()
+    result_cache.set("ocr", cache_key, result)
+    return result
+
+
+async def _aextract_text_from_image(image_path: str) -> str:
+    """Async implementation of extract_text_from_image, used by `ainvoke`."""
+    image_bytes, image_base64 = await asyncio.to_thread(load_image, image_path)
+    cache_key = image_cache_key(image_bytes, OCR_VERSION)
+    cached = await result_cache.aget("ocr", cache_key)
+    if cached is not None:
+        return cached
+
+    structured_llm = get_structured_llm(RawTextOutput)
+    prepared = await asyncio.to_thread(prepare_image, image_bytes, image_base64)
+    message = build_ocr_message(*prepared)
+    result = (await structured_llm.ainvoke([message])).model_dump_json()
+    await result_cache.aset("ocr", cache_key, result)
+    return result
+
+
+def prepare_image(image_bytes: bytes, image_base64: Optional[str]) -> Tuple[str, str]:
+    """Preprocess an image and return (base64 string, MIME type) for the vision prompt."""
+    processed, mime_type = preprocess_image(image_bytes)
+    if processed is image_bytes and image_base64 is not None:
+        # Unchanged upload: reuse the client's base64 string instead of re-encoding
+        return image_base64, mime_type
+    return base64.b64encode(processed).decode('utf-8'), mime_type
+
+
+extract_text_from_image.coroutine = _aextract_text_from_image
 
 
 # Example usage
 if __name__ == "__main__":
+    from pathlib import Path
+
     # Path to your local image
-    image_path = r"C:\MasterThesis\ZGS-collabothon\zgs_backend\src\zgs_backend\rachuneczek.png"
+    image_path = str(Path(__file__).with_name("rachuneczek.png"))
 
     try:
         # Extract text from image using the tool
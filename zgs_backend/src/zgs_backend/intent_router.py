@@ -0,0 +1,175 @@
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import json
+import os
+import re
+import threading
+import unicodedata
+
+from .embeddings import VectorIndex, embed, embeddings_available
+from .telemetry import span
+
+
+# Voice intents understood by the ATM frontend (frontend/src/api/voiceClient.ts)
+INTENT_EXAMPLES: Dict[str, Tuple[str, ...]] = {
+    "transfer": (
+        "przelej pieniądze", "zrób przelew", "chcę zrobić przelew", "wyślij przelew",
+        "przelej 100 zł Janowi Kowalskiemu", "przelej 250 złotych mamie", "wyślij 50 zł Annie Nowak",
+        "zapłać 1000 zł Damianowi na konto", "przelew na 300 zł dla Piotra", "chcę przelać 20 zł koledze",
+        "transfer money", "send 100 zlotys to John", "make a transfer", "pay 50 PLN to Anna",
+    ),
+    "show_balance": (
+        "pokaż saldo", "saldo", "jakie mam saldo", "ile mam na koncie", "ile mam pieniędzy",
+        "sprawdź saldo", "stan konta", "pokaż stan konta", "ile zostało na koncie",
+        "show balance", "what is my balance", "check my balance", "how much money do I have",
+    ),
+    "show_mini_statement": (
+        "pokaż historię", "historia transakcji", "ostatnie transakcje", "pokaż ostatnie operacje",
+        "mini wyciąg", "wyciąg", "pokaż wyciąg", "co ostatnio płaciłem", "lista ostatnich przelewów",
+        "show mini statement", "recent transactions", "show my transaction history",
+    ),
+    "show_standing_orders": (
+        "zlecenia stałe", "pokaż zlecenia stałe", "moje zlecenia stałe", "jakie mam zlecenia",
+        "płatności cykliczne", "pokaż płatności cykliczne", "stałe przelewy", "zaplanowane płatności",
+        "show standing orders", "recurring payments", "my scheduled payments",
+    ),
+    "confirm": (
+        "tak", "tak zatwierdź", "zatwierdź", "potwierdzam", "potwierdź", "zgadza się", "dobrze",
+        "ok", "okej", "wykonaj", "tak wykonaj przelew", "zgoda", "jasne",
+        "yes", "confirm", "yes please", "that's right", "go ahead",
+    ),
+    "exit": (
+        "koniec", "wyjdź", "wyjście", "zakończ", "anuluj", "nie dziękuję", "do widzenia", "wyloguj",
+        "oddaj kartę", "rezygnuję", "nie", "przerwij",
+        "exit", "cancel", "quit", "goodbye", "no thanks", "log out",
+    ),
+}
+
+# Cosine similarity below which an utterance is "unknown" rather than the nearest intent
+INTENT_THRESHOLD = float(os.getenv("ZGS_INTENT_THRESHOLD", "0.6"))
+
+# Without embeddings, non-exact utterances with these stems still go to the agent as transfers
+_TRANSFER_WORDS = re.compile(r"\b(?:przel|przelew|wysl|zaplac|transfer|send|pay)")
+
+
+def normalize_utterance(text: str) -> str:
+    """Casefold and strip diacritics and punctuation, so ASR spelling variants compare equal."""
+    text = unicodedata.normalize("NFKD", text.casefold().replace("ł", "l"))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.sub(r"[^\w]+", " ", text).strip()
+
+
+class IntentRouter:
+    """
+    Map a voice transcript to an ATM intent without a model call.
+
+    Exact example phrases (after normalisation) are looked up directly; anything
+    else is embedded and matched to the nearest example in a VectorIndex. When
+    sentence-transformers is not installed only exact phrases and transfer
+    keywords are recognised.
+    """
+
+    def __init__(self, examples: Dict[str, Tuple[str, ...]] = INTENT_EXAMPLES, threshold: float = INTENT_THRESHOLD):
+        self.threshold = threshold
+        self._examples = [(intent, phrase) for intent, phrases in examples.items() for phrase in phrases]
+        self._exact = {normalize_utterance(phrase): intent for intent, phrase in self._examples}
+        self._index: Optional[VectorIndex] = None
+        self._lock = threading.Lock()
+
+    def _get_index(self) -> VectorIndex:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    vectors = embed([phrase for _, phrase in self._examples])
+                    index = VectorIndex(vectors.shape[1])
+                    index.add(range(len(self._examples)), vectors)
+                    self._index = index
+        return self._index
+
+    def warm_up(self) -> None:
+        """Load the embedding model and build the index ahead of the first request."""
+        if embeddings_available():
+            self._get_index()
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """
+        Classify a transcript.
+
+        Args:
+            text: Transcribed utterance
+
+        Returns:
+            (intent, similarity); intent is "unknown" below the threshold
+        """
+        with span("intent.classify"):
+            normalized = normalize_utterance(text)
+            intent = self._exact.get(normalized)
+            if intent is not None:
+                return intent, 1.0
+            if not embeddings_available() or not normalized:
+                return ("transfer", 0.0) if _TRANSFER_WORDS.search(normalized) else ("unknown", 0.0)
+
+            hits = self._get_index().search(embed([text])[0], k=1)
+            if not hits or hits[0][1] < self.threshold:
+                return "unknown", hits[0][1] if hits else 0.0
+            example_id, score = hits[0]
+            return self._examples[example_id][0], score
+
+
+intent_router = IntentRouter()
+
+
+def _transfer_command(transfer_json: str) -> Dict[str, Any]:
+    """
+    Map extract_transfer_info output (TransferInfo JSON) to the frontend's transfer command.
+
+    A recipient without an account whose name resembles a saved contact gets that
+    contact as "suggested_contact", for the customer to confirm; it is never
+    filled in as the recipient.
+    """
+    from .recipient_directory import recipient_directory
+
+    transfer = json.loads(transfer_json)
+    command = {
+        "intent": "transfer",
+        "amount": transfer.get("amount") or None,
+        "recipient_name": transfer.get("receiver") or None,
+    }
+    if command["recipient_name"] and not re.search(r"\d", transfer.get("bank_account") or ""):
+        match = recipient_directory.resolve(command["recipient_name"])
+        if match is not None:
+            command["suggested_contact"] = {"id": match[0].id, "name": match[0].name}
+    return command
+
+
+def interpret(text: str) -> Dict[str, Any]:
+    """
+    Turn a voice transcript into a frontend command.
+
+    Navigation and confirmation intents are resolved locally; for transfers the
+    amount and recipient come from one extract_transfer_info call (local
+    extraction, contact directory and caches first, then a single model call).
+
+    Args:
+        text: Transcribed utterance
+
+    Returns:
+        {"intent", "score"} plus "amount", "recipient_name" and possibly "suggested_contact" for transfers
+    """
+    # Imported here: converter_tool depends on this module through the recipient directory
+    from .converter_tool import extract_transfer_info
+
+    intent, score = intent_router.classify(text)
+    if intent != "transfer":
+        return {"intent": intent, "score": round(score, 3)}
+    return dict(_transfer_command(extract_transfer_info.invoke({"text": text})), score=round(score, 3))
+
+
+async def ainterpret(text: str) -> Dict[str, Any]:
+    """Async variant of interpret; classification runs in a worker thread to keep the event loop free."""
+    from .converter_tool import extract_transfer_info
+
+    intent, score = await asyncio.to_thread(intent_router.classify, text)
+    if intent != "transfer":
+        return {"intent": intent, "score": round(score, 3)}
+    return dict(_transfer_command(await extract_transfer_info.ainvoke({"text": text})), score=round(score, 3))
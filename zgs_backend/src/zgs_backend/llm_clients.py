@@ -0,0 +1,133 @@
+from langchain_openai import ChatOpenAI
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+from typing import Any, Dict, Hashable, Optional, Tuple, Type
+import threading
+import httpx
+import os
+
+from .call_policy import CALL_TIMEOUT, GuardedRunnable
+from .telemetry import token_usage_handler
+
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Keep-alive pool shared by every ChatOpenAI instance in the process
+HTTP_POOL_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=60.0,
+)
+
+_lock = threading.RLock()
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+_llms: Dict[Tuple[str, float, Optional[str]], ChatOpenAI] = {}
+_structured: Dict[Tuple[str, Type[BaseModel]], Any] = {}
+_chains: Dict[Hashable, Any] = {}
+
+
+def default_model() -> str:
+    """Model used by the tools, overridable with the ZGS_MODEL environment variable."""
+    return os.getenv("ZGS_MODEL", DEFAULT_MODEL)
+
+
+def get_http_client() -> httpx.Client:
+    """Return the process-wide pooled HTTP client used for all model calls."""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(limits=HTTP_POOL_LIMITS, timeout=60.0)
+    return _http_client
+
+
+def get_http_async_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled HTTP client used for all async model calls."""
+    global _http_async_client
+    if _http_async_client is None:
+        with _lock:
+            if _http_async_client is None:
+                _http_async_client = httpx.AsyncClient(limits=HTTP_POOL_LIMITS, timeout=60.0)
+    return _http_async_client
+
+
+def get_llm(model: Optional[str] = None, temperature: float = 0, api_key: Optional[str] = None) -> ChatOpenAI:
+    """
+    Return a shared ChatOpenAI client, creating it on first use.
+
+    Args:
+        model: Model name (defaults to default_model())
+        temperature: Sampling temperature
+        api_key: OpenAI API key (optional, uses OPENAI_API_KEY env var if not provided)
+
+    Returns:
+        ChatOpenAI instance reused for every call with the same arguments
+    """
+    key = (model or default_model(), temperature, api_key)
+    llm = _llms.get(key)
+    if llm is None:
+        with _lock:
+            llm = _llms.get(key)
+            if llm is None:
+                kwargs = {"api_key": api_key} if api_key else {}
+                llm = ChatOpenAI(
+                    model=key[0],
+                    temperature=temperature,
+                    http_client=get_http_client(),
+                    http_async_client=get_http_async_client(),
+                    # Retries and backoff are done by call_policy, not the SDK
+                    timeout=CALL_TIMEOUT,
+                    max_retries=0,
+                    callbacks=[token_usage_handler],
+                    **kwargs
+                )
+                _llms[key] = llm
+    return llm
+
+
+def get_structured_llm(schema: Type[BaseModel], model: Optional[str] = None):
+    """
+    Return a shared `with_structured_output(schema)` runnable for the given model.
+
+    Calls go through call_policy (rate limit, retries, deadline, hedging).
+    """
+    return GuardedRunnable(_get_raw_structured_llm(schema, model), model or default_model())
+
+
+def _get_raw_structured_llm(schema: Type[BaseModel], model: Optional[str] = None):
+    key = (model or default_model(), schema)
+    structured_llm = _structured.get(key)
+    if structured_llm is None:
+        with _lock:
+            structured_llm = _structured.get(key)
+            if structured_llm is None:
+                structured_llm = get_llm(key[0]).with_structured_output(schema)
+                _structured[key] = structured_llm
+    return structured_llm
+
+
+def get_structured_chain(prompt: ChatPromptTemplate, schema: Type[BaseModel], model: Optional[str] = None):
+    """
+    Return a shared `prompt | structured_llm` chain.
+
+    Prompts are expected to be module-level constants, so they are keyed by identity.
+    Calls go through call_policy (rate limit, retries, deadline, hedging).
+
+    Args:
+        prompt: Prompt template feeding the structured LLM
+        schema: Pydantic schema for the structured output
+        model: Model name (defaults to default_model())
+
+    Returns:
+        Runnable chain built once per (model, schema, prompt)
+    """
+    key = (model or default_model(), schema, id(prompt))
+    chain = _chains.get(key)
+    if chain is None:
+        with _lock:
+            chain = _chains.get(key)
+            if chain is None:
+                chain = GuardedRunnable(prompt | _get_raw_structured_llm(schema, key[0]), key[0])
+                _chains[key] = chain
+    return chain
@@ -0,0 +1,165 @@
+from datetime import date
+from pydantic import BaseModel
+from typing import Any, Dict, Iterable, Optional, Type
+import os
+import re
+
+
+# Polish NRB: 26 digits, optionally prefixed with PL and grouped as 2 + 6x4
+_ACCOUNT = re.compile(r"(?<![\dA-Z])(?:PL\s?)?\d{2}(?:[ \-]?\d{4}){6}(?!\d)", re.IGNORECASE)
+
+# Amounts must not be followed by another digit, so an ungrouped "1000" is not read as "100"
+_AMOUNT_LABELLED = re.compile(
+    r"(?:do\s+zap[łl]aty|kwota(?:\s+do\s+zap[łl]aty)?|razem(?:\s+do\s+zap[łl]aty)?|suma|"
+    r"[łl][ąa]czna\s+kwota(?:\s+do\s+zap[łl]aty)?|amount(?:\s+due)?|total)\s*:?\s*"
+    r"(\d{1,3}(?:[  .]\d{3})*(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?)(?!\d)\s*(?:pln|zł|zl)?",
+    re.IGNORECASE,
+)
+_AMOUNT_WITH_CURRENCY = re.compile(
+    r"(?<![\d.,])(\d{1,3}(?:[  ]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?)(?!\d)\s*(?:pln|zł|zl|złotych|zlotych)\b",
+    re.IGNORECASE,
+)
+
+_DUE_DATE = re.compile(
+    r"(?:termin\s+p[łl]atno[śs]ci|zap[łl]a[ćc]\s+do|p[łl]atne\s+do|due\s+date)\s*:?\s*"
+    r"(natychmiast|\d{1,2}[./-]\d{1,2}[./-]\d{4}|\d{4}-\d{2}-\d{2})",
+    re.IGNORECASE,
+)
+
+_DUE_KEYWORD = re.compile(r"\btermin|\bzap[łl]a[ćc]\s+do\b|\bp[łl]atne\s+do\b|\bdue\b", re.IGNORECASE)
+
+_LABELS = {
+    "receiver": re.compile(r"^\s*(?:odbiorca|nazwa\s+odbiorcy|receiver|payee)\s*:\s*(.+?)\s*$",
+                           re.IGNORECASE | re.MULTILINE),
+    "title": re.compile(r"^\s*(?:tytu[łl](?:em)?(?:\s+przelewu)?|title)\s*:\s*(.+?)\s*$",
+                        re.IGNORECASE | re.MULTILINE),
+    "address": re.compile(r"^\s*(?:adres(?:\s+odbiorcy)?|address)\s*:\s*(.+?)\s*$",
+                          re.IGNORECASE | re.MULTILINE),
+}
+
+
+def normalize_account(account: str) -> str:
+    """Strip spaces/dashes and the PL prefix from an account number."""
+    account = re.sub(r"[\s\-]", "", account).upper()
+    return account[2:] if account.startswith("PL") else account
+
+
+def is_valid_nrb(account: str) -> bool:
+    """
+    Validate a Polish NRB/IBAN account number with the ISO 13616 mod-97 checksum.
+
+    Args:
+        account: Account number with or without the PL prefix and spacing
+
+    Returns:
+        True if the number has 26 digits and a correct checksum
+    """
+    digits = normalize_account(account)
+    if not re.fullmatch(r"\d{26}", digits):
+        return False
+    # Move "PL" + check digits to the end; P=25, L=21
+    rearranged = digits[2:] + "2521" + digits[:2]
+    return int(rearranged) % 97 == 1
+
+
+def format_nrb(account: str) -> str:
+    """Format a 26-digit NRB as 'CC BBBB BBBB ...' like on Polish bills."""
+    digits = normalize_account(account)
+    return " ".join([digits[:2]] + [digits[i:i + 4] for i in range(2, 26, 4)])
+
+
+def parse_amount(text: str) -> Optional[float]:
+    """Parse a Polish amount such as '1 234,56' or '89.99' into a float."""
+    text = text.replace(" ", " ").strip()
+    if re.search(r"[.,]\d{1,2}$", text):
+        whole, fraction = re.split(r"[.,](?=\d{1,2}$)", text)
+    else:
+        whole, fraction = text, "0"
+    whole = re.sub(r"[ .]", "", whole)
+    if not whole.isdigit():
+        return None
+    return float(f"{whole}.{fraction}")
+
+
+def parse_due_date(text: str) -> Optional[str]:
+    """Normalise a due date to ISO YYYY-MM-DD, or 'immediate' for 'natychmiast'."""
+    if text.lower() == "natychmiast":
+        return "immediate"
+    match = re.fullmatch(r"(\d{1,2})[./-](\d{1,2})[./-](\d{4})", text)
+    try:
+        if match:
+            day, month, year = (int(part) for part in match.groups())
+            return date(year, month, day).isoformat()
+        return date.fromisoformat(text).isoformat()
+    except ValueError:
+        return None
+
+
+def extract_fields(text: str) -> Dict[str, Any]:
+    """
+    Extract payment fields from Polish bill or transfer text without a model call.
+
+    Only fields that were resolved with confidence are returned: account numbers
+    must pass the NRB checksum, amounts must be labelled or carry a currency, and
+    receiver/title/address must follow an explicit label. With ZGS_LOCAL_EXTRACT=0
+    nothing is extracted, so every field comes from the model.
+
+    Args:
+        text: Raw bill text or a transfer description
+
+    Returns:
+        Dictionary with any of: bank_account, amount, schedule, receiver, title, address
+    """
+    fields: Dict[str, Any] = {}
+    if os.getenv("ZGS_LOCAL_EXTRACT", "1") == "0":
+        return fields
+
+    for match in _ACCOUNT.finditer(text):
+        if is_valid_nrb(match.group(0)):
+            fields["bank_account"] = format_nrb(match.group(0))
+            break
+
+    amount_match = _AMOUNT_LABELLED.search(text) or _AMOUNT_WITH_CURRENCY.search(text)
+    if amount_match:
+        amount = parse_amount(amount_match.group(1))
+        if amount:
+            fields["amount"] = amount
+
+    due_match = _DUE_DATE.search(text)
+    if due_match:
+        schedule = parse_due_date(due_match.group(1))
+        if schedule:
+            fields["schedule"] = schedule
+    elif not _DUE_KEYWORD.search(text):
+        # Same rule as the bill prompt: no due date at all means pay immediately
+        fields["schedule"] = "immediate"
+
+    for field, pattern in _LABELS.items():
+        match = pattern.search(text)
+        if match:
+            fields[field] = match.group(1)
+
+    return fields
+
+
+def build_if_complete(fields: Dict[str, Any], schema: Type[BaseModel], required: Iterable[str]) -> Optional[BaseModel]:
+    """
+    Build `schema` from locally extracted fields if every required one was found.
+
+    Args:
+        fields: Output of extract_fields
+        schema: Pydantic schema to fill
+        required: Field names that must be present
+
+    Returns:
+        Schema instance, or None if the model has to fill in missing fields
+    """
+    if not all(fields.get(name) for name in required):
+        return None
+    return schema(**{name: fields.get(name) for name in schema.model_fields})
+
+
+def overlay(result: BaseModel, fields: Dict[str, Any]) -> BaseModel:
+    """Replace model output with locally validated values (checksummed accounts, parsed amounts)."""
+    update = {name: value for name, value in fields.items() if name in type(result).model_fields}
+    return result.model_copy(update=update)
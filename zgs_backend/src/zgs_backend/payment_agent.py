@@ -1,12 +1,54 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple, Callable
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import json
 import os
+import re
 
 # Import all tools
-from .image_to_text import extract_text_from_image
-from .scheduled_payment_tool import parse_bill_text, format_payment_message
-from .converter_tool import extract_transfer_info
+from .image_to_text import RawTextOutput, extract_text_from_image
+from .bill_scan_tool import BillScanResult, extract_payment_info_from_image
+from .scheduled_payment_tool import BILL_PROMPT, PaymentInfo, parse_bill_text, format_payment_message
+from .converter_tool import TRANSFER_PROMPT, TransferInfo, extract_transfer_info
+from .llm_clients import get_llm, get_structured_chain, get_structured_llm
+from .call_policy import GuardedRunnable, ModelCallError
+from .telemetry import request_trace, span
+from .agent_context import AgentContext
+
+
+IMAGE_EXTENSIONS = ("png", "jpg", "jpeg", "webp", "gif", "bmp", "tif", "tiff")
+_QUOTED_IMAGE_PATH = re.compile(
+    r"['\"]([^'\"]+\.(?:%s))['\"]" % "|".join(IMAGE_EXTENSIONS), re.IGNORECASE
+)
+_BARE_IMAGE_PATH = re.compile(
+    r"(\S+\.(?:%s))\b" % "|".join(IMAGE_EXTENSIONS), re.IGNORECASE
+)
+
+# Threads for independent tool calls returned in one planner response
+TOOL_WORKERS = int(os.getenv("ZGS_TOOL_WORKERS", "4"))
+
+
+def find_image_path(user_input: str) -> Optional[str]:
+    """Return the image path referenced in a request, or None for text-only requests."""
+    match = _QUOTED_IMAGE_PATH.search(user_input) or _BARE_IMAGE_PATH.search(user_input)
+    return match.group(1) if match else None
+
+
+def _validate_raw_text(result: str) -> bool:
+    return bool(json.loads(result).get("raw_text", "").strip())
+
+
+def _validate_payment_data(result: str) -> bool:
+    data = json.loads(result)
+    account_digits = re.sub(r"\D", "", str(data.get("bank_account") or ""))
+    amount = data.get("amount")
+    return (
+        bool(str(data.get("receiver") or "").strip())
+        and len(account_digits) >= 6
+        and isinstance(amount, (int, float))
+        and amount > 0
+    )
 
 
 class PaymentProcessingAgent:
@@ -20,23 +62,25 @@ class PaymentProcessingAgent:
     4. extract_transfer_info - Extracts transfer info from natural language text
     """
 
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, use_pipeline: bool = False, fused_ocr: bool = False):
         """
         Initialize the Payment Processing Agent.
 
         Args:
             api_key: OpenAI API key (optional, uses OPENAI_API_KEY env var if not provided)
+            use_pipeline: Run the fixed workflows directly and only fall back to the
+                LLM planner loop when a step fails validation (default: False)
+            fused_ocr: Read bill images with a single extract_payment_info_from_image
+                call instead of extract_text_from_image + parse_bill_text (default: False)
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.use_pipeline = use_pipeline
+        self.fused_ocr = fused_ocr
 
         if not self.api_key:
             raise ValueError("OpenAI API key must be provided or set in OPENAI_API_KEY environment variable")
 
-        self.llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0,
-            api_key=self.api_key
-        )
+        self.llm = get_llm(api_key=self.api_key)
 
         # Register all available tools
         self.tools = [
@@ -45,9 +89,11 @@ class PaymentProcessingAgent:
             format_payment_message,
             extract_transfer_info
         ]
+        self.tools_by_name = {tool.name: tool for tool in self.tools}
+        self._tool_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="agent-tool")
 
         # Bind tools to the LLM
-        self.llm_with_tools = self.llm.bind_tools(self.tools)
+        self.llm_with_tools = GuardedRunnable(self.llm.bind_tools(self.tools), self.llm.model_name)
 
         # System prompt
         self.system_prompt = """You are a payment processing assistant. Your job is to help users extract and process payment information from images or text.
@@ -55,7 +101,7 @@ class PaymentProcessingAgent:
 Available tools and their purposes:
 
 1. **extract_text_from_image** - Use FIRST when user provides an image path to a bill/check/invoice
-   - Input: image_path (path to image file)
+   - Input: image_path (path to image file or mem:// upload handle)
    - Output: JSON with raw_text extracted from the image
 
 2. **parse_bill_text** - Use AFTER extracting text from bills/invoices
@@ -85,24 +131,42 @@ IMPORTANT:
 - Always use tools in the correct order
 - Pass the output from one tool as input to the next
 - Don't skip steps in the workflow
+- For several documents or transfers, request the same step for all of them in one response; independent calls run in parallel
 - When you have the final formatted message, present it to the user
 """
 
-    def process_request(self, user_input: str, verbose: bool = True) -> Dict[str, Any]:
+    def process_request(self, user_input: str, verbose: bool = False, fused_ocr: Optional[bool] = None) -> Dict[str, Any]:
         """
         Process user request and use appropriate tools to complete the task.
 
         Args:
             user_input: User's request
-            verbose: Print execution details (default: True)
+            verbose: Print execution details (default: False)
+            fused_ocr: Override the agent's fused_ocr setting for this request. The
+                fused scan runs as a pipeline step, so it also enables the pipeline.
 
         Returns:
-            Dictionary with processing results and execution history
+            Dictionary with processing results and execution history, plus a "trace"
+            with per-stage timings, token usage, cost and cache hits
         """
-        messages = [
-            SystemMessage(content=self.system_prompt),
-            HumanMessage(content=user_input)
-        ]
+        with request_trace() as trace:
+            with span("agent.request"):
+                result = self._process_request(user_input, verbose, fused_ocr)
+            result["trace"] = trace.summary()
+        return result
+
+    def _process_request(self, user_input: str, verbose: bool, fused_ocr: Optional[bool]) -> Dict[str, Any]:
+        fused_ocr = self.fused_ocr if fused_ocr is None else fused_ocr
+        if self.use_pipeline or fused_ocr:
+            result = self.run_pipeline(user_input, verbose=verbose, fused_ocr=fused_ocr)
+            if result is not None:
+                return result
+
+            if verbose:
+                print("\n⚠️  Pipeline step failed validation, falling back to agent loop")
+
+        # Keeps the system prompt prefix stable and drops consumed OCR text from later iterations
+        context = AgentContext(self.system_prompt, user_input)
 
         execution_history = []
         max_iterations = 15
@@ -123,8 +187,9 @@ IMPORTANT:
                 print(f"{'─' * 70}")
 
             # Get AI response
-            response = self.llm_with_tools.invoke(messages)
-            messages.append(response)
+            with span("agent.plan", iteration=iteration):
+                response = self.llm_with_tools.invoke(context.compact())
+            context.add_response(response)
 
             # Check if AI wants to use tools
             if not response.tool_calls:
@@ -140,61 +205,313 @@ IMPORTANT:
                     "success": True,
                     "final_answer": response.content,
                     "execution_history": execution_history,
-                    "iterations": iteration
+                    "iterations": iteration,
+                    "mode": "agent"
                 }
 
-            # Execute each tool call
-            for tool_call in response.tool_calls:
-                tool_name = tool_call["name"]
-                tool_args = tool_call["args"]
-                tool_id = tool_call["id"]
+            # Execute the tool calls; independent calls from one response run concurrently
+            if len(response.tool_calls) > 1:
+                # Each call runs in a copy of this thread's context so its spans land in the request trace
+                futures = [
+                    self._tool_executor.submit(contextvars.copy_context().run, self._run_tool, tool_call, iteration, verbose)
+                    for tool_call in response.tool_calls
+                ]
+                outcomes = [future.result() for future in futures]
+            else:
+                outcomes = [self._run_tool(response.tool_calls[0], iteration, verbose)]
+
+            # Results are added in the order the model asked for them
+            for tool_call, (tool_result, history_entry) in zip(response.tool_calls, outcomes):
+                if history_entry is not None:
+                    execution_history.append(history_entry)
+                context.add_tool_result(tool_call["id"], tool_result, failed=history_entry is None)
+
+        return {
+            "success": False,
+            "error": "Max iterations reached",
+            "execution_history": execution_history,
+            "iterations": iteration,
+            "mode": "agent"
+        }
+
+    def run_pipeline(self, user_input: str, verbose: bool = False, fused_ocr: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        """
+        Run Workflow A or B directly, without asking the LLM planner for the next step.
+
+        The route is chosen locally: if the request references an image file,
+        Workflow A (extract_text_from_image -> parse_bill_text -> format_payment_message)
+        is used, otherwise Workflow B (extract_transfer_info -> format_payment_message).
+        With fused_ocr, Workflow A reads the image with extract_payment_info_from_image
+        in one call instead.
+
+        Args:
+            user_input: User's request
+            verbose: Print execution details (default: False)
+            fused_ocr: Override the agent's fused_ocr setting for this request
+
+        Returns:
+            Dictionary with processing results in the same shape as process_request,
+            or None if any step failed validation
+        """
+        steps = self._pipeline_steps(user_input, fused_ocr)
+
+        if verbose:
+            print("\n" + "=" * 70)
+            print("⚡ PAYMENT PROCESSING PIPELINE STARTED")
+            print("=" * 70)
+            print(f"User Request: {user_input}")
+
+        execution_history = []
+        tool_result = None
+
+        for tool, build_args, validate in steps:
+            tool_args = build_args(tool_result)
 
+            if verbose:
+                print(f"\n🔧 Executing: {tool.name}")
+
+            try:
+                with span(f"tool.{tool.name}", iteration=0):
+                    tool_result = tool.invoke(tool_args)
+                if validate is not None and not validate(tool_result):
+                    raise ValueError(f"invalid output: {str(tool_result)[:200]}")
+            except ModelCallError:
+                # The provider is down or too slow; retrying through the planner would only add load
+                raise
+            except Exception as e:
                 if verbose:
-                    print(f"\n🔧 Executing: {tool_name}")
-                    print(f"   Arguments: {tool_args}")
-
-                # Find and execute the tool
-                tool_result = None
-                for tool in self.tools:
-                    if tool.name == tool_name:
-                        try:
-                            tool_result = tool.invoke(tool_args)
-
-                            if verbose:
-                                print(f"   ✓ Success")
-                                # Print abbreviated result
-                                result_preview = str(tool_result)[:200]
-                                if len(str(tool_result)) > 200:
-                                    result_preview += "..."
-                                print(f"   Result preview: {result_preview}")
-
-                            # Log execution
-                            execution_history.append({
-                                "tool": tool_name,
-                                "args": tool_args,
-                                "result": tool_result,
-                                "iteration": iteration
-                            })
-
-                        except Exception as e:
-                            tool_result = f"Error: {str(e)}"
-                            if verbose:
-                                print(f"   ✗ Failed: {e}")
-                        break
-
-                # Add tool result to messages
-                messages.append(ToolMessage(
-                    content=str(tool_result),
-                    tool_call_id=tool_id
-                ))
+                    print(f"   ✗ Failed: {e}")
+                return None
+
+            if verbose:
+                print(f"   ✓ Success")
+
+            execution_history.append({
+                "tool": tool.name,
+                "args": tool_args,
+                "result": tool_result,
+                "iteration": 0
+            })
+
+        if verbose:
+            print(f"\n{'=' * 70}")
+            print("FINAL RESPONSE")
+            print(f"{'=' * 70}")
+            print(tool_result)
+
+        return {
+            "success": True,
+            "final_answer": tool_result,
+            "execution_history": execution_history,
+            "iterations": 0,
+            "mode": "pipeline"
+        }
+
+    async def aprocess_request(self, user_input: str, verbose: bool = False,
+                               fused_ocr: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Async variant of process_request using the `ainvoke` paths of the LLM and tools.
+
+        Args:
+            user_input: User's request
+            verbose: Print execution details (default: False)
+            fused_ocr: Override the agent's fused_ocr setting for this request
+
+        Returns:
+            Dictionary with processing results, execution history and "trace"
+        """
+        with request_trace() as trace:
+            with span("agent.request"):
+                result = await self._aprocess_request(user_input, verbose, fused_ocr)
+            result["trace"] = trace.summary()
+        return result
+
+    async def _aprocess_request(self, user_input: str, verbose: bool, fused_ocr: Optional[bool]) -> Dict[str, Any]:
+        fused_ocr = self.fused_ocr if fused_ocr is None else fused_ocr
+        if self.use_pipeline or fused_ocr:
+            result = await self.arun_pipeline(user_input, verbose=verbose, fused_ocr=fused_ocr)
+            if result is not None:
+                return result
+
+        # Keeps the system prompt prefix stable and drops consumed OCR text from later iterations
+        context = AgentContext(self.system_prompt, user_input)
+
+        execution_history = []
+        max_iterations = 15
+        iteration = 0
+
+        while iteration < max_iterations:
+            iteration += 1
+
+            with span("agent.plan", iteration=iteration):
+                response = await self.llm_with_tools.ainvoke(context.compact())
+            context.add_response(response)
+
+            if not response.tool_calls:
+                return {
+                    "success": True,
+                    "final_answer": response.content,
+                    "execution_history": execution_history,
+                    "iterations": iteration,
+                    "mode": "agent"
+                }
+
+            outcomes = await asyncio.gather(*(
+                self._arun_tool(tool_call, iteration, verbose) for tool_call in response.tool_calls
+            ))
+            for tool_call, (tool_result, history_entry) in zip(response.tool_calls, outcomes):
+                if history_entry is not None:
+                    execution_history.append(history_entry)
+                context.add_tool_result(tool_call["id"], tool_result, failed=history_entry is None)
 
         return {
             "success": False,
             "error": "Max iterations reached",
             "execution_history": execution_history,
-            "iterations": iteration
+            "iterations": iteration,
+            "mode": "agent"
         }
 
+    def _run_tool(self, tool_call: Dict[str, Any], iteration: int, verbose: bool) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """
+        Execute one tool call from the planner.
+
+        Returns:
+            (result or error text for the ToolMessage, execution_history entry or None on failure)
+        """
+        tool_name = tool_call["name"]
+        tool_args = tool_call["args"]
+
+        if verbose:
+            print(f"\n🔧 Executing: {tool_name}")
+            print(f"   Arguments: {tool_args}")
+
+        tool = self.tools_by_name.get(tool_name)
+        if tool is None:
+            return f"Error: unknown tool {tool_name}", None
+
+        try:
+            with span(f"tool.{tool_name}", iteration=iteration):
+                tool_result = tool.invoke(tool_args)
+        except ModelCallError:
+            # The provider is down or too slow; retrying through the planner would only add load
+            raise
+        except Exception as e:
+            if verbose:
+                print(f"   ✗ Failed: {e}")
+            return f"Error: {str(e)}", None
+
+        if verbose:
+            print(f"   ✓ Success")
+            # Print abbreviated result
+            result_preview = str(tool_result)[:200]
+            if len(str(tool_result)) > 200:
+                result_preview += "..."
+            print(f"   Result preview: {result_preview}")
+
+        return tool_result, {
+            "tool": tool_name,
+            "args": tool_args,
+            "result": tool_result,
+            "iteration": iteration
+        }
+
+    async def _arun_tool(self, tool_call: Dict[str, Any], iteration: int, verbose: bool) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """Async variant of _run_tool."""
+        tool_name = tool_call["name"]
+        tool_args = tool_call["args"]
+
+        if verbose:
+            print(f"\n🔧 Executing: {tool_name}")
+
+        tool = self.tools_by_name.get(tool_name)
+        if tool is None:
+            return f"Error: unknown tool {tool_name}", None
+
+        try:
+            with span(f"tool.{tool_name}", iteration=iteration):
+                tool_result = await tool.ainvoke(tool_args)
+        except ModelCallError:
+            raise
+        except Exception as e:
+            if verbose:
+                print(f"   ✗ Failed: {e}")
+            return f"Error: {str(e)}", None
+
+        return tool_result, {
+            "tool": tool_name,
+            "args": tool_args,
+            "result": tool_result,
+            "iteration": iteration
+        }
+
+    async def arun_pipeline(self, user_input: str, verbose: bool = False,
+                            fused_ocr: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        """
+        Async variant of run_pipeline.
+
+        Args:
+            user_input: User's request
+            verbose: Print execution details (default: False)
+            fused_ocr: Override the agent's fused_ocr setting for this request
+
+        Returns:
+            Dictionary with processing results, or None if any step failed validation
+        """
+        execution_history = []
+        tool_result = None
+
+        for tool, build_args, validate in self._pipeline_steps(user_input, fused_ocr):
+            tool_args = build_args(tool_result)
+
+            try:
+                with span(f"tool.{tool.name}", iteration=0):
+                    tool_result = await tool.ainvoke(tool_args)
+                if validate is not None and not validate(tool_result):
+                    raise ValueError(f"invalid output: {str(tool_result)[:200]}")
+            except ModelCallError:
+                # The provider is down or too slow; retrying through the planner would only add load
+                raise
+            except Exception as e:
+                if verbose:
+                    print(f"   ✗ {tool.name} failed: {e}")
+                return None
+
+            execution_history.append({
+                "tool": tool.name,
+                "args": tool_args,
+                "result": tool_result,
+                "iteration": 0
+            })
+
+        return {
+            "success": True,
+            "final_answer": tool_result,
+            "execution_history": execution_history,
+            "iterations": 0,
+            "mode": "pipeline"
+        }
+
+    def _pipeline_steps(self, user_input: str, fused_ocr: Optional[bool] = None) -> List[Tuple[Any, Callable, Optional[Callable]]]:
+        """Choose the workflow for a request as (tool, build_args, validate) steps."""
+        fused_ocr = self.fused_ocr if fused_ocr is None else fused_ocr
+        image_path = find_image_path(user_input)
+        if image_path and fused_ocr:
+            steps = [
+                (extract_payment_info_from_image, lambda _: {"image_path": image_path}, _validate_payment_data),
+            ]
+        elif image_path:
+            steps = [
+                (extract_text_from_image, lambda _: {"image_path": image_path}, _validate_raw_text),
+                (parse_bill_text, lambda prev: {"raw_text": json.loads(prev)["raw_text"]}, _validate_payment_data),
+            ]
+        else:
+            steps = [
+                (extract_transfer_info, lambda _: {"text": user_input}, _validate_payment_data),
+            ]
+        steps.append((format_payment_message, lambda prev: {"payment_data": prev}, None))
+        return steps
+
     def get_tools_info(self) -> List[Dict[str, str]]:
         """Get information about available tools."""
         return [
@@ -205,9 +522,23 @@ IMPORTANT:
             for tool in self.tools
         ]
 
+    def preload(self) -> None:
+        """
+        Build the shared structured-output chains of every tool now instead of on first use.
+
+        Called in the server parent before forking workers, so the chains are
+        shared copy-on-write and the first request of each worker does not pay for them.
+        """
+        get_structured_chain(TRANSFER_PROMPT, TransferInfo)
+        get_structured_chain(BILL_PROMPT, PaymentInfo)
+        get_structured_llm(RawTextOutput)
+        get_structured_llm(BillScanResult)
+
 
 # Example usage
 if __name__ == "__main__":
+    from pathlib import Path
+
     # Initialize agent
     agent = PaymentProcessingAgent()
 
@@ -224,7 +555,8 @@ if __name__ == "__main__":
     print("=" * 70)
 
     result1 = agent.process_request(
-        r"Extract payment information from the bill image at 'C:\Users\Mateusz\Desktop\ZGS-collabothon\zgs_backend\src\zgs_backend\rachuneczek.png' and give me the formatted payment details"
+        f"Extract payment information from the bill image at '{Path(__file__).with_name('rachuneczek.png')}' and give me the formatted payment details",
+        verbose=True
     )
 
     if result1['success']:
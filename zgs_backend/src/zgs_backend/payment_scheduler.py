@@ -0,0 +1,466 @@
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+import json
+import logging
+import math
+import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no leader lock, run the scheduler in the one process
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+# Standing order frequencies offered by the frontend's StandingOrderScreen
+FREQUENCIES = {"weekly": 7, "bi-weekly": 14, "monthly": 1, "quarterly": 3}  # days, or months for the last two
+
+MAX_ATTEMPTS = int(os.getenv("ZGS_PAYMENT_MAX_ATTEMPTS", "5"))
+RETRY_DELAY = float(os.getenv("ZGS_PAYMENT_RETRY_DELAY", "60"))     # seconds, doubled per failed attempt
+# A claimed payment is requeued if its dispatcher has not finished it within this many seconds;
+# it must exceed the time one batch takes to dispatch
+LEASE_SECONDS = float(os.getenv("ZGS_PAYMENT_LEASE", "300"))
+# How often a standby process retries the leader lock
+LEADER_RETRY = float(os.getenv("ZGS_SCHEDULER_LEADER_RETRY", "5"))
+
+
+def normalize_frequency(frequency: Optional[str]) -> Optional[str]:
+    """Map 'Bi-weekly', 'biweekly', 'MONTHLY'... to a FREQUENCIES key; None for one-off payments."""
+    if frequency is None or frequency == "":
+        return None
+    if not isinstance(frequency, str):
+        raise ValueError(f"Frequency must be a string, expected one of {', '.join(FREQUENCIES)}")
+    key = frequency.strip().lower().replace("_", "-").replace(" ", "-")
+    key = {"biweekly": "bi-weekly", "fortnightly": "bi-weekly"}.get(key, key)
+    if key not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency {frequency!r}, expected one of {', '.join(FREQUENCIES)}")
+    return key
+
+
+def validate_payment(payment: Dict[str, Any]) -> None:
+    """
+    Check that a payment can be dispatched, with the rules the agent's pipeline applies.
+
+    Raises:
+        ValueError: Without a receiver, an account of 6+ digits or a positive amount
+    """
+    if not str(payment.get("receiver") or "").strip():
+        raise ValueError("Payment needs a 'receiver'")
+    if len(re.sub(r"\D", "", str(payment.get("bank_account") or ""))) < 6:
+        raise ValueError("Payment needs a 'bank_account' of at least 6 digits")
+    amount = payment.get("amount")
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)) or not 0 < amount < math.inf:
+        raise ValueError("Payment 'amount' must be a positive number")
+
+
+def next_due_date(due: date, frequency: str, anchor_day: int) -> date:
+    """
+    Next occurrence of a standing order.
+
+    Monthly and quarterly orders keep their original day of month (`anchor_day`)
+    and fall back to the last day of shorter months: 31 Jan -> 29 Feb -> 31 Mar.
+    """
+    if frequency in ("weekly", "bi-weekly"):
+        return due + timedelta(days=FREQUENCIES[frequency])
+    month = due.month - 1 + FREQUENCIES[frequency]
+    year, month = due.year + month // 12, month % 12 + 1
+    return date(year, month, min(anchor_day, monthrange(year, month)[1]))
+
+
+def due_timestamp(schedule: Optional[str], now: Optional[float] = None) -> float:
+    """Epoch seconds for a payment schedule: 'immediate' (or empty) is now, an ISO date is local midnight."""
+    now = time.time() if now is None else now
+    if not schedule or schedule == "immediate":
+        return now
+    return max(now, datetime.combine(date.fromisoformat(schedule), datetime.min.time()).timestamp())
+
+
+class PaymentStore:
+    """
+    Durable SQLite store for scheduled and standing-order payments.
+
+    Pending rows are covered by a partial index on due_at, so finding the next
+    due payment or claiming everything due is an index range scan, whatever
+    the number of pending orders. A claim is a lease: the row records its owner
+    and lease expiry, and only expired claims are handed to another dispatcher.
+    """
+
+    def __init__(self, path: str = "zgs_payments.sqlite3"):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS payments ("
+                " id INTEGER PRIMARY KEY,"
+                " payment TEXT NOT NULL,"
+                " due_at REAL NOT NULL,"
+                " frequency TEXT,"
+                " anchor_day INTEGER,"
+                " status TEXT NOT NULL DEFAULT 'pending',"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " last_error TEXT,"
+                " dispatched_count INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " claimed_by TEXT,"
+                " claimed_until REAL)"
+            )
+            # Databases created before claims were leased
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(payments)")}
+            for column, kind in (("claimed_by", "TEXT"), ("claimed_until", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE payments ADD COLUMN {column} {kind}")
+            conn.execute("CREATE INDEX IF NOT EXISTS payments_pending_due ON payments (due_at) WHERE status = 'pending'")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS payments_dispatching_lease ON payments (claimed_until)"
+                " WHERE status = 'dispatching'"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Reconnect in forked workers: SQLite connections must not be used across fork()
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record["payment"] = json.loads(record["payment"])
+        return record
+
+    def add(self, payment: Dict[str, Any], due_at: float, frequency: Optional[str] = None) -> int:
+        """
+        Store a payment.
+
+        Args:
+            payment: Payment details, e.g. the "payment_request" from format_payment_message
+            due_at: Epoch seconds of the (first) due date
+            frequency: None for a one-off payment, else a FREQUENCIES key
+
+        Returns:
+            Payment id
+        """
+        return self.add_many([(payment, due_at, frequency)])[0]
+
+    def add_many(self, items: List[tuple]) -> List[int]:
+        """Store many (payment, due_at, frequency) tuples in one transaction."""
+        conn = self._connect()
+        now = time.time()
+        ids = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for payment, due_at, frequency in items:
+                frequency = normalize_frequency(frequency)
+                anchor_day = date.fromtimestamp(due_at).day if frequency else None
+                cursor = conn.execute(
+                    "INSERT INTO payments (payment, due_at, frequency, anchor_day, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (json.dumps(payment, ensure_ascii=False), due_at, frequency, anchor_day, now, now),
+                )
+                ids.append(cursor.lastrowid)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return ids
+
+    def get(self, payment_id: int) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM payments WHERE id = ?", (payment_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def list(self, status: Optional[str] = None, recurring: Optional[bool] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Payments by due date, optionally filtered by status and by standing order / one-off."""
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if recurring is not None:
+            clauses.append("frequency IS NOT NULL" if recurring else "frequency IS NULL")
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(f"SELECT * FROM payments{where} ORDER BY due_at LIMIT ?", (*params, limit))
+        return [self._row(row) for row in rows]
+
+    def cancel(self, payment_id: int) -> bool:
+        """Cancel a pending payment or standing order; False if it is not pending."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE payments SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'pending'",
+                (time.time(), payment_id),
+            )
+        return cursor.rowcount == 1
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the earliest pending payment or expiring claim (two index lookups)."""
+        row = self._connect().execute(
+            "SELECT MIN(due) FROM ("
+            " SELECT MIN(due_at) AS due FROM payments WHERE status = 'pending'"
+            " UNION ALL SELECT MIN(claimed_until) FROM payments WHERE status = 'dispatching')"
+        ).fetchone()
+        return row[0]
+
+    def claim_due(self, until: float, limit: int = 500, owner: Optional[str] = None,
+                  lease: float = LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """
+        Lease up to `limit` pending payments due by `until` to `owner` and return them.
+
+        The claim is one write transaction, so several processes sharing the
+        database never dispatch the same payment twice. Claims whose lease has
+        expired (their dispatcher crashed or hung) are requeued first.
+
+        Args:
+            until: Claim payments due up to these epoch seconds
+            limit: Maximum number of payments to claim
+            owner: Claimant recorded on the rows; defaults to "<host>:<pid>"
+            lease: Seconds the claimant has to `finish` the payments
+
+        Returns:
+            Claimed payments
+        """
+        owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            self._requeue_expired(conn, now)
+            rows = conn.execute(
+                "SELECT * FROM payments WHERE status = 'pending' AND due_at <= ? ORDER BY due_at LIMIT ?",
+                (until, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE payments SET status = 'dispatching', claimed_by = ?, claimed_until = ?, updated_at = ?"
+                " WHERE id = ?",
+                [(owner, now + lease, now, row["id"]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [dict(self._row(row), claimed_by=owner) for row in rows]
+
+    def finish(self, results: List[tuple]) -> None:
+        """
+        Record dispatch outcomes as (claimed payment, error or None).
+
+        A sent one-off payment becomes 'sent'; a standing order moves to its next
+        due date. Failures are retried with exponential backoff until MAX_ATTEMPTS.
+        Outcomes of claims that have since been requeued and taken over by
+        another dispatcher are not recorded.
+        """
+        now = time.time()
+        updates = []
+        for payment, error in results:
+            if error is None and payment["frequency"]:
+                due = next_due_date(date.fromtimestamp(payment["due_at"]), payment["frequency"], payment["anchor_day"])
+                updates.append(("pending", datetime.combine(due, datetime.min.time()).timestamp(), 0, None, 1, payment["id"]))
+            elif error is None:
+                updates.append(("sent", payment["due_at"], 0, None, 1, payment["id"]))
+            elif payment["attempts"] + 1 >= MAX_ATTEMPTS:
+                updates.append(("failed", payment["due_at"], payment["attempts"] + 1, error, 0, payment["id"]))
+            else:
+                retry_at = now + RETRY_DELAY * 2 ** payment["attempts"]
+                updates.append(("pending", retry_at, payment["attempts"] + 1, error, 0, payment["id"]))
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE payments SET status = ?, due_at = ?, attempts = ?, last_error = ?,"
+                " dispatched_count = dispatched_count + ?, claimed_by = NULL, claimed_until = NULL, updated_at = ?"
+                " WHERE id = ? AND status = 'dispatching' AND claimed_by = ?",
+                [update[:5] + (now, update[5], payment["claimed_by"]) for update, (payment, _) in zip(updates, results)],
+            )
+
+    @staticmethod
+    def _requeue_expired(conn: sqlite3.Connection, now: float) -> int:
+        # Claims from before leases were recorded have no expiry and count as expired
+        cursor = conn.execute(
+            "UPDATE payments SET status = 'pending', claimed_by = NULL, claimed_until = NULL, updated_at = ?"
+            " WHERE status = 'dispatching' AND (claimed_until IS NULL OR claimed_until < ?)",
+            (now, now),
+        )
+        return cursor.rowcount
+
+    def requeue_interrupted(self) -> int:
+        """Return payments whose dispatch lease has expired (crashed or hung dispatcher) to 'pending'."""
+        with self._connect() as conn:
+            return self._requeue_expired(conn, time.time())
+
+
+def log_dispatcher(payments: List[Dict[str, Any]]) -> List[Optional[str]]:
+    """Default dispatcher: there is no core banking connection here, so due payments are only logged."""
+    for payment in payments:
+        log.info("dispatching payment %s (%s) due %s", payment["id"], payment["dispatch_key"],
+                 datetime.fromtimestamp(payment["due_at"]).isoformat(timespec="minutes"))
+    return [None] * len(payments)
+
+
+class PaymentScheduler:
+    """
+    Background thread that dispatches payments as they fall due.
+
+    It sleeps until the earliest pending due time (or until `schedule` adds an
+    earlier one), then claims and dispatches everything due within `window`
+    seconds in batches of `batch_size`. The dispatcher receives a list of
+    payments, each with a `dispatch_key` ("<id>:<due_at>") to make sending
+    idempotent, and returns an error message or None per payment.
+
+    Started with a `leader_lock` file, it only dispatches while it holds an
+    exclusive lock on that file; in the other processes it waits as a standby
+    and takes over within LEADER_RETRY seconds when the leader exits.
+    """
+
+    def __init__(self, store: PaymentStore, dispatch: Callable[[List[Dict[str, Any]]], List[Optional[str]]] = log_dispatcher,
+                 window: float = 1.0, batch_size: int = 500, max_sleep: float = 300.0):
+        self.store = store
+        self.dispatch = dispatch
+        self.window = window
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        self._wake = threading.Condition()
+        self._wake_at: Optional[float] = None
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self.leader = False
+
+    @property
+    def running(self) -> bool:
+        """True while the scheduler dispatches or waits as a standby for the leader lock."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, leader_lock: Optional[str] = None) -> "PaymentScheduler":
+        """
+        Start dispatching in a background thread.
+
+        Args:
+            leader_lock: Lock file shared by the processes that start a scheduler on
+                the same store; only the lock holder dispatches. None to always dispatch.
+        """
+        if self._thread is None:
+            if leader_lock is None or fcntl is None:
+                target, args = self._lead, ()
+            else:
+                target, args = self._lead_with_lock, (leader_lock,)
+            self._thread = threading.Thread(target=target, args=args, name="payment-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def _lead_with_lock(self, path: str) -> None:
+        # The lock belongs to this open file and is released when the process exits, however it exits
+        with open(path, "a") as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except OSError:
+                    with self._wake:
+                        if self._stopping:
+                            return
+                        self._wake.wait(LEADER_RETRY)
+            try:
+                self._lead()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _lead(self) -> None:
+        self.leader = True
+        try:
+            requeued = self.store.requeue_interrupted()
+            if requeued:
+                log.warning("requeued %d payments interrupted during dispatch", requeued)
+            self._run()
+        finally:
+            self.leader = False
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        with self._wake:
+            self._stopping = True
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def schedule(self, payment: Dict[str, Any], schedule: Optional[str] = None, frequency: Optional[str] = None) -> int:
+        """
+        Store a payment and wake the scheduler if it is due before its next wake-up.
+
+        Args:
+            payment: Payment details (e.g. "payment_request" from format_payment_message)
+            schedule: ISO date or "immediate"; defaults to payment["schedule"]
+            frequency: Standing order frequency (weekly, bi-weekly, monthly, quarterly) or None
+
+        Returns:
+            Payment id
+
+        Raises:
+            ValueError: If the payment, schedule or frequency is invalid
+        """
+        validate_payment(payment)
+        due_at = due_timestamp(schedule if schedule is not None else payment.get("schedule"))
+        payment_id = self.store.add(payment, due_at, frequency)
+        with self._wake:
+            if self._wake_at is None or due_at < self._wake_at:
+                self._wake.notify()
+        return payment_id
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """Dispatch everything due by now + window; returns the number of payments dispatched."""
+        until = (time.time() if now is None else now) + self.window
+        dispatched = 0
+        while not self._stopping:
+            batch = self.store.claim_due(until, self.batch_size)
+            if not batch:
+                break
+            for payment in batch:
+                payment["dispatch_key"] = f"{payment['id']}:{payment['due_at']:.0f}"
+            try:
+                errors = self.dispatch(batch)
+            except Exception as e:
+                errors = [f"{type(e).__name__}: {e}"] * len(batch)
+            self.store.finish(list(zip(batch, errors)))
+            dispatched += len(batch)
+        return dispatched
+
+    def _run(self) -> None:
+        while True:
+            with self._wake:
+                if self._stopping:
+                    return
+                next_due = self.store.next_due()
+                now = time.time()
+                if next_due is None or next_due > now + self.window:
+                    self._wake_at = min(next_due or now + self.max_sleep, now + self.max_sleep)
+                    self._wake.wait(self._wake_at - now)
+                    continue
+                self._wake_at = None
+            try:
+                self.run_due()
+            except Exception:
+                log.exception("scheduled payment dispatch failed")
+                time.sleep(1.0)
+
+
+def _scheduler_from_env() -> PaymentScheduler:
+    """Build the process scheduler on ZGS_PAYMENTS_PATH (not started)."""
+    return PaymentScheduler(PaymentStore(os.getenv("ZGS_PAYMENTS_PATH", "zgs_payments.sqlite3")))
+
+
+_payment_scheduler: Optional[PaymentScheduler] = None
+_lock = threading.Lock()
+
+
+def get_payment_scheduler() -> PaymentScheduler:
+    """Return the process scheduler, opening its database on first use (not started)."""
+    global _payment_scheduler
+    if _payment_scheduler is None:
+        with _lock:
+            if _payment_scheduler is None:
+                _payment_scheduler = _scheduler_from_env()
+    return _payment_scheduler
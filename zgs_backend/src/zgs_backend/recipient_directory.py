@@ -0,0 +1,419 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Optional, Set, Tuple
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from .intent_router import normalize_utterance
+
+
+class Contact(BaseModel):
+    """Schema for a saved transfer recipient"""
+    id: str = Field(description="Contact identifier")
+    name: str = Field(description="Recipient name as shown on the transfer")
+    bank_account: str = Field(description="Bank account number")
+    address: Optional[str] = Field(default=None, description="Address of the recipient")
+    aliases: List[str] = Field(default_factory=list, description="Other ways the customer refers to them, e.g. 'córka'")
+
+    @field_validator("aliases")
+    @classmethod
+    def _aliases_are_names(cls, aliases: List[str]) -> List[str]:
+        # A two-letter or function-word alias ("ja", "mam") would match ordinary speech
+        for alias in aliases:
+            words = normalize_utterance(alias).split()
+            if not words or any(len(word) < 3 or word in STOPWORDS for word in words):
+                raise ValueError(f"Alias {alias!r} must be words of 3+ letters that are not common words")
+        return aliases
+
+
+# Words (normalised, not stemmed) that never start or continue a recipient name: function words,
+# common verbs and the words that introduce the title or other details of a transfer
+STOPWORDS = frozenset((
+    "a", "ale", "albo", "lub", "i", "oraz", "czy", "nie", "tak", "bo", "ze", "zeby", "aby", "jak", "co",
+    "to", "ten", "ta", "te", "tego", "tej", "temu", "ja", "ty", "on", "ona", "my", "wy", "mi", "mnie", "ci",
+    "mam", "masz", "ma", "mamy", "macie", "maja", "jest", "sa", "byl", "byla", "bedzie",
+    "chce", "chcialbym", "chcialabym", "prosze", "dzieki", "dziekuje", "juz", "tez", "jeszcze", "tylko",
+    "teraz", "dzis", "dzisiaj", "jutro", "potem", "moze", "nadzieje", "wszystko",
+    "za", "tytulem", "tytul", "tytulu", "od", "z", "w", "we", "o", "u", "po", "przez", "przy", "pod", "nad",
+    "do", "dla", "na", "rzecz", "konto", "rachunek", "numer", "kwota", "kwote",
+    "for", "and", "the", "please", "from", "with", "of",
+))
+# Words between the amount or verb and the name: "przelew na 300 zł dla Piotra", "mojej mamie"
+_FILLERS = frozenset(("do", "dla", "na", "rzecz", "konto", "to", "mojej", "mojemu", "mojego", "moja", "moj", "my"))
+# A recipient slot starts after one of these or after an amount
+_TRANSFER_VERBS = frozenset((
+    "przelej", "przelac", "przelew", "przelewem", "wyslij", "wyslac", "zaplac", "zaplacic",
+    "oddaj", "oddac", "przekaz", "przekazac", "send", "pay", "transfer", "wire",
+))
+_CURRENCY = frozenset(("zl", "zlotych", "zlote", "zloty", "zlotys", "pln", "zlotowki", "zlotowek"))
+_CLAUSE_BREAK = re.compile(r"[,.;:!?\n]+")
+
+# Dice similarity of name trigrams needed for a fuzzy match
+MATCH_THRESHOLD = float(os.getenv("ZGS_RECIPIENT_MATCH", "0.6"))
+# Seconds between checks of the shared contact store for changes made by other workers
+REFRESH_INTERVAL = float(os.getenv("ZGS_CONTACTS_REFRESH", "1.0"))
+
+# Polish inflectional endings (after diacritics are stripped), longest first:
+# "Damianowi" -> "damian", "córce"/"córka" -> "cor", "Kowalskiemu"/"Kowalska" -> "kowals", "Zosi"/"Zosia" -> "zos"
+_SUFFIXES = (
+    "kiemu", "kiego", "iemu", "owie", "kiej", "kich",
+    "owi", "emu", "ego", "iej", "ami", "ach", "owa", "kim",
+    "ow", "om", "ie", "ii", "ia", "ej", "ce", "ka", "ki", "ke", "ku", "ko",
+    "a", "e", "i", "y", "u", "o",
+)
+
+
+def stem(word: str) -> str:
+    """Strip one Polish case ending, keeping at least 3 letters."""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def name_key(text: str) -> str:
+    """Diacritic-, case- and inflection-insensitive key for a name or alias."""
+    return " ".join(stem(word) for word in normalize_utterance(text).split())
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def recipient_slots(text: str, max_words: int) -> List[List[str]]:
+    """
+    Candidate recipient names of a transfer text, as lists of normalised words.
+
+    A slot follows a transfer verb, an amount or a currency word, skipping
+    fillers such as "dla" or "na konto", and ends at punctuation, a number or a
+    stopword: "przelej 200 zł mamie, tytułem obiad" -> [["mamie"]].
+    """
+    slots = []
+    for clause in _CLAUSE_BREAK.split(text):
+        words = normalize_utterance(clause).split()
+        for index, word in enumerate(words):
+            next_word = words[index + 1] if index + 1 < len(words) else ""
+            is_amount = word.isdigit() and next_word not in _CURRENCY
+            if not (word in _TRANSFER_VERBS or word in _CURRENCY or is_amount):
+                continue
+            start = index + 1
+            while start < len(words) and words[start] in _FILLERS:
+                start += 1
+            slot = []
+            for candidate in words[start:start + max_words]:
+                if candidate.isdigit() or candidate in STOPWORDS or candidate in _CURRENCY or candidate in _TRANSFER_VERBS:
+                    break
+                slot.append(candidate)
+            if slot:
+                slots.append(slot)
+    return slots
+
+
+class RecipientDirectory:
+    """
+    In-memory index of a customer's saved recipients.
+
+    Every name and alias is reduced to a stemmed key. `find_in_text` looks up
+    only the recipient slot of a transfer text (the words right after the
+    transfer verb or the amount) in a key dictionary, which costs a few dict
+    lookups. `resolve` matches a single name fuzzily with an inverted trigram
+    index: the query's posting arrays are counted with one numpy bincount,
+    which scores every key at once in about 0.1 ms even with thousands of
+    contacts. The arrays are rebuilt lazily after the directory changes.
+
+    With a `store`, changes are written there and the index is reloaded when
+    the store's version moves, checked at most every `refresh_interval`
+    seconds, so worker processes sharing the store see each other's edits.
+    """
+
+    def __init__(self, contacts: Optional[List[Contact]] = None, threshold: float = MATCH_THRESHOLD,
+                 store: Optional["ContactStore"] = None, refresh_interval: float = REFRESH_INTERVAL):
+        self.threshold = threshold
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self._version: Optional[int] = None
+        self._checked_at = float("-inf")
+        self._contacts: Dict[str, Contact] = {}
+        self._keys: Dict[str, Set[str]] = {}           # key -> contact ids
+        self._postings: Dict[str, Set[str]] = {}       # trigram -> keys
+        self._arrays = None                            # search arrays built from _postings
+        self._max_words = 1
+        self._lock = threading.Lock()
+        for contact in contacts or []:
+            self.add(contact)
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._contacts)
+
+    def contacts(self) -> List[Contact]:
+        self._refresh()
+        return list(self._contacts.values())
+
+    def add(self, contact: Contact) -> None:
+        """Add or replace a contact."""
+        if self.store is not None:
+            self.store.put(contact)
+            self._refresh(force=True)
+            return
+        with self._lock:
+            self._index(contact)
+
+    def remove(self, contact_id: str) -> None:
+        """Remove a contact; unknown ids are ignored."""
+        if self.store is not None:
+            self.store.delete(contact_id)
+            self._refresh(force=True)
+            return
+        with self._lock:
+            contact = self._contacts.pop(contact_id, None)
+            if contact is not None:
+                self._unindex(contact)
+                self._arrays = None
+
+    def _refresh(self, force: bool = False) -> None:
+        """Reload the index if the shared store changed since it was built."""
+        if self.store is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_interval:
+            return
+        self._checked_at = now
+        if self.store.version() == self._version:
+            return
+        version, contacts = self.store.load()
+        with self._lock:
+            self._contacts, self._keys, self._postings, self._arrays, self._max_words = {}, {}, {}, None, 1
+            for contact in contacts:
+                self._index(contact)
+            self._version = version
+
+    def _index(self, contact: Contact) -> None:
+        if contact.id in self._contacts:
+            self._unindex(self._contacts[contact.id])
+        self._contacts[contact.id] = contact
+        for key in self._contact_keys(contact):
+            ids = self._keys.setdefault(key, set())
+            if not ids:
+                for trigram in _trigrams(key):
+                    self._postings.setdefault(trigram, set()).add(key)
+            ids.add(contact.id)
+            self._max_words = max(self._max_words, len(key.split()))
+        self._arrays = None
+
+    @staticmethod
+    def _contact_keys(contact: Contact) -> Set[str]:
+        keys = {name_key(contact.name)} | {name_key(alias) for alias in contact.aliases}
+        # First and last name alone also match, e.g. "przelej Damianowi"; short stems would match common words
+        keys |= {
+            key for word in normalize_utterance(contact.name).split()
+            if word not in STOPWORDS and len(key := stem(word)) >= 4
+        }
+        return {key for key in keys if key}
+
+    def _unindex(self, contact: Contact) -> None:
+        for key in self._contact_keys(contact):
+            ids = self._keys.get(key)
+            if ids is None:
+                continue
+            ids.discard(contact.id)
+            if not ids:
+                del self._keys[key]
+                for trigram in _trigrams(key):
+                    self._postings[trigram].discard(key)
+
+    def find_in_text(self, text: str) -> Optional[Contact]:
+        """
+        Find the recipient named in a transfer text, e.g. "przelej 200 zł córce".
+
+        Only the recipient slot is considered: the words right after a transfer
+        verb or an amount, up to the next number, common word or punctuation. The
+        title and other free text never select a contact. The longest slot prefix
+        that is a key of exactly one contact wins; names shared by several
+        contacts are ambiguous and return None.
+
+        Args:
+            text: Transfer text or transcript
+
+        Returns:
+            The matching Contact, or None
+        """
+        self._refresh()
+        with self._lock:
+            for slot in recipient_slots(text, self._max_words):
+                keys = [stem(word) for word in slot]
+                for size in range(len(keys), 0, -1):
+                    ids = self._keys.get(" ".join(keys[:size]))
+                    if ids and len(ids) == 1:
+                        return self._contacts[next(iter(ids))]
+        return None
+
+    def _search_arrays(self):
+        """(keys, trigram -> key positions, trigram counts per key, unambiguous mask), rebuilt after changes."""
+        if self._arrays is None:
+            keys = list(self._keys)
+            position = {key: i for i, key in enumerate(keys)}
+            postings = {
+                trigram: np.fromiter((position[key] for key in posting), dtype=np.int32, count=len(posting))
+                for trigram, posting in self._postings.items() if posting
+            }
+            sizes = np.array([len(_trigrams(key)) for key in keys], dtype=np.float32)
+            unique = np.array([len(self._keys[key]) == 1 for key in keys], dtype=bool)
+            self._arrays = (keys, postings, sizes, unique)
+        return self._arrays
+
+    def lookup(self, name: str) -> Optional[Contact]:
+        """
+        Saved recipient whose full name or an alias is `name`, up to case, diacritics and inflection.
+
+        Unlike `resolve`, a shared or similar surname is not enough: "Anna
+        Kowalczyk" and "Jan Kowalski" do not find "Jan Kowalczyk". Safe for
+        filling in an account number.
+
+        Args:
+            name: Recipient name, e.g. the receiver produced by the model
+
+        Returns:
+            The only contact with that name or alias, or None
+        """
+        key = name_key(name)
+        if not key:
+            return None
+        self._refresh()
+        with self._lock:
+            matches = [
+                contact for contact in (self._contacts[contact_id] for contact_id in self._keys.get(key, ()))
+                if key == name_key(contact.name) or key in {name_key(alias) for alias in contact.aliases}
+            ]
+        return matches[0] if len(matches) == 1 else None
+
+    def resolve(self, name: str) -> Optional[Tuple[Contact, float]]:
+        """
+        Fuzzy-match a recipient name, tolerating typos, inflection and missing diacritics.
+
+        Similar names of different people also match ("Jan Kowalski" for "Jan
+        Kowalczyk"), so a result is only a suggestion to confirm with the
+        customer, never a source for an account number.
+
+        Args:
+            name: Recipient name, e.g. the receiver produced by the model
+
+        Returns:
+            (contact, Dice similarity) of the best unambiguous match above the threshold, or None
+        """
+        query = _trigrams(name_key(name))
+        if len(query) < 3:
+            return None
+        self._refresh()
+        with self._lock:
+            keys, postings, sizes, unique = self._search_arrays()
+            hits = [postings[trigram] for trigram in query if trigram in postings]
+            if not hits:
+                return None
+            shared = np.bincount(np.concatenate(hits), minlength=len(keys))
+            scores = np.where(unique, 2 * shared / (len(query) + sizes), 0.0)
+            best = int(scores.argmax())
+            if scores[best] < self.threshold:
+                return None
+            return self._contacts[next(iter(self._keys[keys[best]]))], float(scores[best])
+
+    def load(self, path: str) -> None:
+        """Add contacts from a JSON list of Contact objects."""
+        with open(path, encoding="utf-8") as f:
+            for item in json.load(f):
+                self.add(Contact(**item))
+
+    def save(self, path: str) -> None:
+        """Write all contacts as a JSON list, replacing `path` atomically."""
+        contacts = [contact.model_dump() for contact in self.contacts()]
+        # A private temporary file, so concurrent saves never write into each other's output
+        fd, tmp_path = tempfile.mkstemp(prefix=".contacts-", dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(contacts, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class ContactStore:
+    """
+    SQLite table of saved recipients shared by every worker process.
+
+    Each change bumps a version number, which is what directories poll to
+    notice edits made by other processes. The database is opened on first use.
+    """
+
+    def __init__(self, path: str = "zgs_contacts.sqlite3"):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Reconnect in forked workers: SQLite connections must not be used across fork()
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS contacts (id TEXT PRIMARY KEY, contact TEXT NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS contacts_version (id INTEGER PRIMARY KEY CHECK (id = 0), version INTEGER NOT NULL)"
+            )
+            conn.execute("INSERT OR IGNORE INTO contacts_version (id, version) VALUES (0, 0)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def version(self) -> int:
+        return self._connect().execute("SELECT version FROM contacts_version").fetchone()[0]
+
+    def load(self) -> Tuple[int, List[Contact]]:
+        """(version, contacts), read from one snapshot."""
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            version = conn.execute("SELECT version FROM contacts_version").fetchone()[0]
+            rows = conn.execute("SELECT contact FROM contacts ORDER BY rowid").fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return version, [Contact(**json.loads(row[0])) for row in rows]
+
+    def _write(self, sql: str, params: tuple) -> int:
+        """Run one change and bump the version in a single transaction; returns the rows changed."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            changed = conn.execute(sql, params).rowcount
+            if changed:
+                conn.execute("UPDATE contacts_version SET version = version + 1")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return changed
+
+    def put(self, contact: Contact) -> None:
+        """Add or replace a contact."""
+        self._write(
+            "INSERT INTO contacts (id, contact) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET contact = excluded.contact",
+            (contact.id, contact.model_dump_json()),
+        )
+
+    def delete(self, contact_id: str) -> bool:
+        """Remove a contact; False if the id is unknown."""
+        return self._write("DELETE FROM contacts WHERE id = ?", (contact_id,)) == 1
+
+
+def _directory_from_env() -> RecipientDirectory:
+    """Build the process directory on the shared ZGS_CONTACTS_DB store."""
+    return RecipientDirectory(store=ContactStore(os.getenv("ZGS_CONTACTS_DB", "zgs_contacts.sqlite3")))
+
+
+recipient_directory = _directory_from_env()
@@ -0,0 +1,201 @@
+from collections import OrderedDict
+from typing import Dict, Optional
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from .telemetry import record_cache
+
+
+def content_key(data, *context) -> str:
+    """
+    Content-address a document: SHA-256 of image bytes or of UTF-8 encoded text.
+
+    Args:
+        data: bytes or str
+        *context: Anything else the cached result depends on (model, prompt
+            version, preprocessing settings); changing any of it changes the key
+
+    Returns:
+        Hex digest used as cache key
+    """
+    digest = hashlib.sha256()
+    for part in context:
+        digest.update(str(part).encode("utf-8") + b"\0")
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def prompt_version(*parts) -> str:
+    """Short fingerprint of a tool's prompt and output schema, for use in content_key."""
+    return content_key("", *parts)[:12]
+
+
+class MemoryStore:
+    """In-process LRU store with per-entry expiry."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteStore:
+    """On-disk store shared between processes, evicting least recently used rows."""
+
+    blocking = True  # async callers go through a worker thread
+
+    def __init__(self, path: str = "zgs_cache.sqlite3", max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited from a forking parent (preloaded server) must not be reused
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            if row[1] < now:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now),
+            )
+            conn.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                " SELECT key FROM results ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM results")
+
+
+class ResultCache:
+    """
+    Content-addressed cache for tool results, split into namespaces
+    (e.g. "ocr", "bill", "transfer") with hit/miss counters per namespace.
+    """
+
+    def __init__(self, store=None, ttl: float = 24 * 3600):
+        self.store = store or MemoryStore()
+        self.ttl = ttl
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, namespace: str, outcome: str) -> None:
+        with self._lock:
+            counters = self._stats.setdefault(namespace, {"hits": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        value = self.store.get(f"{namespace}:{key}")
+        self._count(namespace, "hits" if value is not None else "misses")
+        record_cache(namespace, value is not None)
+        return value
+
+    def set(self, namespace: str, key: str, value: str) -> None:
+        self.store.set(f"{namespace}:{key}", value, self.ttl)
+
+    async def aget(self, namespace: str, key: str) -> Optional[str]:
+        """get() for async callers; disk-backed stores are read off the event loop."""
+        if self.store.blocking:
+            return await asyncio.to_thread(self.get, namespace, key)
+        return self.get(namespace, key)
+
+    async def aset(self, namespace: str, key: str, value: str) -> None:
+        """set() for async callers; disk-backed stores are written off the event loop."""
+        if self.store.blocking:
+            await asyncio.to_thread(self.set, namespace, key, value)
+        else:
+            self.set(namespace, key, value)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters per namespace, for monitoring."""
+        with self._lock:
+            return {namespace: dict(counters) for namespace, counters in self._stats.items()}
+
+    def clear(self) -> None:
+        self.store.clear()
+
+
+def _cache_from_env() -> ResultCache:
+    """
+    Build the process cache from environment variables:
+    ZGS_CACHE_BACKEND (memory|sqlite|off), ZGS_CACHE_PATH, ZGS_CACHE_TTL, ZGS_CACHE_MAX_ENTRIES.
+    """
+    backend = os.getenv("ZGS_CACHE_BACKEND", "memory").lower()
+    max_entries = int(os.getenv("ZGS_CACHE_MAX_ENTRIES", "1024"))
+    ttl = float(os.getenv("ZGS_CACHE_TTL", str(24 * 3600)))
+
+    if backend == "sqlite":
+        store = SQLiteStore(os.getenv("ZGS_CACHE_PATH", "zgs_cache.sqlite3"), max_entries)
+    elif backend == "off":
+        store = MemoryStore(max_entries=0)
+    else:
+        store = MemoryStore(max_entries)
+    return ResultCache(store, ttl)
+
+
+result_cache = _cache_from_env()
@@ -1,4 +1,3 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
@@ -6,6 +5,10 @@ from typing import Optional
 from datetime import datetime
 import json
 
+from .llm_clients import default_model, get_structured_chain
+from .local_extractor import build_if_complete, extract_fields, overlay
+from .result_cache import content_key, prompt_version, result_cache
+
 
 # Define the Pydantic schema for payment information
 class PaymentInfo(BaseModel):
@@ -18,31 +21,11 @@ class PaymentInfo(BaseModel):
     schedule: str = Field(description="When to send payment in ISO format (YYYY-MM-DD) or 'immediate'")
 
 
-@tool
-def parse_bill_text(raw_text: str) -> str:
-    """
-    Parse bill text and extract payment information with scheduling.
-    Use this tool when you have raw text from a bill/invoice and need to extract
-    structured payment details (receiver, address, title, amount, bank account, schedule).
-
-    Args:
-        raw_text: Raw text extracted from bill/invoice image
-
-    Returns:
-        JSON string with payment information
-    """
-    # Initialize the LLM
-    llm = ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0,
-    )
+# Fields the local extractor must resolve for the model call to be skipped
+LOCAL_REQUIRED_FIELDS = ("receiver", "title", "amount", "bank_account", "schedule")
 
-    # Create structured output LLM
-    structured_llm = llm.with_structured_output(PaymentInfo)
-
-    # Create prompt template
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an expert at parsing bill and invoice text to extract payment information.
+BILL_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert at parsing bill and invoice text to extract payment information.
 
 Extract the following information:
 1. Receiver: The company or person who should receive the payment
@@ -56,17 +39,68 @@ Extract the following information:
    - If no due date is specified, use "immediate"
 
 Be precise and extract exact values from the text."""),
-        ("human", "Parse this bill text and extract payment information:\n\n{text}")
-    ])
+    ("human", "Parse this bill text and extract payment information:\n\n{text}")
+])
+BILL_VERSION = prompt_version(BILL_PROMPT.pretty_repr(), PaymentInfo.model_json_schema())
 
-    # Create the chain
-    chain = prompt | structured_llm
 
-    # Execute and return result
-    result = chain.invoke({"text": raw_text})
+@tool
+def parse_bill_text(raw_text: str) -> str:
+    """
+    Parse bill text and extract payment information with scheduling.
+    Use this tool when you have raw text from a bill/invoice and need to extract
+    structured payment details (receiver, address, title, amount, bank account, schedule).
 
-    # Return as JSON string for agent compatibility
-    return result.model_dump_json()
+    Args:
+        raw_text: Raw text extracted from bill/invoice image
+
+    Returns:
+        JSON string with payment information
+    """
+    # Identical texts are served from the cache
+    cache_key = content_key(raw_text, default_model(), BILL_VERSION)
+    cached = result_cache.get("bill", cache_key)
+    if cached is not None:
+        return cached
+
+    # Well-formatted bills are extracted locally without a model call
+    local_fields = extract_fields(raw_text)
+    local_result = build_if_complete(local_fields, PaymentInfo, LOCAL_REQUIRED_FIELDS)
+    if local_result is not None:
+        result = local_result.model_dump_json()
+        result_cache.set("bill", cache_key, result)
+        return result
+
+    # Shared chain, built once per process
+    chain = get_structured_chain(BILL_PROMPT, PaymentInfo)
+
+    # The model fills the gaps; locally validated fields take precedence
+    result = overlay(chain.invoke({"text": raw_text}), local_fields).model_dump_json()
+    result_cache.set("bill", cache_key, result)
+    return result
+
+
+async def _aparse_bill_text(raw_text: str) -> str:
+    """Async implementation of parse_bill_text, used by `ainvoke`."""
+    cache_key = content_key(raw_text, default_model(), BILL_VERSION)
+    cached = await result_cache.aget("bill", cache_key)
+    if cached is not None:
+        return cached
+
+    local_fields = extract_fields(raw_text)
+    local_result = build_if_complete(local_fields, PaymentInfo, LOCAL_REQUIRED_FIELDS)
+    if local_result is not None:
+        result = local_result.model_dump_json()
+        await result_cache.aset("bill", cache_key, result)
+        return result
+
+    chain = get_structured_chain(BILL_PROMPT, PaymentInfo)
+    result = overlay(await chain.ainvoke({"text": raw_text}), local_fields).model_dump_json()
+    await result_cache.aset("bill", cache_key, result)
+    return result
+
+
+parse_bill_text.coroutine = _aparse_bill_text
 
 
 @tool
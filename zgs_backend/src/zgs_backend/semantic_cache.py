@@ -0,0 +1,187 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from .embeddings import VectorIndex, embed, embeddings_available
+from .intent_router import normalize_utterance
+from .recipient_directory import name_key
+from .telemetry import record_cache, record_similarity
+
+# Logged transcripts are always masked: they may contain account numbers
+log = logging.getLogger(__name__)
+
+# Fields that are never taken from a cached entry; they must be re-extracted from the new text
+NUMERIC_FIELDS = ("amount", "bank_account")
+# Free-text fields whose words, if they came from the cached transcript, must also be in the new one
+TEXT_FIELDS = ("receiver", "title", "address")
+
+_NUMBER = re.compile(r"\d+(?:\s\d+)*")
+
+
+def mask_numbers(text: str) -> str:
+    """Normalise a transcript and replace every number with '#', so amounts do not affect similarity."""
+    return _NUMBER.sub("#", normalize_utterance(text))
+
+
+@lru_cache(maxsize=256)
+def _embed_masked(masked: str) -> np.ndarray:
+    # A miss is followed by set() for the same transcript; embed it only once
+    return embed([masked])[0]
+
+
+def _stemmed_words(value: Any) -> set:
+    """Inflection-insensitive words of a text ("Janowi" -> "jan", "Januszowi" -> "janusz"), numbers whole."""
+    return {word for word in name_key(str(value or "")).split() if len(word) >= 3 or word.isdigit()}
+
+
+class SemanticCache:
+    """
+    Reuse structured results for transcripts that differ only in wording or numbers.
+
+    Transcripts are embedded with their numbers masked and looked up in a
+    VectorIndex. A hit above `threshold` returns the cached fields, but numeric
+    fields are replaced by values extracted locally from the new transcript
+    (an account number may also be kept if its digits appear in it) and a hit
+    is rejected if they cannot be, or if words that grounded the cached
+    receiver/title/address are missing from the new transcript. The cache keeps
+    at most `max_entries` entries, evicting the least recently used.
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 512, threshold: float = 0.95,
+                 ttl: float = 24 * 3600, enabled: bool = True):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self.enabled = enabled and max_entries > 0
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._index: Optional[VectorIndex] = None
+        self._next_id = 0
+        self._stats = {"hits": 0, "misses": 0, "rejected": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def get(self, text: str, local_fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Look up a transcript.
+
+        Args:
+            text: New transcript
+            local_fields: Output of extract_fields(text), used for the numeric fields
+
+        Returns:
+            Cached fields with numbers from the new transcript, or None
+        """
+        if not self.enabled or self._index is None:
+            return None
+        masked = mask_numbers(text)
+        hits = self._index.search(_embed_masked(masked), k=3)
+        if hits:
+            record_similarity(self.namespace, hits[0][1])
+        now = time.time()
+        for entry_id, score in hits:
+            if score < self.threshold:
+                break
+            with self._lock:
+                entry = self._entries.get(entry_id)
+                if entry is None or entry[2] < now:
+                    continue
+                self._entries.move_to_end(entry_id)
+            source, value, _ = entry
+            reused = self._reuse(value, source, text, local_fields)
+            if reused is None:
+                log.info("%s semantic cache: rejected %.3f match %r for %r", self.namespace, score, mask_numbers(source), masked)
+                self._count("rejected")
+                continue
+            log.info("%s semantic cache: hit %.3f %r -> %r", self.namespace, score, masked, mask_numbers(source))
+            self._count("hits")
+            record_cache(f"{self.namespace}_semantic", True)
+            return reused
+
+        log.debug("%s semantic cache: miss, best %.3f for %r", self.namespace, hits[0][1] if hits else 0.0, masked)
+        self._count("misses")
+        record_cache(f"{self.namespace}_semantic", False)
+        return None
+
+    @staticmethod
+    def _reuse(value: Dict[str, Any], source: str, text: str, local_fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        reused = dict(value)
+        for field in NUMERIC_FIELDS:
+            if field not in value:
+                continue
+            digits = re.sub(r"\D", "", str(value[field] or ""))
+            if local_fields.get(field):
+                reused[field] = local_fields[field]
+            elif field == "bank_account" and digits in re.sub(r"\D", "", text):
+                continue  # the same account number is spelled out in the new transcript
+            elif digits:
+                return None
+
+        source_words, new_words = _stemmed_words(source), _stemmed_words(text)
+        for field in TEXT_FIELDS:
+            grounded = _stemmed_words(value.get(field)) & source_words
+            if not grounded <= new_words:
+                return None
+        return reused
+
+    def set(self, text: str, value: str) -> None:
+        """Store the JSON result produced for a transcript."""
+        if not self.enabled:
+            return
+        vector = _embed_masked(mask_numbers(text))
+        with self._lock:
+            if self._index is None:
+                self._index = VectorIndex(vector.shape[0])
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (text, json.loads(value), time.time() + self.ttl)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+            self._stats["evictions"] += len(evicted)
+        self._index.add([entry_id], vector)
+        if evicted:
+            self._index.remove(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and size, for monitoring and threshold tuning."""
+        with self._lock:
+            return dict(self._stats, size=len(self._entries), threshold=self.threshold)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._index = None
+
+
+def _semantic_cache_from_env(namespace: str) -> SemanticCache:
+    """
+    Build a semantic cache from environment variables: ZGS_SEMANTIC_CACHE (0 disables),
+    ZGS_SEMANTIC_THRESHOLD, ZGS_SEMANTIC_CACHE_SIZE, plus ZGS_CACHE_TTL and ZGS_CACHE_BACKEND=off.
+    """
+    enabled = (
+        embeddings_available()
+        and os.getenv("ZGS_SEMANTIC_CACHE", "1") != "0"
+        and os.getenv("ZGS_CACHE_BACKEND", "memory").lower() != "off"
+    )
+    return SemanticCache(
+        namespace,
+        max_entries=int(os.getenv("ZGS_SEMANTIC_CACHE_SIZE", "512")),
+        threshold=float(os.getenv("ZGS_SEMANTIC_THRESHOLD", "0.95")),
+        ttl=float(os.getenv("ZGS_CACHE_TTL", str(24 * 3600))),
+        enabled=enabled,
+    )
+
+
+transfer_semantic_cache = _semantic_cache_from_env("transfer")
@@ -0,0 +1,199 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import os
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # spans are then only kept in the per-request trace
+    otel_trace = None
+
+try:
+    import prometheus_client as prom
+except ImportError:  # /metrics is then unavailable
+    prom = None
+
+
+# USD per 1M tokens as (prompt, completion), used for the cost estimate
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+if prom is not None:
+    STAGE_SECONDS = prom.Histogram(
+        "zgs_stage_seconds", "Wall time per pipeline stage (request, iteration, tool, model call)", ["stage"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+    )
+    LLM_TOKENS = prom.Counter("zgs_llm_tokens", "Model tokens used", ["model", "kind"])
+    LLM_COST = prom.Counter("zgs_llm_cost_usd", "Estimated model cost in USD", ["model"])
+    CACHE_LOOKUPS = prom.Counter("zgs_cache_lookups", "Result cache lookups", ["namespace", "result"])
+    MODEL_RETRIES = prom.Counter("zgs_model_retries", "Retried model provider calls", ["model"])
+    SEMANTIC_SIMILARITY = prom.Histogram(
+        "zgs_semantic_similarity", "Best semantic cache similarity per lookup", ["namespace"],
+        buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.925, 0.95, 0.975, 0.99, 1.0),
+    )
+
+_tracer = otel_trace.get_tracer("zgs_backend") if otel_trace is not None else None
+
+
+class RequestTrace:
+    """Spans, token usage and cache lookups collected while serving one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.cost_usd = 0.0
+        self.cache = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-serialisable view of the trace, returned alongside the request result."""
+        with self._lock:
+            return {
+                "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+                "spans": list(self.spans),
+                "tokens": dict(self.tokens),
+                "cost_usd": round(self.cost_usd, 6),
+                "cache": dict(self.cache),
+            }
+
+
+_current: ContextVar[Optional[RequestTrace]] = ContextVar("zgs_request_trace", default=None)
+
+
+@contextmanager
+def request_trace() -> Iterator[RequestTrace]:
+    """Collect everything recorded inside the block into one RequestTrace (reused if already active)."""
+    trace = _current.get()
+    if trace is not None:
+        yield trace
+        return
+    trace = RequestTrace()
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(stage: str, **attributes: Any) -> Iterator[None]:
+    """
+    Time a stage of the pipeline.
+
+    The duration goes to the zgs_stage_seconds histogram, to the active request
+    trace and, when opentelemetry is installed and configured, to an OTel span.
+
+    Args:
+        stage: Low-cardinality stage name, e.g. "tool.parse_bill_text" or "model.gpt-4o-mini"
+        **attributes: Extra span attributes (iteration number, mode...)
+    """
+    otel_span = _tracer.start_as_current_span(stage, attributes=attributes) if _tracer is not None else None
+    if otel_span is not None:
+        otel_span.__enter__()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        if prom is not None:
+            STAGE_SECONDS.labels(stage).observe(elapsed)
+        trace = _current.get()
+        if trace is not None:
+            record = {"stage": stage, "ms": round(elapsed * 1000, 1), **attributes}
+            if error:
+                record["error"] = error
+            with trace._lock:
+                trace.spans.append(record)
+        if otel_span is not None:
+            otel_span.__exit__(None, None, None)
+
+
+def _prices(model: str) -> Tuple[float, float]:
+    # The API reports dated names such as gpt-4o-mini-2024-07-18
+    matches = [name for name in MODEL_PRICES if model.startswith(name)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else (0.0, 0.0)
+
+
+def record_tokens(model: str, prompt_tokens: int, completion_tokens: int) -> None:
+    """Count model tokens and their estimated cost."""
+    prompt_price, completion_price = _prices(model)
+    cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+    if prom is not None:
+        LLM_TOKENS.labels(model, "prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(model, "completion").inc(completion_tokens)
+        LLM_COST.labels(model).inc(cost)
+    trace = _current.get()
+    if trace is not None:
+        with trace._lock:
+            trace.tokens["prompt"] += prompt_tokens
+            trace.tokens["completion"] += completion_tokens
+            trace.cost_usd += cost
+
+
+def record_cache(namespace: str, hit: bool) -> None:
+    """Count a result cache lookup."""
+    if prom is not None:
+        CACHE_LOOKUPS.labels(namespace, "hit" if hit else "miss").inc()
+    trace = _current.get()
+    if trace is not None:
+        with trace._lock:
+            trace.cache["hits" if hit else "misses"] += 1
+
+
+def record_retry(model: str) -> None:
+    """Count a retried provider call."""
+    if prom is not None:
+        MODEL_RETRIES.labels(model).inc()
+
+
+def record_similarity(namespace: str, score: float) -> None:
+    """Observe the best similarity of a semantic cache lookup, to tune its threshold."""
+    if prom is not None:
+        SEMANTIC_SIMILARITY.labels(namespace).observe(score)
+
+
+def render_metrics() -> Optional[Tuple[bytes, str]]:
+    """Prometheus exposition of all metrics as (body, content type), or None without prometheus_client."""
+    if prom is None:
+        return None
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Pre-forked workers write their samples to files in this directory; aggregate them all
+        from prometheus_client import multiprocess
+
+        registry = prom.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return prom.generate_latest(registry), prom.CONTENT_TYPE_LATEST
+    return prom.generate_latest(), prom.CONTENT_TYPE_LATEST
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """LangChain callback that records the token usage reported with every chat completion."""
+
+    # Run in the caller's context so usage lands in the right request trace
+    run_inline = True
+
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        llm_output = response.llm_output or {}
+        usage = llm_output.get("token_usage") or {}
+        if usage:
+            record_tokens(
+                llm_output.get("model_name", "unknown"),
+                usage.get("prompt_tokens", 0),
+                usage.get("completion_tokens", 0),
+            )
+
+
+token_usage_handler = TokenUsageHandler()
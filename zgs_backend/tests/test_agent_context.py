@@ -0,0 +1,38 @@
+import json
+
+from langchain_core.messages import AIMessage
+
+from zgs_backend.agent_context import AgentContext
+
+RAW_TEXT = "FAKTURA VAT nr 123/2024\nOdbiorca: Energa Obrót S.A.\n" + "Pozycja rachunku za energię elektryczną\n" * 20
+
+
+def _ocr_then_parse(context: AgentContext) -> None:
+    context.add_response(AIMessage(content="", tool_calls=[
+        {"name": "extract_text_from_image", "args": {"image_path": "bill.png"}, "id": "ocr"},
+    ]))
+    context.add_tool_result("ocr", json.dumps({"raw_text": RAW_TEXT}))
+    context.add_response(AIMessage(content="", tool_calls=[
+        {"name": "parse_bill_text", "args": {"raw_text": RAW_TEXT}, "id": "parse"},
+    ]))
+
+
+def test_consumed_output_is_compacted():
+    context = AgentContext("system", "user")
+    _ocr_then_parse(context)
+    context.add_tool_result("parse", '{"receiver": "Energa"}')
+
+    messages = context.compact()
+    assert "already passed on" in messages[3].content
+    assert "already passed on" in messages[4].tool_calls[0]["args"]["raw_text"]
+
+
+def test_output_kept_when_consumer_failed():
+    context = AgentContext("system", "user")
+    _ocr_then_parse(context)
+    context.add_tool_result("parse", "Error: validation failed", failed=True)
+
+    messages = context.compact()
+    assert json.loads(messages[3].content)["raw_text"] == RAW_TEXT
+    assert messages[4].tool_calls[0]["args"]["raw_text"] == RAW_TEXT
+    assert context.compacted_chars == 0
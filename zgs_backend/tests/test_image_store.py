@@ -0,0 +1,15 @@
+import binascii
+
+import pytest
+
+from zgs_backend.image_store import decode_upload
+
+
+def test_whitespace_is_ignored():
+    assert decode_upload("aGVs\nbG8=\n") == (b"hello", "aGVsbG8=")
+
+
+@pytest.mark.parametrize("value, error", [(123, TypeError), (None, TypeError), ("not base64!", binascii.Error)])
+def test_bad_uploads_raise(value, error):
+    with pytest.raises(error):
+        decode_upload(value)
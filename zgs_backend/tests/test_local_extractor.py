@@ -0,0 +1,41 @@
+import pytest
+
+from zgs_backend.converter_tool import LOCAL_REQUIRED_FIELDS, TransferInfo
+from zgs_backend.local_extractor import build_if_complete, extract_fields, parse_amount
+
+
+@pytest.mark.parametrize("text, amount", [
+    ("Kwota: 1000 zł", 1000.0),                 # ungrouped
+    ("Kwota: 2500 PLN", 2500.0),
+    ("Do zapłaty: 1234.56 PLN", 1234.56),      # dot decimal
+    ("Do zapłaty: 89,99 zł", 89.99),           # comma decimal
+    ("Kwota do zapłaty: 1 234,56 zł", 1234.56),  # space grouped
+    ("Razem: 12 500 zł", 12500.0),
+    ("Razem do zapłaty: 1.234,50", 1234.5),    # dot grouped
+    ("przelej 1000 zł Ani", 1000.0),            # currency only, no label
+    ("przelej 12 500 zł", 12500.0),
+])
+def test_amounts(text, amount):
+    assert extract_fields(text)["amount"] == amount
+
+
+def test_amount_not_cut_from_a_longer_number():
+    # "234 zł" inside "1.234 zł" is not an amount; leave it to the model
+    assert "amount" not in extract_fields("przelej 1.234 zł")
+
+
+def test_parse_amount():
+    assert parse_amount("1 234,56") == 1234.56
+    assert parse_amount("89.99") == 89.99
+    assert parse_amount("1000") == 1000.0
+
+
+def test_labelled_transfer_is_built_without_the_model():
+    text = (
+        "Odbiorca: Damian Hujcik\nAdres: Wałbrzych 15\nTytuł: mister griddy winna\n"
+        "Kwota: 1000 zł\nKonto: 80 1090 2590 0000 0001 4411 2233\n"
+    )
+    result = build_if_complete(extract_fields(text), TransferInfo, LOCAL_REQUIRED_FIELDS)
+    assert result is not None
+    assert result.amount == 1000.0
+    assert result.bank_account == "80 1090 2590 0000 0001 4411 2233"
@@ -0,0 +1,106 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from zgs_backend import payment_scheduler
+from zgs_backend.payment_scheduler import PaymentScheduler, PaymentStore
+
+PAYMENT = {"receiver": "Energa", "bank_account": "80 1090 2590 0000 0001 4411 2233", "amount": 120.5, "title": "FV 1/2024"}
+
+
+def test_unexpired_claims_are_not_requeued(tmp_path):
+    store = PaymentStore(str(tmp_path / "payments.sqlite3"))
+    store.add({"amount": 10}, time.time())
+    assert len(store.claim_due(time.time(), owner="worker-1")) == 1
+
+    # A second scheduler starting up must leave the live claim alone
+    assert store.requeue_interrupted() == 0
+    assert store.claim_due(time.time(), owner="worker-2") == []
+
+
+def test_expired_claims_are_requeued(tmp_path):
+    store = PaymentStore(str(tmp_path / "payments.sqlite3"))
+    payment_id = store.add({"amount": 10}, time.time())
+    stale = store.claim_due(time.time(), owner="crashed", lease=-1)[0]
+
+    claimed = store.claim_due(time.time(), owner="worker-2")
+    assert [payment["id"] for payment in claimed] == [payment_id]
+    # The crashed owner's late outcome does not overwrite the new claim
+    store.finish([(stale, None)])
+    assert store.get(payment_id)["status"] == "dispatching"
+    store.finish([(claimed[0], None)])
+    assert store.get(payment_id)["status"] == "sent"
+
+
+def test_two_schedulers_dispatch_each_payment_once(tmp_path):
+    path = str(tmp_path / "payments.sqlite3")
+    store = PaymentStore(path)
+    store.add_many([({"amount": n}, time.time(), None) for n in range(20)])
+    dispatched, lock = [], threading.Lock()
+
+    def slow_dispatch(payments):
+        time.sleep(1.0)
+        with lock:
+            dispatched.extend(payment["id"] for payment in payments)
+        return [None] * len(payments)
+
+    schedulers = [PaymentScheduler(PaymentStore(path), slow_dispatch, batch_size=5) for _ in range(2)]
+    schedulers[0].start()
+    time.sleep(0.2)
+    schedulers[1].start()   # starts while the first is mid-dispatch
+    deadline = time.time() + 15
+    while len(dispatched) < 20 and time.time() < deadline:
+        time.sleep(0.1)
+    for scheduler in schedulers:
+        scheduler.stop(timeout=5)
+    assert sorted(dispatched) == sorted(set(dispatched))
+    assert len(dispatched) == 20
+
+
+def test_import_does_not_create_the_database(tmp_path):
+    src = os.path.dirname(os.path.dirname(payment_scheduler.__file__))
+    env = dict(os.environ, PYTHONPATH=src)
+    subprocess.run([sys.executable, "-c", "import zgs_backend.payment_scheduler"], cwd=tmp_path, env=env, check=True)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_only_the_leader_dispatches(tmp_path):
+    path = str(tmp_path / "payments.sqlite3")
+    lock = str(tmp_path / "payments.leader")
+    leader = PaymentScheduler(PaymentStore(path)).start(leader_lock=lock)
+    standby = PaymentScheduler(PaymentStore(path)).start(leader_lock=lock)
+    deadline = time.time() + 5
+    while not (leader.leader or standby.leader) and time.time() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.2)
+    assert [leader.leader, standby.leader].count(True) == 1
+    assert leader.running and standby.running
+    for scheduler in (leader, standby):
+        scheduler.stop(timeout=5)
+
+
+@pytest.mark.parametrize("payment, schedule, frequency", [
+    ({k: v for k, v in PAYMENT.items() if k != "bank_account"}, None, None),
+    (dict(PAYMENT, bank_account="abc"), None, None),
+    (dict(PAYMENT, amount=-5), None, None),
+    (dict(PAYMENT, amount="120"), None, None),
+    ({k: v for k, v in PAYMENT.items() if k != "amount"}, None, None),
+    (PAYMENT, None, 5),
+    (PAYMENT, None, "daily"),
+    (PAYMENT, "next tuesday", None),
+])
+def test_invalid_payments_are_not_scheduled(tmp_path, payment, schedule, frequency):
+    scheduler = PaymentScheduler(PaymentStore(str(tmp_path / "payments.sqlite3")))
+    with pytest.raises(ValueError):
+        scheduler.schedule(payment, schedule, frequency)
+    assert scheduler.store.list() == []
+
+
+def test_valid_payment_is_scheduled(tmp_path):
+    scheduler = PaymentScheduler(PaymentStore(str(tmp_path / "payments.sqlite3")))
+    payment_id = scheduler.schedule(PAYMENT, "immediate", "Monthly")
+    assert scheduler.store.get(payment_id)["frequency"] == "monthly"
@@ -0,0 +1,130 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from zgs_backend import converter_tool
+from zgs_backend.converter_tool import TransferInfo
+from zgs_backend.recipient_directory import Contact, ContactStore, RecipientDirectory
+from zgs_backend.result_cache import MemoryStore, ResultCache
+
+MOM = Contact(id="mom", name="Marta Nowak", bank_account="11 1111 1111 1111 1111 1111 1111", aliases=["mama"])
+ANNA = Contact(id="anna", name="Anna Kowalska", bank_account="22 2222 2222 2222 2222 2222 2222", address="Gdańsk 1")
+
+
+@pytest.fixture
+def directory(monkeypatch):
+    directory = RecipientDirectory([MOM, ANNA])
+    monkeypatch.setattr(converter_tool, "recipient_directory", directory)
+    return directory
+
+
+@pytest.mark.parametrize("text, contact", [
+    ("przelej 200 zł mamie", MOM),
+    ("przelej 200 zł mojej mamie za zakupy", MOM),
+    ("wyślij 50 zł Annie Kowalskiej", ANNA),
+    ("przelej Kowalskiej 300 zł", ANNA),
+])
+def test_recipient_slot_matches(directory, text, contact):
+    assert directory.find_in_text(text) == contact
+
+
+@pytest.mark.parametrize("text", [
+    "przelej 50 zł Tomkowi, mam nadzieję że dojdzie",
+    "przelej 50 zł Tomkowi mam nadzieję że dojdzie",
+    "przelej 300 zł za samochód od Kowalskiej",
+    "przelej 200 zł Piotrowi Zielińskiemu tytułem prezent dla córki",
+])
+def test_title_and_free_text_do_not_match(directory, text):
+    assert directory.find_in_text(text) is None
+
+
+@pytest.mark.parametrize("alias", ["ja", "mam", "za", "od"])
+def test_common_word_aliases_are_rejected(alias):
+    with pytest.raises(ValidationError):
+        Contact(id="x", name="Jan Nowak", bank_account="1", aliases=[alias])
+
+
+def test_directory_transfer_is_built_locally(directory):
+    result = converter_tool._directory_result("przelej 200 zł Annie Kowalskiej", {"amount": 200.0})
+    assert result.receiver == "Anna Kowalska"
+    assert result.bank_account == ANNA.bank_account
+
+
+def _model_transfer(receiver: str) -> str:
+    return TransferInfo(receiver=receiver, address="", title="obiad", amount=50.0, bank_account="").model_dump_json()
+
+
+def test_exact_model_receiver_gets_the_saved_account(directory):
+    result = TransferInfo.model_validate_json(converter_tool._with_saved_account(_model_transfer("anna kowalska")))
+    assert result.receiver == "anna kowalska"
+    assert result.bank_account == ANNA.bank_account
+    assert result.address == "Gdańsk 1"
+
+
+@pytest.mark.parametrize("receiver", [
+    "Anna Kowalczyk",      # shared surname
+    "Janusz Kowalczyk",
+    "Jan Kowalski",        # similar surname
+    "Kowalczyk",
+])
+def test_similar_model_receiver_gets_no_account(monkeypatch, receiver):
+    jan = Contact(id="jan", name="Jan Kowalczyk", bank_account="33 3333 3333 3333 3333 3333 3333")
+    monkeypatch.setattr(converter_tool, "recipient_directory", RecipientDirectory([jan]))
+    result = TransferInfo.model_validate_json(converter_tool._with_saved_account(_model_transfer(receiver)))
+    assert result.bank_account == ""
+
+
+def test_similar_receiver_is_only_suggested(monkeypatch):
+    from zgs_backend import intent_router, recipient_directory
+
+    jan = Contact(id="jan", name="Jan Kowalczyk", bank_account="33 3333 3333 3333 3333 3333 3333")
+    monkeypatch.setattr(recipient_directory, "recipient_directory", RecipientDirectory([jan]))
+    command = intent_router._transfer_command(_model_transfer("Jan Kowalski"))
+    assert command["recipient_name"] == "Jan Kowalski"
+    assert command["suggested_contact"] == {"id": "jan", "name": "Jan Kowalczyk"}
+
+
+def test_cached_model_result_follows_contact_edits(directory, monkeypatch):
+    class Chain:
+        calls = 0
+
+        def invoke(self, _):
+            Chain.calls += 1
+            return TransferInfo.model_validate_json(_model_transfer("Anna Kowalska"))
+
+    monkeypatch.setattr(converter_tool, "get_structured_chain", lambda *_: Chain())
+    monkeypatch.setattr(converter_tool, "result_cache", ResultCache(MemoryStore()))
+    monkeypatch.setattr(converter_tool.transfer_semantic_cache, "set", lambda *_: None)
+    text = "zapłać Annie Kowalskiej za obiad"
+
+    first = json.loads(converter_tool.extract_transfer_info.invoke({"text": text}))
+    assert first["bank_account"] == ANNA.bank_account
+    directory.remove("anna")
+    second = json.loads(converter_tool.extract_transfer_info.invoke({"text": text}))
+    assert second["bank_account"] == ""
+    assert Chain.calls == 1
+
+
+def test_workers_share_contact_edits(tmp_path):
+    path = str(tmp_path / "contacts.sqlite3")
+    worker_1 = RecipientDirectory(store=ContactStore(path), refresh_interval=0)
+    worker_2 = RecipientDirectory(store=ContactStore(path), refresh_interval=0)
+
+    worker_1.add(MOM)
+    worker_2.add(ANNA)
+    assert {contact.id for contact in worker_1.contacts()} == {"mom", "anna"}
+    assert worker_1.find_in_text("wyślij 50 zł Annie Kowalskiej") == ANNA
+
+    worker_1.remove("anna")
+    assert worker_2.find_in_text("wyślij 50 zł Annie Kowalskiej") is None
+    assert worker_2.find_in_text("przelej 200 zł mamie") == MOM
+
+
+def test_save_replaces_the_file(tmp_path):
+    path = tmp_path / "contacts.json"
+    RecipientDirectory([MOM, ANNA]).save(str(path))
+    directory = RecipientDirectory()
+    directory.load(str(path))
+    assert directory.contacts() == [MOM, ANNA]
+    assert [item.name for item in tmp_path.iterdir()] == ["contacts.json"]
@@ -0,0 +1,33 @@
+import pytest
+
+from zgs_backend.semantic_cache import SemanticCache, mask_numbers
+
+CACHED_SOURCE = "przelej 200 zł Janowi za obiad"
+CACHED_VALUE = {"receiver": "Jan", "address": "", "title": "za obiad", "amount": 200.0, "bank_account": ""}
+
+
+def test_mask_numbers():
+    assert mask_numbers("Przelej 1 000 zł Ani") == "przelej # zl ani"
+
+
+def test_reuse_with_new_amount():
+    reused = SemanticCache._reuse(CACHED_VALUE, CACHED_SOURCE, "wyślij 350 zł Janowi za obiad", {"amount": 350.0})
+    assert reused == dict(CACHED_VALUE, amount=350.0)
+
+
+def test_reuse_across_inflection():
+    reused = SemanticCache._reuse(CACHED_VALUE, CACHED_SOURCE, "przelej 50 zł dla Jana za obiad", {"amount": 50.0})
+    assert reused is not None
+
+
+@pytest.mark.parametrize("text", [
+    "przelej 200 zł Januszowi za obiad",
+    "przelej 200 zł Janinie za obiad",
+    "przelej 200 zł Janowskiemu za obiad",
+])
+def test_reject_names_sharing_a_prefix(text):
+    assert SemanticCache._reuse(CACHED_VALUE, CACHED_SOURCE, text, {"amount": 200.0}) is None
+
+
+def test_reject_without_local_amount():
+    assert SemanticCache._reuse(CACHED_VALUE, CACHED_SOURCE, "przelej dwieście złotych Janowi za obiad", {}) is None